@@ -17,8 +17,11 @@ def main():
 
     try:
         rc_file = os.environ.get("RELEASE_CANDIDATES_FILE", f"{ROOT_DIR}/release-candidates.yaml")
-        logger.info(f"Starting ansible test runner with RC file: {rc_file}")
-        service = AnsibleTestRunnerService(file_path=rc_file, dry_run=args.dry_run, pending_snapshot_id=args.pending_snapshot_id)
+        rc_dir = os.environ.get("RELEASE_CANDIDATES_DIR")
+        logger.info(f"Starting ansible test runner with RC file: {rc_dir or rc_file}")
+        service = AnsibleTestRunnerService(
+            file_path=rc_file, dry_run=args.dry_run, pending_snapshot_id=args.pending_snapshot_id, rc_dir=rc_dir
+        )
         service.run()
         logger.info("Ansible test run completed successfully")
         return 0
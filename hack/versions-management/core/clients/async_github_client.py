@@ -0,0 +1,74 @@
+import asyncio
+import json
+import logging
+from urllib.parse import urlencode
+
+import aiohttp
+
+from core.clients.async_http import HostLimiter
+from core.clients.github_client import PAGE_SIZE
+from core.clients.github_rate_limit import resource_for, retry_delay
+from core.clients.github_transport import GitHubTransport
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = "https://api.github.com"
+# attempts after a rate limited response, on the schedule GitHub advises
+RATE_LIMIT_RETRIES = 3
+
+
+# the subset of GitHub REST reads discovery needs, for the asyncio engine
+class AsyncGitHubClient:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        token: str,
+        limiter: HostLimiter,
+        api_url: str = GITHUB_API_URL,
+        transport: GitHubTransport | None = None,
+    ):
+        self.session: aiohttp.ClientSession = session
+        self.limiter: HostLimiter = limiter
+        self.api_url: str = api_url
+        self.transport: GitHubTransport | None = transport
+        self.headers: dict[str, str] = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    async def get_latest_release_tag(self, repo: str) -> str:
+        release = await self._get(f"/repos/{repo}/releases/latest")
+        return release["tag_name"]
+
+    async def get_commit_shas(self, repo: str, count: int) -> list[str]:
+        # the page size PyGithub sends, so both engines share the cache entry
+        commits = await self._get(f"/repos/{repo}/commits", params={"per_page": PAGE_SIZE})
+        return [commit["sha"] for commit in commits[:count]]
+
+    async def _get(self, path: str, params: dict[str, int] | None = None):
+        url = f"{self.api_url}{path}"
+        # keyed by path and query string, as the metered adapter keys PyGithub's requests
+        key = f"{path}?{urlencode(params)}" if params else path
+        cache = self.transport.cache if self.transport else None
+        cached = cache.get(key) if cache else None
+        headers = {**self.headers, **cached.conditional_headers()} if cached else self.headers
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            if self.transport:
+                await asyncio.sleep(self.transport.rate_limits.reserve(resource_for(url)))
+            async with self.limiter.limit(url):
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    if self.transport:
+                        self.transport.record("GET", path, response.status, response.headers)
+                    if response.status == 304 and cached:
+                        cache.record_not_modified()
+                        return json.loads(cached.body)
+                    body = await response.text()
+                    if response.status == 200:
+                        if cache:
+                            cache.store(key, response.headers, body)
+                        return json.loads(body)
+                    delay = retry_delay(response.status, response.headers, body, attempt)
+            if delay is None or attempt == RATE_LIMIT_RETRIES:
+                raise Exception(f"GitHub request {path} failed with status {response.status}")
+            logger.warning(f"GitHub request {path} rate limited, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
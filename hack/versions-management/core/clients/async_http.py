@@ -0,0 +1,23 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+
+# bounds the in-flight requests per host, so a slow registry can't starve GitHub calls
+# and the other way round, no matter how many components are discovered at once
+class HostLimiter:
+    def __init__(self, limits: dict[str, int] | None = None, default_limit: int = 8):
+        self.limits: dict[str, int] = limits or {}
+        self.default_limit: int = default_limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def limit(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(host, self.default_limit))
+            self._semaphores[host] = semaphore
+        async with semaphore:
+            yield
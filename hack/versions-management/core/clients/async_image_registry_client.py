@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Mapping
+
+import aiohttp
+
+from core.clients.async_http import HostLimiter
+from core.clients.digest_cache import CacheEntry, DigestCache
+from core.clients.image_registry_client import (
+    BACKOFF_FACTOR,
+    BACKOFF_JITTER,
+    MANIFEST_ACCEPT,
+    RETRIES,
+    RETRY_AFTER_STATUSES,
+    RETRY_STATUSES,
+    ManifestProbe,
+    backoff_delay,
+)
+from core.clients.registry_auth import BearerToken, TokenCache, TokenScope, parse_token
+
+logger = logging.getLogger(__name__)
+
+
+# asyncio counterpart of ImageRegistryClient.probe, same results and the same digest cache
+class AsyncImageRegistryClient:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        limiter: HostLimiter,
+        registry_url: str = "https://quay.io",
+        cache: DigestCache | None = None,
+        credentials: tuple[str, str] | None = None,
+        retries: int = RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        backoff_jitter: float = BACKOFF_JITTER,
+    ):
+        self.session: aiohttp.ClientSession = session
+        self.limiter: HostLimiter = limiter
+        self.registry_url: str = registry_url
+        self.cache: DigestCache | None = cache
+        self.auth: aiohttp.BasicAuth | None = aiohttp.BasicAuth(*credentials) if credentials else None
+        self.retries: int = retries
+        self.backoff_factor: float = backoff_factor
+        self.backoff_jitter: float = backoff_jitter
+        self.tokens: TokenCache = TokenCache(asyncio.Lock)
+
+    async def probe(self, image: str, tag: str) -> ManifestProbe:
+        if self.cache is not None:
+            cached = self.cache.get(image, tag)
+            if cached is not None:
+                if cached.digest is None:
+                    return ManifestProbe(exists=False, status_code=404)
+                return ManifestProbe(exists=True, status_code=200, digest=cached.digest, media_type=cached.media_type)
+        probe = await self._probe(image, tag)
+        if self.cache is not None:
+            if probe.exists and probe.digest:
+                self.cache.put(image, tag, CacheEntry(digest=probe.digest, media_type=probe.media_type))
+            elif probe.status_code == 404:
+                self.cache.put(image, tag, CacheEntry(digest=None))
+        return probe
+
+    async def _probe(self, image: str, tag: str) -> ManifestProbe:
+        repository = image.replace("quay.io/", "")
+        url = f"{self.registry_url}/v2/{repository}/manifests/{tag}"
+        try:
+            status, headers = await self._send("HEAD", repository, url)
+            if status == 200 and not headers.get("Docker-Content-Digest"):
+                status, headers = await self._send("GET", repository, url)
+        except Exception as e:
+            logger.error(f"Error probing image {image}:{tag}: {e}")
+            return ManifestProbe(exists=False)
+
+        if status != 200:
+            return ManifestProbe(exists=False, status_code=status)
+        digest = headers.get("Docker-Content-Digest")
+        if not digest:
+            logger.warning(f"No digest found in headers for {image}:{tag}")
+        return ManifestProbe(exists=True, status_code=status, digest=digest, media_type=headers.get("Content-Type"))
+
+    async def _send(self, method: str, repository: str, url: str) -> tuple[int, Mapping[str, str]]:
+        sent = await self._authorization(repository)
+        status, headers = await self._request(method, url, sent)
+        if status == 401 and self.tokens.challenge(repository, headers.get("WWW-Authenticate"), sent):
+            status, headers = await self._request(method, url, await self._authorization(repository))
+        return status, headers
+
+    # retries connection errors and RETRY_STATUSES with the threaded client's policy, since
+    # aiohttp has no retries of its own; the last status is returned once the retries are spent
+    async def _request(self, method: str, url: str, auth: dict[str, str]) -> tuple[int, Mapping[str, str]]:
+        for attempt in range(self.retries + 1):
+            error, status, headers = None, None, {}
+            try:
+                async with self.limiter.limit(url):
+                    async with self.session.request(method, url, headers={"Accept": MANIFEST_ACCEPT, **auth}) as response:
+                        status, headers = response.status, response.headers.copy()
+            except (aiohttp.ClientError, TimeoutError) as e:
+                error = e
+            if error is None and status not in RETRY_STATUSES:
+                return status, headers
+            if attempt == self.retries:
+                break
+            delay = retry_after(headers) if status in RETRY_AFTER_STATUSES else None
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_factor, self.backoff_jitter)
+            logger.warning(f"Registry request {method} {url} failed ({error or status}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return status, headers
+
+    async def _authorization(self, repository: str) -> dict[str, str]:
+        scope = self.tokens.scope(repository)
+        if scope is None:
+            return {}
+        async with self.tokens.flight(scope):
+            token = self.tokens.get(scope) or await self._fetch_token(scope)
+            if token is None:
+                return {}
+            self.tokens.put(scope, token)
+        return {"Authorization": f"Bearer {token.value}"}
+
+    async def _fetch_token(self, scope: TokenScope) -> BearerToken | None:
+        params = {k: v for k, v in (("service", scope.service), ("scope", scope.scope)) if v}
+        try:
+            async with self.limiter.limit(scope.realm):
+                async with self.session.get(scope.realm, params=params, auth=self.auth) as response:
+                    if response.status != 200:
+                        logger.warning(f"Failed to obtain registry token from {scope.realm} (status code {response.status})")
+                        return None
+                    return parse_token(scope, await response.json())
+        except Exception as e:
+            logger.error(f"Error obtaining registry token from {scope.realm}: {e}")
+            return None
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    try:
+        return max(float(headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None
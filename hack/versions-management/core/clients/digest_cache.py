@@ -0,0 +1,86 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = "digests.sqlite"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    digest: str | None  # None records a tag known not to exist
+    media_type: str | None = None
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    entries: int
+
+
+# latest-<sha> tags are immutable, so a resolved digest never goes stale and is kept until
+# evicted; a missing tag may still get pushed, so negative entries expire after negative_ttl
+class DigestCache:
+    def __init__(self, cache_dir: str, max_entries: int = 10000, negative_ttl: float = 600):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path: str = os.path.join(cache_dir, CACHE_FILE_NAME)
+        self.max_entries: int = max_entries
+        self.negative_ttl: float = negative_ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "image TEXT NOT NULL, tag TEXT NOT NULL, digest TEXT, media_type TEXT, "
+                "stored_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (image, tag))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS digests_last_used ON digests (last_used)")
+
+    def get(self, image: str, tag: str) -> CacheEntry | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT digest, media_type, stored_at FROM digests WHERE image = ? AND tag = ?", (image, tag)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            digest, media_type, stored_at = row
+            if digest is None and now - stored_at > self.negative_ttl:
+                self._conn.execute("DELETE FROM digests WHERE image = ? AND tag = ?", (image, tag))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE digests SET last_used = ? WHERE image = ? AND tag = ?", (now, image, tag))
+            self.hits += 1
+            return CacheEntry(digest=digest, media_type=media_type)
+
+    def put(self, image: str, tag: str, entry: CacheEntry) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO digests (image, tag, digest, media_type, stored_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (image, tag, entry.digest, entry.media_type, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM digests").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM digests WHERE rowid IN (SELECT rowid FROM digests ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM digests").fetchone()
+            return CacheStats(hits=self.hits, misses=self.misses, entries=count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,84 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from core.utils.deadline import DeadlineExceeded, current_deadline
+
+logger = logging.getLogger(__name__)
+
+GITHUB_REMOTE = "https://github.com/{repo}.git"
+# branches and tags only; a mirror clone would also copy every refs/pull/* of the repository
+REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+# seconds a clone or fetch may take, less when the caller's deadline is closer
+DEFAULT_TIMEOUT = 600
+
+
+# bare mirrors of the component repositories, kept in a cache directory and fetched incrementally
+# once per run, so commit lists and tag lookups are answered locally without API calls
+class GitMirrorClient:
+    def __init__(self, cache_dir: str, remote_url: str = GITHUB_REMOTE, timeout: float = DEFAULT_TIMEOUT):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir: str = cache_dir
+        self.remote_url: str = remote_url
+        self.timeout: float = timeout
+        self._synced: set[str] = set()
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def commit_shas(self, repo: str, count: int) -> list[str]:
+        output = self._git(repo, "rev-list", f"--max-count={count}", "HEAD")
+        return output.split()
+
+    def list_tags(self, repo: str, prefix: str = "") -> set[str]:
+        # show-ref exits with 1 when the repository has no tags at all
+        output = self._git(repo, "show-ref", "--tags", ok_codes=(0, 1))
+        tags = {line.split(" ", 1)[1].removeprefix("refs/tags/") for line in output.splitlines()}
+        return {tag for tag in tags if tag.startswith(prefix)}
+
+    def mirror_path(self, repo: str) -> str:
+        return os.path.join(self.cache_dir, f"{repo}.git")
+
+    def sync(self, repo: str) -> str:
+        with self._lock:
+            lock = self._locks.setdefault(repo, threading.Lock())
+        with lock:
+            path = self.mirror_path(repo)
+            if repo in self._synced:
+                return path
+            url = self.remote_url.format(repo=repo)
+            if os.path.isdir(path):
+                logger.info(f"Fetching mirror of {repo}")
+                self._run(repo, "fetch", ["git", "--git-dir", path, "fetch", "--prune", "--quiet", url, *REFSPECS])
+            else:
+                logger.info(f"Cloning mirror of {repo}")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # a bare clone copies branches and tags only; cloned aside, so a clone that is killed
+                # or times out does not leave a broken mirror behind
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                try:
+                    self._run(repo, "clone", ["git", "clone", "--bare", "--quiet", url, tmp_path])
+                    os.replace(tmp_path, path)
+                finally:
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+            self._synced.add(repo)
+            return path
+
+    def _git(self, repo: str, *args: str, ok_codes: tuple[int, ...] = (0,)) -> str:
+        path = self.sync(repo)
+        return self._run(repo, args[0], ["git", "--git-dir", path, *args], ok_codes)
+
+    def _run(self, repo: str, action: str, command: list[str], ok_codes: tuple[int, ...] = (0,)) -> str:
+        deadline = current_deadline()
+        remaining = deadline.remaining() if deadline else None
+        timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(deadline.reason) from e
+            raise Exception(f"git {action} timed out for {repo} after {timeout:.0f}s") from e
+        if result.returncode not in ok_codes:
+            raise Exception(f"git {action} failed for {repo}: {result.stderr.strip()}")
+        return result.stdout
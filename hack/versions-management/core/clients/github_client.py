@@ -1,20 +1,121 @@
 import os
 import logging
+import threading
+from dataclasses import dataclass
 from github import Github, GithubIntegration, Repository
+
+from core.clients.github_http_cache import HttpCache, HttpCacheStats
+from core.clients.github_rate_limit import DEFAULT_FLOOR, DEFAULT_MAX_WAIT, RateLimitTracker
+from core.clients.github_token_cache import InstallationTokenAuth, InstallationTokenProvider
+from core.clients.github_transport import DeadlineRetry, GitHubTransport
+
 logger = logging.getLogger(__name__)
 
+# the API maximum, so listings take as few pages as possible
+PAGE_SIZE = 100
+
+REPOSITORY_HEAD_FIELDS = """
+    latestRelease { tagName }
+    defaultBranchRef { target { ... on Commit { history(first: $count) { nodes { oid } } } } }
+"""
+
+
+# what discovery reads from a repository: its latest release, None when it has none, and newest
+# default-branch commits
+@dataclass(frozen=True)
+class RepositoryHead:
+    latest_release: str | None
+    commit_shas: list[str]
+
+
+def installation_token_provider() -> InstallationTokenProvider:
+    app_id = os.getenv("GITHUB_APP_ID")
+    install_id = os.getenv("GITHUB_APP_INSTALLATION_ID")
+    private_key = os.getenv("GITHUB_APP_PRIVATE_KEY")
+    if not (app_id and install_id and private_key):
+        logger.error("GitHub credentials env vars are mandatory")
+        raise EnvironmentError("Missing GitHub App credentials")
+    integration = GithubIntegration(int(app_id), private_key)
+    return InstallationTokenProvider(integration, int(install_id), os.getenv("GITHUB_TOKEN_CACHE_FILE"))
+
 
 class GitHubClient:
     def __init__(self):
-        app_id = os.getenv("GITHUB_APP_ID")
-        install_id = os.getenv("GITHUB_APP_INSTALLATION_ID")
-        private_key = os.getenv("GITHUB_APP_PRIVATE_KEY")
-        if not (app_id and install_id and private_key):
-            logger.error("GitHub credentials env vars are mandatory")
-            raise EnvironmentError("Missing GitHub App credentials")
-        integration = GithubIntegration(int(app_id), private_key)
-        token = integration.get_access_token(int(install_id)).token
-        self.client: Github = Github(token)
+        self.tokens: InstallationTokenProvider = installation_token_provider()
+        # conditional requests are only sent when a persistent cache directory is configured
+        cache_dir = os.getenv("GITHUB_HTTP_CACHE_DIR")
+        floor = int(os.getenv("GITHUB_RATE_LIMIT_FLOOR", DEFAULT_FLOOR))
+        max_wait = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", DEFAULT_MAX_WAIT))
+        self.transport: GitHubTransport = GitHubTransport(
+            HttpCache(cache_dir) if cache_dir else None, RateLimitTracker(floor, max_wait)
+        )
+        self._local: threading.local = threading.local()
 
+    # PyGithub keeps the request in flight on its connection, which is not safe to share between
+    # threads, so every worker thread talks through its own client; token, transport and cache are shared
+    @property
+    def client(self) -> Github:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = Github(auth=InstallationTokenAuth(self.tokens), per_page=PAGE_SIZE, retry=DeadlineRetry())
+            self.transport.install(client)
+            self._local.client = client
+            self._local.repos = {}
+        return client
+
+    @property
+    def token(self) -> str:
+        return self.tokens.token()
+
+    # repository handles send through the client they came from, so they are memoized per thread,
+    # for the lifetime of the client, i.e. the service run; workers each handle whole repositories
     def get_repo(self, full_name: str) -> Repository.Repository:
-        return self.client.get_repo(full_name)
+        client = self.client
+        repo = self._local.repos.get(full_name)
+        if repo is None:
+            repo = client.get_repo(full_name)
+            self._local.repos[full_name] = repo
+        return repo
+
+    # one paginated matching-refs listing instead of a get_git_ref lookup per tag
+    def list_tags(self, full_name: str, prefix: str = "") -> set[str]:
+        refs = self.get_repo(full_name).get_git_matching_refs(f"tags/{prefix}")
+        return {ref.ref.removeprefix("refs/tags/") for ref in refs}
+
+    # every repository in a single aliased GraphQL query instead of REST round trips per repository
+    def get_repository_heads(self, full_names: list[str], commit_count: int) -> dict[str, RepositoryHead]:
+        variables: dict[str, str | int] = {"count": commit_count}
+        declarations = ["$count: Int!"]
+        fields = []
+        for i, full_name in enumerate(full_names):
+            owner, name = full_name.split("/", 1)
+            variables[f"owner{i}"] = owner
+            variables[f"name{i}"] = name
+            declarations += [f"$owner{i}: String!", f"$name{i}: String!"]
+            fields.append(f"r{i}: repository(owner: $owner{i}, name: $name{i}) {{{REPOSITORY_HEAD_FIELDS}}}")
+        query = f"query({', '.join(declarations)}) {{\n{chr(10).join(fields)}\n}}"
+        _, data = self.client.requester.graphql_query(query, variables)
+
+        heads: dict[str, RepositoryHead] = {}
+        for i, full_name in enumerate(full_names):
+            repository = data["data"][f"r{i}"]
+            if repository is None:
+                raise Exception(f"Repository {full_name} not found")
+            release = repository["latestRelease"]
+            branch = repository["defaultBranchRef"]
+            commits = branch["target"]["history"]["nodes"] if branch else []
+            heads[full_name] = RepositoryHead(
+                latest_release=release["tagName"] if release else None,
+                commit_shas=[commit["oid"] for commit in commits],
+            )
+        return heads
+
+    def api_calls(self) -> dict[str, int]:
+        return self.transport.api_calls()
+
+    # budget per rate-limit resource: limit, remaining, reset and what this run spent
+    def rate_limit_usage(self) -> dict[str, dict[str, int | float]]:
+        return self.transport.rate_limits.usage()
+
+    def cache_stats(self) -> HttpCacheStats | None:
+        return self.transport.cache.stats() if self.transport.cache else None
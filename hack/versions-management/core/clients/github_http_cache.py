@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Mapping
+
+CACHE_FILE_NAME = "github.sqlite"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: str
+    headers: dict[str, str]
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True)
+class HttpCacheStats:
+    hits: int  # a validator was found and a conditional request sent
+    not_modified: int  # the server answered 304 and the body was served from the cache
+    misses: int
+    entries: int
+
+
+# GitHub does not count a 304 against the primary rate limit, so every cacheable GET response is
+# stored with its validators and replayed when the server confirms it has not changed
+class HttpCache:
+    def __init__(self, cache_dir: str, max_entries: int = 10000):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path: str = os.path.join(cache_dir, CACHE_FILE_NAME)
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.not_modified: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._conn: sqlite3.Connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, headers TEXT NOT NULL, body TEXT NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, url: str) -> CachedResponse | None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            etag, last_modified, headers, body = row
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self.hits += 1
+            return CachedResponse(body=body, headers=json.loads(headers), etag=etag, last_modified=last_modified)
+
+    # stores a 200 response if it carries a validator; returns whether it was stored
+    def store(self, url: str, headers: Mapping[str, str], body: str) -> bool:
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, headers, body, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(dict(headers)), body, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        return True
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> HttpCacheStats:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            return HttpCacheStats(hits=self.hits, not_modified=self.not_modified, misses=self.misses, entries=count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Mapping
+
+from core.utils.deadline import check_wait
+
+logger = logging.getLogger(__name__)
+
+# requests left in a window below which dispatch waits for the window to reset
+DEFAULT_FLOOR = 100
+# GitHub asks to wait at least a minute after a secondary limit without Retry-After
+SECONDARY_RATE_WAIT = 60
+# longest a single dispatch may wait for its budget before the request fails instead
+DEFAULT_MAX_WAIT = 600
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+@dataclass
+class RateLimitBudget:
+    resource: str
+    limit: int
+    remaining: int
+    reset: float
+    spent: int = 0  # requests charged to the resource during this run
+
+
+# budget per rate-limit resource, fed from the X-RateLimit-* headers of every response; once a
+# resource gets within twice the floor, dispatch is paced evenly over the rest of the window,
+# and at the floor it waits for the reset, unless that is further away than max_wait
+class RateLimitTracker:
+    def __init__(self, floor: int = DEFAULT_FLOOR, max_wait: float = DEFAULT_MAX_WAIT):
+        self.floor: int = floor
+        self.max_wait: float = max_wait
+        self.budgets: dict[str, RateLimitBudget] = {}
+        self.throttled: float = 0.0
+        self._next_dispatch: dict[str, float] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def update(self, headers: Mapping[str, str], status: int) -> None:
+        try:
+            resource = headers.get("X-RateLimit-Resource", "core")
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = float(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            budget = self.budgets.get(resource)
+            charged = 0 if status == 304 else 1
+            if budget is None:
+                self.budgets[resource] = RateLimitBudget(resource, limit, remaining, reset, spent=charged)
+            elif reset != budget.reset:
+                if reset > budget.reset:
+                    budget.limit, budget.remaining, budget.reset = limit, remaining, reset
+                    budget.spent += charged
+            elif remaining < budget.remaining:
+                # responses of concurrent requests arrive out of order, the lowest count is the newest
+                budget.spent += budget.remaining - remaining
+                budget.remaining = remaining
+
+    # seconds the caller must wait before sending a request charged to resource
+    def reserve(self, resource: str) -> float:
+        now = time.time()
+        with self._lock:
+            budget = self.budgets.get(resource)
+            start = max(now, self._next_dispatch.get(resource, now))
+            next_dispatch = None
+            if budget is not None and budget.reset > start:
+                headroom = budget.remaining - self.floor
+                if headroom <= 0:
+                    start = budget.reset
+                elif budget.remaining < 2 * self.floor:
+                    next_dispatch = start + (budget.reset - start) / headroom
+            wait = start - now
+            # nothing is reserved when the wait is refused, so the requests behind are not pushed back
+            check_wait(wait)
+            if wait > self.max_wait:
+                raise RateLimitExceeded(
+                    f"GitHub {resource} rate limit needs a {wait:.0f}s wait, more than the {self.max_wait:.0f}s allowed"
+                )
+            if next_dispatch is not None:
+                self._next_dispatch[resource] = next_dispatch
+            self.throttled += wait
+        if wait > 0:
+            logger.warning(f"GitHub {resource} rate limit near its floor, waiting {wait:.1f}s")
+        return wait
+
+    def throttle(self, resource: str) -> None:
+        wait = self.reserve(resource)
+        if wait > 0:
+            time.sleep(wait)
+
+    def usage(self) -> dict[str, dict[str, int | float]]:
+        with self._lock:
+            return {resource: asdict(budget) for resource, budget in self.budgets.items()}
+
+
+def resource_for(url: str) -> str:
+    return "graphql" if url.rstrip("/").endswith("/graphql") else "core"
+
+
+# seconds to wait before retrying a rate limited response, None when it is not rate limited
+def retry_delay(status: int, headers: Mapping[str, str], body: str, attempt: int) -> float | None:
+    if status not in (403, 429):
+        return None
+    if headers.get("Retry-After"):
+        return float(headers["Retry-After"])
+    if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+    if status == 429 or "secondary rate limit" in body.lower():
+        return SECONDARY_RATE_WAIT * 2**attempt
+    return None
@@ -0,0 +1,110 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from github import Auth, GithubIntegration
+
+logger = logging.getLogger(__name__)
+
+# installation tokens live for an hour; one is replaced once it has less than this left
+REFRESH_MARGIN = 300
+
+
+@dataclass(frozen=True)
+class InstallationToken:
+    token: str
+    expires_at: float
+
+    def fresh(self, margin: float) -> bool:
+        return self.expires_at - margin > time.time()
+
+
+# installation tokens shared by every process of a job through a locked cache file, so the
+# services and the shell wrappers reuse one token instead of each minting their own
+class InstallationTokenProvider:
+    def __init__(
+        self,
+        integration: GithubIntegration,
+        installation_id: int,
+        cache_file: str | None = None,
+        refresh_margin: float = REFRESH_MARGIN,
+    ):
+        self.integration: GithubIntegration = integration
+        self.installation_id: int = installation_id
+        self.cache_file: str | None = cache_file
+        self.refresh_margin: float = refresh_margin
+        self.mints: int = 0
+        self._current: InstallationToken | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def token(self) -> str:
+        current = self._current
+        if current and current.fresh(self.refresh_margin):
+            return current.token
+        with self._lock:
+            if self._current is None or not self._current.fresh(self.refresh_margin):
+                self._current = self._load_or_mint()
+            return self._current.token
+
+    def _load_or_mint(self) -> InstallationToken:
+        if self.cache_file is None:
+            return self._mint()
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        # the file lock makes concurrent processes wait for the one minting a token
+        with open(f"{self.cache_file}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                cached = self._read()
+                if cached and cached.fresh(self.refresh_margin):
+                    return cached
+                token = self._mint()
+                self._write(token)
+                return token
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> InstallationToken | None:
+        if not os.path.isfile(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+            if data["installation_id"] != self.installation_id:
+                return None
+            return InstallationToken(token=data["token"], expires_at=float(data["expires_at"]))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable token cache {self.cache_file}: {e}")
+            return None
+
+    def _write(self, token: InstallationToken) -> None:
+        tmp_path = f"{self.cache_file}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"installation_id": self.installation_id, "token": token.token, "expires_at": token.expires_at}, f)
+        os.replace(tmp_path, self.cache_file)
+
+    def _mint(self) -> InstallationToken:
+        try:
+            authorization = self.integration.get_access_token(self.installation_id)
+        except Exception as e:
+            raise Exception(f"Failed to obtain GitHub installation token: {e}") from e
+        self.mints += 1
+        return InstallationToken(token=authorization.token, expires_at=authorization.expires_at.timestamp())
+
+
+# PyGithub authentication reading the provider on every request, so long runs pick up refreshed tokens
+class InstallationTokenAuth(Auth.Auth):
+    def __init__(self, provider: InstallationTokenProvider):
+        self.provider: InstallationTokenProvider = provider
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        return self.provider.token()
@@ -0,0 +1,129 @@
+import threading
+from collections import Counter
+from functools import partial
+from importlib.metadata import version
+from typing import Any, Mapping
+from urllib.parse import urlsplit
+
+import requests
+from github import Github, GithubRetry
+from github.Requester import HTTPSRequestsConnectionClass
+from requests import PreparedRequest
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3 import BaseHTTPResponse
+
+from core.clients.github_http_cache import CachedResponse, HttpCache
+from core.clients.github_rate_limit import RateLimitTracker, resource_for
+from core.utils.deadline import check_wait
+
+CONNECTION_CLASS = "_Requester__connectionClass"
+
+
+# every REST call PyGithub makes is sent through this adapter, which paces it against the rate
+# limit, reports it to the transport and answers unchanged GETs from the cache; DeadlineRetry
+# retries secondary limits below it, so a call is paced and counted once however many attempts it took
+class MeteredAdapter(HTTPAdapter):
+    def __init__(self, transport: "GitHubTransport", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.transport: GitHubTransport = transport
+
+    def send(self, request: PreparedRequest, stream: bool = False, **kwargs: Any) -> requests.Response:
+        path = request_path(request.url)
+        self.transport.rate_limits.throttle(resource_for(path))
+        cache = self.transport.cache if request.method == "GET" and not stream else None
+        cached = cache.get(path) if cache else None
+        if cached:
+            request.headers.update(cached.conditional_headers())
+        response = super().send(request, stream=stream, **kwargs)
+        self.transport.record(request.method, path, response.status_code, response.headers)
+        if cache is None:
+            return response
+        if response.status_code == 304 and cached:
+            cache.record_not_modified()
+            return replayed(cached, response)
+        if response.status_code == 200:
+            cache.store(path, response.headers, response.text)
+        return response
+
+
+# PyGithub builds the session of each connection itself, so the connection only mounts the
+# metered adapter on it, with the retry policy and pool size PyGithub configured
+class MeteredConnection(HTTPSRequestsConnectionClass):
+    def __init__(self, transport: "GitHubTransport", *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.transport: GitHubTransport = transport
+        self.adapter = MeteredAdapter(
+            transport, max_retries=self.retry, pool_connections=self.pool_size, pool_maxsize=self.pool_size
+        )
+        self.session.mount("https://", self.adapter)
+
+
+# PyGithub's retries, except that a wait that would outlast the calling thread's deadline fails
+# the request instead of holding its worker
+class DeadlineRetry(GithubRetry):
+    def sleep(self, response: BaseHTTPResponse | None = None) -> None:
+        retry_after = self.get_retry_after(response) if response and self.respect_retry_after_header else None
+        check_wait(retry_after if retry_after is not None else self.get_backoff_time())
+        super().sleep(response)
+
+
+# a cached body replayed as the 200 PyGithub expects, with the fresh headers of the 304
+def replayed(cached: CachedResponse, not_modified: requests.Response) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers = CaseInsensitiveDict({**cached.headers, **not_modified.headers})
+    response._content = cached.body.encode()
+    response.encoding = "utf-8"
+    response.url = not_modified.url
+    response.request = not_modified.request
+    return response
+
+
+class GitHubTransport:
+    def __init__(self, cache: HttpCache | None = None, rate_limits: RateLimitTracker | None = None):
+        self.calls: Counter[str] = Counter()
+        self.cache: HttpCache | None = cache
+        self.rate_limits: RateLimitTracker = rate_limits or RateLimitTracker()
+        self._lock: threading.Lock = threading.Lock()
+
+    def install(self, client: Github) -> None:
+        # PyGithub has no public per-client hook for the session its connection builds, so the
+        # connection class is swapped on the requester; fail loudly should a release rename it
+        if not hasattr(client.requester, CONNECTION_CLASS):
+            raise RuntimeError(f"PyGithub {version('PyGithub')} has no {CONNECTION_CLASS}, cannot meter its requests")
+        setattr(client.requester, CONNECTION_CLASS, partial(MeteredConnection, self))
+
+    def record(self, verb: str, url: str, status: int, headers: Mapping[str, str] | None = None) -> None:
+        with self._lock:
+            self.calls[endpoint(verb, url)] += 1
+        if headers is not None:
+            self.rate_limits.update(headers, status)
+
+    def api_calls(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+
+# "https://api.github.com:443/repos/o/r/commits?per_page=100" -> "/repos/o/r/commits?per_page=100",
+# the key the asyncio client caches under as well
+def request_path(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+# "GET /repos/openshift/assisted-service/git/ref/tags/v1" -> "GET /repos/{owner}/{repo}/git/ref/{ref}"
+def endpoint(verb: str, url: str) -> str:
+    parts = urlsplit(url).path.strip("/").split("/")
+    if parts[0] == "repos" and len(parts) >= 3:
+        parts[1:3] = ["{owner}", "{repo}"]
+    if "git" in parts:
+        kind = parts.index("git") + 1
+        if len(parts) > kind + 1:
+            parts[kind + 1:] = ["{ref}"]
+    return f"{verb} /{'/'.join(parts)}"
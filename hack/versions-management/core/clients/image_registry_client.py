@@ -1,31 +1,121 @@
-import requests
 import logging
+import os
+import random
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.clients.digest_cache import CacheEntry, DigestCache
+from core.clients.registry_auth import RegistryTokenProvider
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_ACCEPT = "application/vnd.docker.distribution.manifest.v2+json"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# statuses whose Retry-After header replaces the backoff, as urllib3 honours it
+RETRY_AFTER_STATUSES = (429, 503)
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.5
+BACKOFF_MAX = 120
+QUAY_PREFIX = "quay.io/"
+QUAY_PAGE_LIMIT = 100
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    connections_opened: int
+    requests: int
+
+    @property
+    def connections_reused(self) -> int:
+        return self.requests - self.connections_opened
+
+
+@dataclass(frozen=True)
+class ManifestProbe:
+    exists: bool
+    status_code: int | None = None
+    digest: str | None = None
+    media_type: str | None = None
+
+
+# only idempotent methods are retried; the jitter keeps the workers from hammering the
+# registry in lockstep after a transient failure
+def registry_retry(
+    retries: int = RETRIES, backoff_factor: float = BACKOFF_FACTOR, backoff_jitter: float = BACKOFF_JITTER
+) -> Retry:
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        allowed_methods=frozenset({"HEAD", "GET"}),
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        backoff_max=BACKOFF_MAX,
+        raise_on_status=False,
+    )
+
+
+# urllib3's schedule for the clients without an adapter: no wait before the first retry,
+# then backoff_factor * 2^n plus up to backoff_jitter seconds
+def backoff_delay(
+    retries_done: int, backoff_factor: float = BACKOFF_FACTOR, backoff_jitter: float = BACKOFF_JITTER
+) -> float:
+    if retries_done == 0:
+        return 0.0
+    return min(backoff_factor * 2**retries_done + random.random() * backoff_jitter, BACKOFF_MAX)
+
 
 class ImageRegistryClient:
-    def __init__(self, registry_url: str = "https://quay.io"):
+    def __init__(
+        self,
+        registry_url: str = "https://quay.io",
+        pool_size: int = 8,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        retries: int = RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        backoff_jitter: float = BACKOFF_JITTER,
+        cache: DigestCache | None = None,
+        credentials: tuple[str, str] | None = None,
+        quay_api_token: str | None = None,
+    ):
         self.registry_url: str = registry_url
+        self.cache: DigestCache | None = cache
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.retry: Retry = registry_retry(retries, backoff_factor, backoff_jitter)
+        # pool_block caps open connections at pool_size, extra callers wait for a free one
+        self.adapter: HTTPAdapter = HTTPAdapter(pool_maxsize=pool_size, pool_block=True, max_retries=self.retry)
+        self.session: requests.Session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.auth: RegistryTokenProvider = RegistryTokenProvider(self.session, self.timeout, credentials)
+        # Quay's REST API takes an OAuth application token, not the registry's bearer tokens;
+        # without one only public repositories can be listed through it
+        self.quay_api_token: str | None = quay_api_token or os.getenv("QUAY_API_TOKEN")
 
     def exists(self, image: str, tag: str) -> bool:
-        path = image.replace("quay.io/", "")
-        url = f"{self.registry_url}/v2/{path}/manifests/{tag}"
-        headers = {"Accept": "application/vnd.docker.distribution.manifest.v2+json"}
+        url = self._manifest_url(image, tag)
+        headers = {"Accept": MANIFEST_ACCEPT}
         try:
-            response = requests.head(url=url, headers=headers, timeout=10)
+            response = self._send("HEAD", image, url, headers)
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Error checking image {image} existence: {e}")
             return False
 
     def resolve_digest(self, image: str, tag: str) -> str | None:
-        path = image.replace("quay.io/", "")
-        url = f"{self.registry_url}/v2/{path}/manifests/{tag}"
-        headers = {"Accept": "application/vnd.docker.distribution.manifest.v2+json"}
+        url = self._manifest_url(image, tag)
+        headers = {"Accept": MANIFEST_ACCEPT}
 
         try:
-            response = requests.get(url=url, headers=headers, timeout=10)
+            response = self._send("GET", image, url, headers)
             if response.status_code == 200:
                 digest = response.headers.get("Docker-Content-Digest")
                 if digest:
@@ -37,3 +127,147 @@ class ImageRegistryClient:
         except Exception as e:
             logger.error(f"Error resolving digest for {image}:{tag}: {e}")
         return None
+
+    def probe(self, image: str, tag: str) -> ManifestProbe:
+        if self.cache is None:
+            return self._probe(image, tag)
+        cached = self.cache.get(image, tag)
+        if cached is not None:
+            if cached.digest is None:
+                return ManifestProbe(exists=False, status_code=404)
+            return ManifestProbe(exists=True, status_code=200, digest=cached.digest, media_type=cached.media_type)
+        probe = self._probe(image, tag)
+        # only definitive answers are cached, errors and throttling are retried on the next run
+        if probe.exists and probe.digest:
+            self.cache.put(image, tag, CacheEntry(digest=probe.digest, media_type=probe.media_type))
+        elif probe.status_code == 404:
+            self.cache.put(image, tag, CacheEntry(digest=None))
+        return probe
+
+    def _probe(self, image: str, tag: str) -> ManifestProbe:
+        url = self._manifest_url(image, tag)
+        headers = {"Accept": MANIFEST_ACCEPT}
+        try:
+            response = self._send("HEAD", image, url, headers)
+            if response.status_code == 200 and not response.headers.get("Docker-Content-Digest"):
+                # some registries omit the digest on HEAD, only then pay for the manifest body
+                logger.debug(f"No digest in HEAD response for {image}:{tag}, falling back to GET")
+                response = self._send("GET", image, url, headers)
+        except Exception as e:
+            logger.error(f"Error probing image {image}:{tag}: {e}")
+            return ManifestProbe(exists=False)
+
+        if response.status_code != 200:
+            return ManifestProbe(exists=False, status_code=response.status_code)
+        digest = response.headers.get("Docker-Content-Digest")
+        if not digest:
+            logger.warning(f"No digest found in headers for {image}:{tag}")
+        return ManifestProbe(
+            exists=True,
+            status_code=response.status_code,
+            digest=digest,
+            media_type=response.headers.get("Content-Type"),
+        )
+
+    def list_tags(self, image: str, prefix: str = "", page_size: int = 1000) -> set[str] | None:
+        url: str | None = f"{self.registry_url}/v2/{self._repository_path(image)}/tags/list"
+        params: dict[str, int] | None = {"n": page_size}
+        tags: set[str] = set()
+        pages = 0
+        try:
+            while url:
+                response = self._send("GET", image, url, {"Accept": "application/json"}, params=params)
+                if response.status_code != 200:
+                    logger.warning(f"Failed to list tags of {image} (status code {response.status_code})")
+                    return None
+                pages += 1
+                tags.update(t for t in response.json().get("tags") or [] if t.startswith(prefix))
+                # the registry paginates through a Link header that already carries n and last
+                next_url = response.links.get("next", {}).get("url")
+                url = urljoin(url, next_url) if next_url else None
+                params = None
+        except Exception as e:
+            logger.error(f"Error listing tags of {image}: {e}")
+            return None
+        logger.debug(f"Listed {len(tags)} tags matching '{prefix}' for {image} in {pages} pages")
+        return tags
+
+    # maps every tag matching the prefix to its digest, when the backend can report it inline
+    def list_tag_digests(self, image: str, prefix: str = "") -> dict[str, str | None] | None:
+        if image.startswith(QUAY_PREFIX):
+            digests = self._list_quay_tag_digests(image, prefix)
+            if digests is not None:
+                return digests
+            logger.warning(f"Quay tag API unavailable for {image}, falling back to the registry tag list")
+        tags = self.list_tags(image, prefix)
+        return None if tags is None else dict.fromkeys(tags)
+
+    def _list_quay_tag_digests(self, image: str, prefix: str) -> dict[str, str | None] | None:
+        url = f"{self.registry_url}/api/v1/repository/{self._repository_path(image)}/tag/"
+        digests: dict[str, str | None] = {}
+        headers = {"Accept": "application/json"}
+        if self.quay_api_token:
+            headers["Authorization"] = f"Bearer {self.quay_api_token}"
+        page = 1
+        try:
+            while True:
+                params = {
+                    "filter_tag_name": f"like:{prefix}%",
+                    "onlyActiveTags": "true",
+                    "limit": QUAY_PAGE_LIMIT,
+                    "page": page,
+                }
+                response = self.session.get(url=url, params=params, headers=headers, timeout=self.timeout)
+                if response.status_code in (401, 403):
+                    logger.warning(
+                        f"Quay API denied listing tags of {image} (status code {response.status_code}), "
+                        f"{'check' if self.quay_api_token else 'set'} QUAY_API_TOKEN"
+                    )
+                    return None
+                if response.status_code != 200:
+                    logger.warning(f"Failed to list quay tags of {image} (status code {response.status_code})")
+                    return None
+                body = response.json()
+                for tag in body.get("tags") or []:
+                    # LIKE treats '_' as a wildcard, so the prefix is checked again here
+                    if tag["name"].startswith(prefix):
+                        digests[tag["name"]] = tag.get("manifest_digest")
+                if not body.get("has_additional"):
+                    break
+                page += 1
+        except Exception as e:
+            logger.error(f"Error listing quay tags of {image}: {e}")
+            return None
+        logger.debug(f"Listed {len(digests)} quay tags matching '{prefix}' for {image} in {page} pages")
+        return digests
+
+    def pool_stats(self) -> PoolStats:
+        opened = 0
+        sent = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            sent += pool.num_requests
+        return PoolStats(connections_opened=opened, requests=sent)
+
+    def close(self) -> None:
+        self.session.close()
+
+    # sends a registry request, answering a Bearer challenge once with a (cached) token
+    def _send(self, method: str, image: str, url: str, headers: dict[str, str], **kwargs) -> requests.Response:
+        send = self.session.head if method == "HEAD" else self.session.get
+        repository = self._repository_path(image)
+        sent = {**headers, **self.auth.authorization(repository)}
+        response = send(url=url, headers=sent, timeout=self.timeout, **kwargs)
+        if response.status_code == 401 and self.auth.handle_challenge(
+            repository, response.headers.get("WWW-Authenticate"), sent
+        ):
+            response = send(url=url, headers={**headers, **self.auth.authorization(repository)}, timeout=self.timeout, **kwargs)
+        return response
+
+    def _manifest_url(self, image: str, tag: str) -> str:
+        return f"{self.registry_url}/v2/{self._repository_path(image)}/manifests/{tag}"
+
+    def _repository_path(self, image: str) -> str:
+        return image.replace("quay.io/", "")
@@ -0,0 +1,147 @@
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# the token spec defaults to 60 seconds when the registry does not send expires_in
+DEFAULT_TOKEN_TTL = 60
+EXPIRY_MARGIN = 10
+CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+
+@dataclass(frozen=True)
+class TokenScope:
+    realm: str
+    service: str | None
+    scope: str | None
+
+
+@dataclass(frozen=True)
+class BearerToken:
+    value: str
+    expires_at: float
+
+
+def parse_challenge(header: str | None) -> TokenScope | None:
+    if not header or not header.lower().startswith("bearer "):
+        return None
+    params = dict(CHALLENGE_PARAM.findall(header))
+    if "realm" not in params:
+        return None
+    return TokenScope(realm=params["realm"], service=params.get("service"), scope=params.get("scope"))
+
+
+# Docker v2 token state shared by the threaded and asyncio clients: the Bearer challenge of
+# each repository and the tokens issued per (realm, service, scope) until shortly before
+# they expire; the clients only differ in how they fetch a token
+class TokenCache:
+    def __init__(self, flight_lock: Callable[[], Any] = threading.Lock):
+        self._flight_lock: Callable[[], Any] = flight_lock
+        self._scopes: dict[str, TokenScope] = {}
+        self._tokens: dict[TokenScope, BearerToken] = {}
+        self._flights: dict[TokenScope, Any] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def scope(self, repository: str) -> TokenScope | None:
+        return self._scopes.get(repository)
+
+    # the cached token of the scope, unless it is about to expire
+    def get(self, scope: TokenScope) -> BearerToken | None:
+        token = self._tokens.get(scope)
+        if token and token.expires_at - EXPIRY_MARGIN > time.time():
+            return token
+        return None
+
+    def put(self, scope: TokenScope, token: BearerToken) -> None:
+        with self._lock:
+            self._tokens[scope] = token
+
+    # single flight: concurrent callers of a scope wait for the first fetch instead of starting their own
+    def flight(self, scope: TokenScope):
+        with self._lock:
+            return self._flights.setdefault(scope, self._flight_lock())
+
+    # learns the scope of a 401 challenge, None when it is not a Bearer challenge
+    def challenge(self, repository: str, header: str | None, sent: Mapping[str, str]) -> TokenScope | None:
+        scope = parse_challenge(header)
+        if scope is None:
+            return None
+        with self._lock:
+            self._scopes[repository] = scope
+            # the token we sent was rejected (revoked or expired early), don't hand it out again
+            token = self._tokens.get(scope)
+            if token and sent.get("Authorization") == f"Bearer {token.value}":
+                del self._tokens[scope]
+        return scope
+
+
+class RegistryTokenProvider:
+    def __init__(
+        self,
+        session: requests.Session,
+        timeout: tuple[float, float],
+        credentials: tuple[str, str] | None = None,
+    ):
+        self.session: requests.Session = session
+        self.timeout: tuple[float, float] = timeout
+        if credentials is None:
+            username = os.getenv("REGISTRY_USERNAME")
+            password = os.getenv("REGISTRY_PASSWORD")
+            credentials = (username, password) if username and password else None
+        self.credentials: tuple[str, str] | None = credentials
+        self.fetches: int = 0
+        self.tokens: TokenCache = TokenCache()
+        self._lock: threading.Lock = threading.Lock()
+
+    def authorization(self, repository: str) -> dict[str, str]:
+        scope = self.tokens.scope(repository)
+        if scope is None:
+            return {}
+        token = self._token(scope)
+        return {"Authorization": f"Bearer {token.value}"} if token else {}
+
+    # returns True when the challenge was understood and a retry is worth it
+    def handle_challenge(self, repository: str, header: str | None, sent: dict[str, str]) -> bool:
+        scope = self.tokens.challenge(repository, header, sent)
+        return scope is not None and self._token(scope) is not None
+
+    def _token(self, scope: TokenScope) -> BearerToken | None:
+        token = self.tokens.get(scope)
+        if token:
+            return token
+        with self.tokens.flight(scope):
+            token = self.tokens.get(scope) or self._fetch(scope)
+            if token:
+                self.tokens.put(scope, token)
+            return token
+
+    def _fetch(self, scope: TokenScope) -> BearerToken | None:
+        params = {k: v for k, v in (("service", scope.service), ("scope", scope.scope)) if v}
+        try:
+            response = self.session.get(url=scope.realm, params=params, auth=self.credentials, timeout=self.timeout)
+            with self._lock:
+                self.fetches += 1
+            if response.status_code != 200:
+                logger.warning(f"Failed to obtain registry token from {scope.realm} (status code {response.status_code})")
+                return None
+            body = response.json()
+        except Exception as e:
+            logger.error(f"Error obtaining registry token from {scope.realm}: {e}")
+            return None
+        return parse_token(scope, body)
+
+
+def parse_token(scope: TokenScope, body: dict) -> BearerToken | None:
+    value = body.get("token") or body.get("access_token")
+    if not value:
+        logger.warning(f"No token in response from {scope.realm}")
+        return None
+    expires_in = body.get("expires_in") or DEFAULT_TOKEN_TTL
+    return BearerToken(value=value, expires_at=time.time() + expires_in)
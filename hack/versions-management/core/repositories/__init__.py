@@ -1,7 +1,13 @@
+from .discovery_journal_repository import DiscoveryJournalRepository
+from .reconciliation_journal_repository import ReconciliationJournalRepository
 from .release_candidates_repository import ReleaseCandidateRepository
+from .sharded_release_candidates_repository import ShardedReleaseCandidateRepository
 from .version_repository import VersionRepository
 
 __all__ = [
+    'DiscoveryJournalRepository',
+    'ReconciliationJournalRepository',
     'ReleaseCandidateRepository',
+    'ShardedReleaseCandidateRepository',
     'VersionRepository'
 ]
@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from pathlib import Path
+
+from core.models import Artifact
+
+
+# results of a discovery run, one JSON line per component appended as it completes, after a
+# header line with the signature of the components configuration the run was started with
+class DiscoveryJournalRepository:
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self._lock: threading.Lock = threading.Lock()
+
+    def start(self, signature: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        with self._lock, open(self.file_path, "w") as f:
+            f.write(json.dumps({"signature": signature}) + "\n")
+
+    # completed results of a journal started with the same signature, else nothing
+    def find_all(self, signature: str) -> dict[str, Artifact | None]:
+        if not os.path.isfile(path=Path(self.file_path)):
+            return {}
+        results: dict[str, Artifact | None] = {}
+        with self._lock, open(self.file_path, "r") as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get("signature") != signature:
+                return {}
+            for line in lines[1:]:
+                entry = json.loads(line)
+                results[entry["component"]] = Artifact(**entry["artifact"]) if entry["artifact"] else None
+        except Exception:
+            # a run killed mid-write leaves a truncated last line, everything before it still counts
+            pass
+        return results
+
+    def record(self, component: str, artifact: Artifact | None) -> None:
+        line = json.dumps({"component": component, "artifact": asdict(artifact) if artifact else None})
+        with self._lock, open(self.file_path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+
+    def clear(self) -> None:
+        with self._lock:
+            if os.path.isfile(self.file_path):
+                os.remove(self.file_path)
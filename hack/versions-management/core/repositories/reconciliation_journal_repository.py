@@ -0,0 +1,36 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+
+from core.models import Version
+
+
+# version name -> content hash of every version whose tags were all reconciled; kept in the CI cache
+class ReconciliationJournalRepository:
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+
+    def find_all(self) -> dict[str, str]:
+        if not os.path.isfile(path=Path(self.file_path)):
+            return {}
+        try:
+            with open(self.file_path, "r") as f:
+                return dict(json.load(f)["versions"])
+        except Exception as e:
+            raise ValueError(f"Invalid reconciliation journal {self.file_path}: {e}") from e
+
+    def save(self, entries: dict[str, str]) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"versions": entries}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            raise Exception(f"Error writing reconciliation journal: {e}") from e
+
+
+def version_hash(version: Version) -> str:
+    return hashlib.sha256(json.dumps(asdict(version), sort_keys=True).encode()).hexdigest()
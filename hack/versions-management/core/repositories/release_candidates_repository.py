@@ -5,28 +5,46 @@ from pathlib import Path
 from ruamel.yaml import YAML
 from core.models import Snapshot
 from core.models.wrappers import SnapshotsFile
+from core.repositories.snapshot_archive import RetentionPolicy, SnapshotArchive
 from core.utils.yaml_loader import get_yaml_instance
 
 
+# Lookups in a run share one parse of release-candidates.yaml: the snapshots and an index by id
+# are kept in memory until the file changes on disk. Services that need lookups without loading
+# the whole history use ShardedReleaseCandidateRepository.
 class ReleaseCandidateRepository:
-    def __init__(self, file_path: str):
+    def __init__(
+        self,
+        file_path: str,
+        archive_path: str | None = None,
+        retention: RetentionPolicy | None = None,
+    ):
         self.file_path: str = file_path
+        self.archive: SnapshotArchive = SnapshotArchive(
+            archive_path or f"{os.path.splitext(file_path)[0]}.archive.jsonl.gz"
+        )
+        # compacts the history after every save when set
+        self.retention: RetentionPolicy | None = retention
         self.yaml: YAML = get_yaml_instance()
+        self._loaded: tuple[int, int] | None = None  # size and mtime of the file the cache holds
+        self._snapshots: list[Snapshot] = []
+        self._by_id: dict[str, Snapshot] = {}
 
     def find_all(self) -> list[Snapshot]:
-        if not os.path.isfile(path=Path(self.file_path)):
-            return []
-        with open(self.file_path, "r") as f:
-            data = self.yaml.load(f)
-            try:
-                parsed = SnapshotsFile(**data)
-                return parsed.snapshots
-            except Exception as e:
-                raise ValueError(f"Invalid release-candidates.yaml: {e}") from e
+        return list(self._load())
 
     def find_by_id(self, id: str) -> Snapshot | None:
-        snapshots = self.find_all()
-        return next((s for s in snapshots if s.metadata.id == id), None)
+        self._load()
+        return self._by_id.get(id)
+
+    # snapshots with the given status, in file order (newest first)
+    def find_by_status(self, status: str) -> list[Snapshot]:
+        return [s for s in self._load() if s.metadata.status == status]
+
+    # the most recently generated snapshot with the given status
+    def find_latest(self, status: str) -> Snapshot | None:
+        snapshots = self.find_by_status(status)
+        return max(snapshots, key=lambda s: s.metadata.generated_at) if snapshots else None
 
     def save(self, snapshot: Snapshot) -> bool:
         snapshots = self.find_all()
@@ -39,17 +57,61 @@ class ReleaseCandidateRepository:
 
         if index_of_snapshot is None:
             snapshots.insert(0, snapshot)
+        elif snapshots[index_of_snapshot] == snapshot:
+            return True
+        else:
+            snapshots[index_of_snapshot] = snapshot
 
-        return self._write_snapshots(snapshots)
+        saved = self._write_snapshots(snapshots)
+        if saved and self.retention is not None:
+            self.compact(self.retention)
+        return saved
 
     def update(self, snapshot: Snapshot) -> bool:
         return self.save(snapshot)
 
+    # moves the snapshots the policy no longer keeps to the archive; returns their ids
+    def compact(self, policy: RetentionPolicy) -> list[str]:
+        snapshots = self.find_all()
+        archived = policy.archived([(s.metadata.id, s.metadata.status, s.metadata.generated_at) for s in snapshots])
+        if not archived:
+            return []
+        # archived before the file is rewritten: an interrupted compaction leaves a copy in both
+        # places rather than losing a snapshot
+        self.archive.append([s for s in snapshots if s.metadata.id in archived])
+        self._write_snapshots([s for s in snapshots if s.metadata.id not in archived])
+        return [s.metadata.id for s in snapshots if s.metadata.id in archived]
+
+    def _load(self) -> list[Snapshot]:
+        if not os.path.isfile(path=Path(self.file_path)):
+            self._remember(None, [])
+            return self._snapshots
+        stat = os.stat(self.file_path)
+        if self._loaded == (stat.st_size, stat.st_mtime_ns):
+            return self._snapshots
+        with open(self.file_path, "r") as f:
+            data = self.yaml.load(f)
+            try:
+                parsed = SnapshotsFile(**data)
+            except Exception as e:
+                raise ValueError(f"Invalid release-candidates.yaml: {e}") from e
+        self._remember((stat.st_size, stat.st_mtime_ns), parsed.snapshots)
+        return self._snapshots
+
+    def _remember(self, loaded: tuple[int, int] | None, snapshots: list[Snapshot]) -> None:
+        self._loaded = loaded
+        self._snapshots = snapshots
+        # the first of duplicated ids wins, like a scan of the file would
+        self._by_id = {s.metadata.id: s for s in reversed(snapshots)}
+
     def _write_snapshots(self, snapshots: list[Snapshot]) -> bool:
         try:
             with open(self.file_path, "w") as f:
                 data = {"snapshots": [asdict(s) for s in snapshots]}
                 self.yaml.dump(data, f)
-            return True
         except Exception as e:
             raise Exception(f"Error writing snapshots: {e}") from e
+        # what was just written, without parsing it back
+        stat = os.stat(self.file_path)
+        self._remember((stat.st_size, stat.st_mtime_ns), snapshots)
+        return True
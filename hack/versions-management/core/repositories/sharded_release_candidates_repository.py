@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import fcntl
+import json
+import os
+import re
+from typing import Callable, TextIO
+
+from ruamel.yaml import YAML
+from core.models import Snapshot
+from core.models.wrappers import SnapshotsFile
+from core.repositories.release_candidates_repository import ReleaseCandidateRepository
+from core.repositories.snapshot_archive import RetentionPolicy, SnapshotArchive
+from core.utils.yaml_loader import get_yaml_instance
+
+SNAPSHOTS_DIR = "snapshots"
+MANIFEST_FILE = "manifest.jsonl"
+ARCHIVE_FILE = "archive.jsonl.gz"
+SNAPSHOT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    id: str
+    generated_at: str
+    status: str
+
+
+# One YAML file per snapshot under snapshots/, plus an append-only manifest of every snapshot's
+# id, generated_at and status. A save writes its own snapshot file and at most one manifest
+# line, so its cost and its git diff no longer depend on the history, and writers of different
+# snapshots never touch the same file. export() regenerates the single release-candidates.yaml.
+class ShardedReleaseCandidateRepository:
+    def __init__(self, directory: str, retention: RetentionPolicy | None = None):
+        self.directory: str = directory
+        self.manifest_path: str = os.path.join(directory, MANIFEST_FILE)
+        self.archive: SnapshotArchive = SnapshotArchive(os.path.join(directory, ARCHIVE_FILE))
+        # compacts the history after every save when set
+        self.retention: RetentionPolicy | None = retention
+        self.yaml: YAML = get_yaml_instance()
+
+    def snapshot_path(self, id: str) -> str:
+        if not SNAPSHOT_ID.match(id):
+            raise ValueError(f"Invalid snapshot id: {id}")
+        return os.path.join(self.directory, SNAPSHOTS_DIR, f"{id}.yaml")
+
+    # latest entry of every snapshot, newest generated first like release-candidates.yaml
+    def manifest(self) -> list[ManifestEntry]:
+        if not os.path.isfile(self.manifest_path):
+            return []
+        entries: dict[str, ManifestEntry] = {}
+        with open(self.manifest_path, "r") as f:
+            for line in f:
+                try:
+                    entry = ManifestEntry(**json.loads(line))
+                except Exception:
+                    # a writer killed mid-append leaves a truncated last line
+                    continue
+                entries[entry.id] = entry
+        # the most recently added snapshot goes first among those generated at the same time
+        ordered = list(reversed(entries.values()))
+        return sorted(ordered, key=lambda e: datetime.fromisoformat(e.generated_at), reverse=True)
+
+    def find_all(self) -> list[Snapshot]:
+        return [self._load(entry.id) for entry in self.manifest()]
+
+    def find_by_id(self, id: str) -> Snapshot | None:
+        if not os.path.isfile(self.snapshot_path(id)):
+            return None
+        return self._load(id)
+
+    def find_by_status(self, status: str) -> list[Snapshot]:
+        return [self._load(entry.id) for entry in self.manifest() if entry.status == status]
+
+    def find_latest(self, status: str) -> Snapshot | None:
+        entry = next((e for e in self.manifest() if e.status == status), None)
+        return self._load(entry.id) if entry else None
+
+    def save(self, snapshot: Snapshot) -> bool:
+        saved = self._save(snapshot)
+        if saved and self.retention is not None:
+            self.compact(self.retention)
+        return saved
+
+    def update(self, snapshot: Snapshot) -> bool:
+        return self.save(snapshot)
+
+    # moves the snapshots the policy no longer keeps to the archive, and drops their files and
+    # manifest lines; returns their ids
+    def compact(self, policy: RetentionPolicy) -> list[str]:
+        with self._manifest_lock():
+            manifest = self.manifest()
+            archived = policy.archived([(e.id, e.status, datetime.fromisoformat(e.generated_at)) for e in manifest])
+            if not archived:
+                return []
+            self.archive.append([self._load(e.id) for e in manifest if e.id in archived])
+            # oldest first, so reading the manifest back gives the same order
+            kept = [e for e in reversed(manifest) if e.id not in archived]
+            try:
+                self._write(self.manifest_path, lambda f: f.writelines(json.dumps(asdict(e)) + "\n" for e in kept))
+            except Exception as e:
+                raise Exception(f"Error compacting snapshots: {e}") from e
+        for id in archived:
+            os.remove(self.snapshot_path(id))
+        return [e.id for e in manifest if e.id in archived]
+
+    def _save(self, snapshot: Snapshot) -> bool:
+        existing = self.find_by_id(snapshot.metadata.id)
+        if existing == snapshot:
+            # nothing changed, the files are left untouched
+            return True
+
+        path = self.snapshot_path(snapshot.metadata.id)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, lambda f: self.yaml.dump(asdict(snapshot), f))
+            entry = self._entry(snapshot)
+            if existing is None or self._entry(existing) != entry:
+                self._append(entry)
+            return True
+        except Exception as e:
+            raise Exception(f"Error writing snapshot {snapshot.metadata.id}: {e}") from e
+
+    # writes every snapshot to a single release-candidates.yaml; returns how many were written
+    def export(self, file_path: str) -> int:
+        snapshots = self.find_all()
+        try:
+            self._write(file_path, lambda f: self.yaml.dump({"snapshots": [asdict(s) for s in snapshots]}, f))
+        except Exception as e:
+            raise Exception(f"Error exporting snapshots: {e}") from e
+        return len(snapshots)
+
+    # seeds the directory from a release-candidates.yaml; returns how many snapshots were read
+    def import_file(self, file_path: str) -> int:
+        snapshots = ReleaseCandidateRepository(file_path).find_all()
+        # oldest first, so snapshots generated at the same time keep their order
+        for snapshot in reversed(snapshots):
+            self.save(snapshot)
+        return len(snapshots)
+
+    def _load(self, id: str) -> Snapshot:
+        with open(self.snapshot_path(id), "r") as f:
+            data = self.yaml.load(f)
+        try:
+            return SnapshotsFile(snapshots=[data]).snapshots[0]
+        except Exception as e:
+            raise ValueError(f"Invalid snapshot {id}: {e}") from e
+
+    def _entry(self, snapshot: Snapshot) -> ManifestEntry:
+        return ManifestEntry(
+            id=snapshot.metadata.id,
+            generated_at=snapshot.metadata.generated_at.isoformat(),
+            status=snapshot.metadata.status,
+        )
+
+    # replaces path through a temporary file next to it, which a failed write removes again so it
+    # is never committed along with the snapshots
+    def _write(self, path: str, write: Callable[[TextIO], None]) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _append(self, entry: ManifestEntry) -> None:
+        # appends of concurrent writers must not interleave, nor land in a manifest being compacted
+        with self._manifest_lock(), open(self.manifest_path, "a") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+            f.flush()
+
+    # locks the directory itself, so no lock file ends up committed with the snapshots
+    @contextmanager
+    def _manifest_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
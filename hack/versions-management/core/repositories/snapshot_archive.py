@@ -0,0 +1,80 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime
+import fcntl
+import gzip
+import json
+import os
+
+from core.models import Snapshot
+from core.models.wrappers import SnapshotsFile
+
+
+# which snapshots stay in the release candidates history: the newest keep_last ones and every
+# successful one; older failed or superseded pending snapshots move to the archive
+@dataclass(frozen=True)
+class RetentionPolicy:
+    keep_last: int
+
+    def __post_init__(self):
+        if self.keep_last < 1:
+            raise ValueError("Retention must keep at least one snapshot")
+
+    # ids to archive out of (id, status, generated_at) of every snapshot
+    def archived(self, snapshots: list[tuple[str, str, datetime]]) -> set[str]:
+        newest = sorted(snapshots, key=lambda s: s[2], reverse=True)
+        return {id for id, status, _ in newest[self.keep_last:] if status != "successful"}
+
+
+# Snapshots compacted out of the history, one JSON line each in a gzip file. Every compaction
+# appends a new gzip member, so the archive is never rewritten; reads stream through it and
+# only validate the snapshots they return.
+class SnapshotArchive:
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+
+    def append(self, snapshots: list[Snapshot]) -> None:
+        if not snapshots:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        lines = "".join(json.dumps(asdict(s), default=str) + "\n" for s in snapshots)
+        try:
+            with open(self.file_path, "ab") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write(gzip.compress(lines.encode()))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except Exception as e:
+            raise Exception(f"Error archiving snapshots: {e}") from e
+
+    # newest generated first; a snapshot archived twice keeps its last copy
+    def find_all(self) -> list[Snapshot]:
+        found = {data["metadata"]["id"]: data for data in self._read()}
+        snapshots = [self._parse(data) for data in found.values()]
+        return sorted(snapshots, key=lambda s: s.metadata.generated_at, reverse=True)
+
+    def find_by_id(self, id: str) -> Snapshot | None:
+        match = None
+        for data in self._read(id):
+            if data["metadata"]["id"] == id:
+                match = data
+        return self._parse(match) if match else None
+
+    def _read(self, contains: str | None = None):
+        if not os.path.isfile(self.file_path):
+            return
+        try:
+            with gzip.open(self.file_path, "rt") as f:
+                for line in f:
+                    # cheap filter before decoding the line
+                    if contains is None or contains in line:
+                        yield json.loads(line)
+        except Exception as e:
+            raise ValueError(f"Invalid snapshot archive {self.file_path}: {e}") from e
+
+    def _parse(self, data: dict) -> Snapshot:
+        try:
+            return SnapshotsFile(snapshots=[data]).snapshots[0]
+        except Exception as e:
+            raise ValueError(f"Invalid snapshot archive {self.file_path}: {e}") from e
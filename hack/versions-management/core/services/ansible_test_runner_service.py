@@ -6,14 +6,16 @@ from typing import Callable, override
 
 from core.clients.ansible_client import AnsibleClient
 from core.models import Snapshot
-from core.repositories import ReleaseCandidateRepository
+from core.repositories import ReleaseCandidateRepository, ShardedReleaseCandidateRepository
 from core.services.service import Service
 from core.utils.logging import setup_logger
 
 
 class AnsibleTestRunnerService(Service):
-    def __init__(self, file_path: str, pending_snapshot_id: str, dry_run: bool = False):
-        self.repo: ReleaseCandidateRepository = ReleaseCandidateRepository(file_path)
+    def __init__(self, file_path: str, pending_snapshot_id: str, dry_run: bool = False, rc_dir: str | None = None):
+        self.repo: ReleaseCandidateRepository | ShardedReleaseCandidateRepository = (
+            ShardedReleaseCandidateRepository(rc_dir) if rc_dir else ReleaseCandidateRepository(file_path)
+        )
         self.ansible: AnsibleClient = AnsibleClient()
         self.logger: logging.Logger = setup_logger("AnsibleTestRunnerService")
         self.pending_snapshot_id: str = pending_snapshot_id
@@ -1,58 +1,202 @@
+import json
 import logging
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import override
+from core.clients.git_mirror_client import GitMirrorClient
 from core.clients.github_client import GitHubClient
-from core.repositories import VersionRepository
+from core.models import Version
+from core.repositories import ReconciliationJournalRepository, VersionRepository
+from core.repositories.reconciliation_journal_repository import version_hash
 from core.services.service import Service
 from core.utils.logging import setup_logger
 
 CAPOA_REPO = "openshift-assisted/cluster-api-provider-openshift-assisted"
+TAG_PREFIX = "capoa-"
+# repositories reconciled in parallel; writes within a repository stay serial
+MAX_WORKERS = 8
+# what reconciling a tag did
+CREATED = "created"
+EXISTS = "exists"
+WOULD_CREATE = "would_create"
+
+
+@dataclass
+class RepositoryResult:
+    repo: str
+    created: list[str] = field(default_factory=list)
+    would_create: list[str] = field(default_factory=list)  # missing tags left alone by a dry run
+    skipped: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
 
 class TagReconciliationService(Service):
-    def __init__(self, versions_file_path: str, dry_run: bool = False):
+    def __init__(
+        self,
+        versions_file_path: str,
+        dry_run: bool = False,
+        lightweight: bool = False,
+        journal_file_path: str | None = None,
+        full: bool = False,
+        git_mirror_dir: str | None = None,
+    ):
         self.github: GitHubClient = GitHubClient()
         self.versions_repo: VersionRepository = VersionRepository(versions_file_path)
         self.logger: logging.Logger = setup_logger("TagReconciliationService")
         self.dry_run: bool = dry_run
+        # lightweight tags are a bare ref on the commit: one write call per tag instead of two
+        self.lightweight: bool = lightweight
+        # versions already fully reconciled are skipped unless a full audit is requested
+        self.journal: ReconciliationJournalRepository | None = (
+            ReconciliationJournalRepository(journal_file_path) if journal_file_path else None
+        )
+        self.full: bool = full
+        # existing tags are read from local bare mirrors instead of the API when configured
+        self.mirrors: GitMirrorClient | None = GitMirrorClient(git_mirror_dir) if git_mirror_dir else None
+        # existing tags per repository, listed once per run
+        self.inventory: dict[str, set[str]] = {}
 
-    def ensure_tag_exists(self, ref: str, repo: str, tag: str):
-        if repo != CAPOA_REPO:
-            tag = f"capoa-{tag}"
-        if not self.tag_exists(repo, tag):
-            if not self.dry_run:
-                self.create_tag(repo, ref, tag)
-            else:
-                self.logger.info(f"Dry run mode. tag {tag} on {ref} in repo {repo} has not been created")
+    # returns CREATED, EXISTS, or WOULD_CREATE for a missing tag in dry run mode
+    def ensure_tag_exists(self, ref: str, repo: str, tag: str) -> str:
+        if self.tag_exists(repo, tag):
+            return EXISTS
+        if self.dry_run:
+            self.logger.info(f"Dry run mode. tag {tag} on {ref} in repo {repo} has not been created")
+            return WOULD_CREATE
+        self.create_tag(repo, ref, tag)
+        self.inventory.setdefault(repo, set()).add(tag)
+        return CREATED
 
     @override
     def run(self) -> None:
-        versions = self.versions_repo.find_all()
+        versions = self.pending_versions(self.versions_repo.find_all())
+        desired = self.desired_tags(versions)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(executor.map(self.reconcile_repository, desired.keys(), desired.values()))
+
+        for line in summary_table(results, self.dry_run):
+            self.logger.info(line)
+        self.logger.info(f"GitHub API calls: {self.github.api_calls()}")
+        self.logger.info(f"GitHub rate limit usage: {json.dumps(self.github.rate_limit_usage(), default=str)}")
+        github_cache = self.github.cache_stats()
+        if github_cache is not None:
+            self.logger.info(
+                f"GitHub cache: {github_cache.hits} hits, {github_cache.not_modified} not modified, "
+                f"{github_cache.misses} misses, {github_cache.entries} entries"
+            )
+        self.record_reconciled(versions, results)
+
+        errors = list(dict.fromkeys(error for result in results for error in result.failed.values()))
+        if errors:
+            raise Exception("; ".join(errors))
+
+    def pending_versions(self, versions: list[Version]) -> list[Version]:
+        if self.journal is None or self.full:
+            return versions
+        journal = self.journal.find_all()
+        pending = [v for v in versions if journal.get(v.name) != version_hash(v)]
+        self.logger.info(f"Reconciling {len(pending)} new or changed of {len(versions)} versions")
+        return pending
+
+    # a version is journaled once none of its tags failed, so a later run retries the rest
+    def record_reconciled(self, versions: list[Version], results: list[RepositoryResult]) -> None:
+        if self.journal is None or self.dry_run:
+            return
+        failed = {(result.repo, tag) for result in results for tag in result.failed}
+        journal = self.journal.find_all()
+        for version in versions:
+            if not version.name or not version.tested_with_ref:
+                continue
+            if not any((repo, tag) in failed for repo, tag, _ in self.version_tags(version)):
+                journal[version.name] = version_hash(version)
+        self.journal.save(journal)
+
+    def reconcile_repository(self, repo: str, tags: dict[str, str]) -> RepositoryResult:
+        result = RepositoryResult(repo)
+        started = time.monotonic()
+        try:
+            self.load_inventory(repo)
+        except Exception as e:
+            self.logger.error(str(e))
+            result.failed = {tag: str(e) for tag in tags}
+            result.elapsed = time.monotonic() - started
+            return result
+
+        for tag, ref in tags.items():
+            try:
+                outcome = self.ensure_tag_exists(ref, repo, tag)
+                if outcome == CREATED:
+                    result.created.append(tag)
+                elif outcome == WOULD_CREATE:
+                    result.would_create.append(tag)
+                else:
+                    result.skipped.append(tag)
+            except Exception as e:
+                self.logger.error(str(e))
+                result.failed[tag] = str(e)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    # repository -> tag -> ref, in versions.yaml order
+    def desired_tags(self, versions: list[Version]) -> dict[str, dict[str, str]]:
+        desired: dict[str, dict[str, str]] = {}
         for version in versions:
             if not version.name or not version.tested_with_ref:
                 self.logger.warning("Skipping version without name or tested_with_ref")
                 continue
-            for artifact in version.artifacts:
-                repo = artifact.name
-                if not re.match(r"^openshift/", repo):
-                    continue
-                self.ensure_tag_exists(artifact.ref, repo, version.name)
+            for repo, tag, ref in self.version_tags(version):
+                desired.setdefault(repo, {}).setdefault(tag, ref)
+        return desired
 
-            # tag capoa repo
-            self.ensure_tag_exists(version.tested_with_ref, CAPOA_REPO, version.name)
+    def version_tags(self, version: Version) -> list[tuple[str, str, str]]:
+        tags = [
+            (artifact.name, f"{TAG_PREFIX}{version.name}", artifact.ref)
+            for artifact in version.artifacts
+            if re.match(r"^openshift/", artifact.name)
+        ]
+        # tag capoa repo
+        tags.append((CAPOA_REPO, version.name, version.tested_with_ref))
+        return tags
 
+    def load_inventory(self, repo: str) -> set[str]:
+        if repo not in self.inventory:
+            prefix = "" if repo == CAPOA_REPO else TAG_PREFIX
+            try:
+                source = self.mirrors or self.github
+                self.inventory[repo] = set(source.list_tags(repo, prefix))
+            except Exception as e:
+                raise Exception(f"Failed to list tags on {repo}: {e}") from e
+        return self.inventory[repo]
 
+    # matching-refs lists annotated and lightweight tags alike, so either kind satisfies the desired state
     def tag_exists(self, repo: str, tag: str) -> bool:
-        try:
-            self.github.get_repo(repo).get_git_ref(f"tags/{tag}")
-            return True
-        except Exception:
-            return False
+        return tag in self.load_inventory(repo)
 
     def create_tag(self, repo: str, ref: str, tag: str) -> None:
         try:
             gh_repo = self.github.get_repo(repo)
-            tag_obj = gh_repo.create_git_tag(tag=tag, message="Tagged by CI", object=ref, type="commit")
-            gh_repo.create_git_ref(f"refs/tags/{tag}", tag_obj.sha)
+            if self.lightweight:
+                gh_repo.create_git_ref(f"refs/tags/{tag}", ref)
+            else:
+                tag_obj = gh_repo.create_git_tag(tag=tag, message="Tagged by CI", object=ref, type="commit")
+                gh_repo.create_git_ref(f"refs/tags/{tag}", tag_obj.sha)
             self.logger.info(f"Created tag {tag} on {repo}")
         except Exception as e:
             raise Exception(f"Failed to create tag {tag} on {repo}: {e}") from e
+
+
+# a dry run creates nothing, so its table counts the tags it would create instead
+def summary_table(results: list[RepositoryResult], dry_run: bool = False) -> list[str]:
+    width = max([len("Repository"), *(len(result.repo) for result in results)])
+    action = "Would create" if dry_run else "Created"
+    lines = [f"{'Repository':<{width}}  {action}  Skipped  Failed  Time"]
+    for result in results:
+        tags = result.would_create if dry_run else result.created
+        lines.append(
+            f"{result.repo:<{width}}  {len(tags):>{len(action)}}  {len(result.skipped):>7}  "
+            f"{len(result.failed):>6}  {result.elapsed:.2f}s"
+        )
+    return lines
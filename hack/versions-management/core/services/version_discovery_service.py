@@ -1,43 +1,206 @@
+import asyncio
 import hashlib
 import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import asdict
 from datetime import datetime
 from typing import override
 
-from core.clients.github_client import GitHubClient
-from core.clients.image_registry_client import ImageRegistryClient
+import aiohttp
+
+from core.clients.async_github_client import GITHUB_API_URL, AsyncGitHubClient
+from core.clients.async_http import HostLimiter
+from core.clients.async_image_registry_client import AsyncImageRegistryClient
+from core.clients.digest_cache import DigestCache
+from core.clients.git_mirror_client import GitMirrorClient
+from core.clients.github_client import GitHubClient, RepositoryHead
+from core.clients.image_registry_client import ImageRegistryClient, ManifestProbe
 from core.models import Artifact, Component, Snapshot, SnapshotMetadata
-from core.repositories import ReleaseCandidateRepository
+from core.repositories import (
+    DiscoveryJournalRepository,
+    ReleaseCandidateRepository,
+    ShardedReleaseCandidateRepository,
+)
+from core.repositories.snapshot_archive import RetentionPolicy
 from core.repositories.components_repository import ComponentRepository
 from core.services.service import Service
+from core.utils.deadline import Deadline, DeadlineExceeded, bounded_by
 from core.utils.logging import setup_logger
 
+MAX_WORKERS = 8
+COMMIT_WINDOW = 20
+COMMIT_TAG_PREFIX = "latest-"
+PROBE_BATCH_SIZE = 5
+COMMIT_MATCHING_MODES = ("probe", "tag-list")
+ENGINES = ("threads", "asyncio")
+# git answers commit lists from local bare mirrors, releases still come from the REST API
+GITHUB_BACKENDS = ("rest", "graphql", "git")
+# in-flight request bounds per host for the asyncio engine
+HOST_LIMITS = {"api.github.com": 8, "quay.io": 16}
+
+
+# probe results of several images over a window of commits ordered newest first (rank 0)
+class CommitWindow:
+    def __init__(self, images: list[str], shas: list[str]):
+        self.images: list[str] = images
+        self.shas: list[str] = shas
+        self.hits: dict[str, dict[int, str | None]] = {image: {} for image in images}
+        self.misses: set[int] = set()  # ranks where at least one image has no build
+
+    def record(self, image: str, rank: int, probe: ManifestProbe) -> None:
+        if probe.exists:
+            self.hits[image][rank] = probe.digest
+        else:
+            self.misses.add(rank)
+
+    # newest commit known to have every image, a newer one may still be pending
+    def candidate(self) -> int | None:
+        common = set.intersection(*(set(hits) for hits in self.hits.values()))
+        return min(common) if common else None
+
+    # the candidate, once every newer commit is known to miss at least one image
+    def aligned(self) -> int | None:
+        candidate = self.candidate()
+        if candidate is not None and all(rank in self.misses for rank in range(candidate)):
+            return candidate
+        return None
+
+    # the aligned commit for all images, or else the newest build of each image on its own
+    def matches(self) -> dict[str, tuple[str, str | None]]:
+        aligned = self.aligned()
+        if aligned is not None:
+            return {image: (self.shas[aligned], self.hits[image][aligned]) for image in self.images}
+        return {
+            image: (self.shas[min(hits)], hits[min(hits)])
+            for image, hits in self.hits.items()
+            if hits
+        }
+
 
 class VersionDiscoveryService(Service):
-    def __init__(self, rc_file_path: str, components_file_path: str, dry_run: bool = False):
+    def __init__(
+        self,
+        rc_file_path: str,
+        components_file_path: str,
+        dry_run: bool = False,
+        commit_matching: str = "probe",
+        digest_cache_dir: str | None = None,
+        engine: str = "threads",
+        probe_batch_size: int = PROBE_BATCH_SIZE,
+        github_backend: str = "rest",
+        git_mirror_dir: str | None = None,
+        journal_file_path: str | None = None,
+        resume: bool = False,
+        fallback_to_last_snapshot: bool = False,
+        component_timeout: float | None = None,
+        run_timeout: float | None = None,
+        rc_dir: str | None = None,
+        keep_last: int | None = None,
+    ):
+        if commit_matching not in COMMIT_MATCHING_MODES:
+            raise ValueError(f"Unsupported commit matching mode: {commit_matching}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unsupported discovery engine: {engine}")
+        if engine == "asyncio" and commit_matching != "probe":
+            raise ValueError("The asyncio engine only supports probe commit matching")
+        if probe_batch_size < 1:
+            raise ValueError("Probe batch size must be at least 1")
+        if github_backend not in GITHUB_BACKENDS:
+            raise ValueError(f"Unsupported GitHub backend: {github_backend}")
+        if github_backend == "git" and not git_mirror_dir:
+            raise ValueError("The git backend requires a mirror directory")
+        if resume and not journal_file_path:
+            raise ValueError("Resuming requires a discovery journal")
+        if any(timeout is not None and timeout <= 0 for timeout in (component_timeout, run_timeout)):
+            raise ValueError("Discovery timeouts must be positive")
         self.github: GitHubClient = GitHubClient()
-        self.registry: ImageRegistryClient = ImageRegistryClient()
-        self.rc_repository: ReleaseCandidateRepository = ReleaseCandidateRepository(rc_file_path)
+        cache = DigestCache(digest_cache_dir) if digest_cache_dir else None
+        # every component worker may have a whole batch of probes in flight
+        self.registry: ImageRegistryClient = ImageRegistryClient(pool_size=MAX_WORKERS * probe_batch_size, cache=cache)
+        # one file per snapshot when a snapshots directory is configured; with keep_last, every
+        # save moves snapshots past the newest ones, other than successful ones, to the archive
+        retention = RetentionPolicy(keep_last) if keep_last else None
+        self.rc_repository: ReleaseCandidateRepository | ShardedReleaseCandidateRepository = (
+            ShardedReleaseCandidateRepository(rc_dir, retention=retention)
+            if rc_dir
+            else ReleaseCandidateRepository(rc_file_path, retention=retention)
+        )
         self.components_repository: ComponentRepository = ComponentRepository(components_file_path)
         self.dry_run: bool = dry_run
+        self.commit_matching: str = commit_matching
+        self.engine: str = engine
+        self.probe_batch_size: int = probe_batch_size
+        self.github_backend: str = github_backend
+        self.mirrors: GitMirrorClient | None = GitMirrorClient(git_mirror_dir) if github_backend == "git" else None
+        self.host_limits: dict[str, int] = dict(HOST_LIMITS)
+        # per-component results of the run, so a --resume run only retries what did not complete
+        self.journal: DiscoveryJournalRepository | None = (
+            DiscoveryJournalRepository(journal_file_path) if journal_file_path else None
+        )
+        # cleared once the engine returns, so groups still running past the run deadline don't
+        # write to a journal that is finished
+        self._recording: bool = False
+        self._journal_lock: threading.Lock = threading.Lock()
+        self.resume: bool = resume
+        # a failing component takes its artifact from the latest successful snapshot
+        self.fallback_to_last_snapshot: bool = fallback_to_last_snapshot
+        # seconds a repository group, and the whole run, may take before their pending work is cancelled
+        self.component_timeout: float | None = component_timeout
+        self.run_timeout: float | None = run_timeout
+        # set by run() when the discovered snapshot is already stored
+        self.unchanged: bool = False
         self.logger: logging.Logger = setup_logger("VersionDiscoveryService")
 
     @override
     def run(self) -> None:
-        artifacts: list[Artifact] = []
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            components = self.components_repository.find_all()
-            for future in [executor.submit(self.process_repository, c) for c in components]:
-                try:
-                    result = future.result()
-                    if result:
-                        artifacts.append(result)
-                except Exception as e:
-                    raise Exception(f"Failed to resolve component: {e}") from e
+        # covers everything the run waits on, the GraphQL prefetch included
+        run_deadline = self._run_deadline()
+        components = self.components_repository.find_all()
+        results = self._start_journal(components)
+        pending = [component for component in components if component.name not in results]
+        if len(pending) < len(components):
+            self.logger.info(f"Resuming discovery, {len(pending)} of {len(components)} components left")
 
+        failures: dict[str, Exception] = {}
+        if pending:
+            with bounded_by(run_deadline):
+                heads = self._fetch_heads(pending) if self.github_backend == "graphql" else {}
+            if self.engine == "asyncio":
+                discovered, failures = asyncio.run(self._discover_async(pending, heads, run_deadline))
+            else:
+                discovered, failures = self._discover_threaded(pending, heads, run_deadline)
+            self._stop_recording()
+            results.update(discovered)
+        self._report_deadlines(pending, failures)
+        if failures and self.fallback_to_last_snapshot:
+            failures = self._fall_back(failures, results)
 
+        self.logger.info(f"GitHub API calls: {self.github.api_calls()}")
+        self.logger.info(f"GitHub rate limit usage: {json.dumps(self.github.rate_limit_usage(), default=str)}")
+        github_cache = self.github.cache_stats()
+        if github_cache is not None:
+            self.logger.info(
+                f"GitHub cache: {github_cache.hits} hits, {github_cache.not_modified} not modified, "
+                f"{github_cache.misses} misses, {github_cache.entries} entries"
+            )
+        stats = self.registry.pool_stats()
+        self.logger.info(
+            f"Registry connections: {stats.connections_opened} opened, "
+            f"{stats.connections_reused} reused over {stats.requests} requests"
+        )
+        if self.registry.cache:
+            cache_stats = self.registry.cache.stats()
+            self.logger.info(
+                f"Digest cache: {cache_stats.hits} hits, {cache_stats.misses} misses, {cache_stats.entries} entries"
+            )
+
+        if failures:
+            error = next(iter(failures.values()))
+            raise Exception(f"Failed to resolve component: {error}") from error
+
+        artifacts = [results[c.name] for c in components if results.get(c.name)]
         if not artifacts:
             raise Exception("No components discovered. Exiting.")
 
@@ -53,56 +216,469 @@ class VersionDiscoveryService(Service):
 
         if self.dry_run:
             print(json.dumps(asdict(snapshot), default=str))
+
+        # compacted snapshots were published too, a failed one must not come back as pending
+        existing = self.rc_repository.find_by_id(snapshot_id) or self.rc_repository.archive.find_by_id(snapshot_id)
+        if existing is not None:
+            self.logger.info(f"Snapshot {snapshot_id} already exists ({existing.metadata.status}), nothing to update")
+            self.unchanged = True
+            self._finish_journal()
+            return
+
+        if self.dry_run:
+            self._finish_journal()
             return
 
         if self.rc_repository.save(snapshot):
             self.logger.info(f"Snapshot {snapshot.metadata.id} has been saved successfully.")
+            self._finish_journal()
         else:
             error_msg = f"Failed to save snapshot {snapshot.metadata.id}"
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
-    def process_repository(
-        self, component: Component
-    ) -> Artifact:
-        img_pattern = component.image_pattern
-        repo = component.repository.removeprefix("https://github.com/")
-        self.logger.info(f"Scanning repository {repo}")
+    # completed results of the interrupted run when resuming, otherwise a fresh journal
+    def _start_journal(self, components: list[Component]) -> dict[str, Artifact | None]:
+        if self.journal is None:
+            return {}
+        signature = hashlib.sha256(json.dumps([asdict(c) for c in components]).encode()).hexdigest()
+        if self.resume:
+            completed = self.journal.find_all(signature)
+            if completed:
+                self._recording = True
+                return completed
+            self.logger.warning("No discovery journal matching the components to resume from, starting over")
+        self.journal.start(signature)
+        self._recording = True
+        return {}
+
+    def _record(self, components: list[Component], artifacts: list[Artifact | None]) -> None:
+        with self._journal_lock:
+            if self.journal is None or not self._recording:
+                return
+            for component, artifact in zip(components, artifacts):
+                self.journal.record(component.name, artifact)
+
+    def _stop_recording(self) -> None:
+        with self._journal_lock:
+            self._recording = False
+
+    def _finish_journal(self) -> None:
+        if self.journal is not None:
+            self.journal.clear()
+
+    # the partial result of a run stopped by a deadline, naming the components that were too slow
+    def _report_deadlines(self, components: list[Component], failures: dict[str, Exception]) -> None:
+        unfinished = {name: error for name, error in failures.items() if isinstance(error, DeadlineExceeded)}
+        if not unfinished:
+            return
+        self.logger.warning(
+            f"Discovery deadline hit, {len(components) - len(failures)} of {len(components)} components resolved"
+        )
+        for name, error in unfinished.items():
+            self.logger.warning(f"Component {name} did not finish: {error}")
+
+    # failures that could not fall back are returned
+    def _fall_back(self, failures: dict[str, Exception], results: dict[str, Artifact | None]) -> dict[str, Exception]:
+        latest = self.rc_repository.find_latest("successful")
+        if latest is None:
+            return failures
+        previous = {artifact.name: artifact for artifact in latest.artifacts}
+        remaining: dict[str, Exception] = {}
+        for name, error in failures.items():
+            if name in previous:
+                self.logger.warning(
+                    f"Component {name} failed ({error}), falling back to {previous[name].ref} "
+                    f"from snapshot {latest.metadata.id}"
+                )
+                results[name] = previous[name]
+            else:
+                remaining[name] = error
+        return remaining
+
+    # the latest release and commit window of every repository, prefetched in one GraphQL query
+    def _fetch_heads(self, components: list[Component]) -> dict[str, RepositoryHead]:
+        repos = list(dict.fromkeys(self._repo_name(component) for component in components))
         try:
-            gh_repo = self.github.get_repo(repo)
-            if component.versioning_selection_mechanism == "release":
-                self.logger.info(f"Checking releases of component {component.name}")
-                release = gh_repo.get_latest_release()
-                if release:
-                    self.logger.info(f"Found release {release} for repository {repo}")
-                    return Artifact(
-                        repository=f"https://github.com/{repo}",
-                        ref=release.tag_name,
-                        versioning_selection_mechanism=component.versioning_selection_mechanism,
-                        name=component.name,
-                        image_url=None,
-                    )
-            elif component.versioning_selection_mechanism == "commit" and img_pattern:
-                self.logger.info(f"Checking commits of component {component.name}")
-                for commit in gh_repo.get_commits()[:20]:
-                    sha = commit.sha
-                    tag = f"latest-{sha}"
-                    if self.registry.exists(img_pattern, tag):
-                        digest = self.registry.resolve_digest(img_pattern, tag)
-                        self.logger.info(f"Found commit {sha} for repository {repo}")
-                        return Artifact(
-                            repository=f"https://github.com/{repo}",
-                            ref=sha,
-                            versioning_selection_mechanism=component.versioning_selection_mechanism,
-                            name=component.name,
-                            image_url=img_pattern,
-                            image_digest=digest,
+            return self.github.get_repository_heads(repos, COMMIT_WINDOW)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to query repositories: {e}") from e
+
+    # results by component name, and the error of every component that failed; a failing
+    # repository no longer stops the others
+    def _discover_threaded(
+        self,
+        components: list[Component],
+        heads: dict[str, RepositoryHead] | None = None,
+        run_deadline: Deadline | None = None,
+    ) -> tuple[dict[str, Artifact | None], dict[str, Exception]]:
+        groups = [[components[i] for i in group] for group in self._group_by_repository(components)]
+        heads = heads or {}
+        run_deadline = run_deadline or self._run_deadline()
+
+        def process(group: list[Component]) -> list[Artifact | None]:
+            deadline = self._component_deadline(group).earliest(run_deadline)
+            # rate limit and retry waits in the clients give up at the deadline too, so a group
+            # abandoned by the run does not keep its worker, and the process, alive
+            with bounded_by(deadline):
+                artifacts = self.process_group(group, heads.get(self._repo_name(group[0])), deadline)
+            self._record(group, artifacts)
+            return artifacts
+
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            futures = [executor.submit(process, group) for group in groups]
+            wait(futures, timeout=run_deadline.remaining())
+        finally:
+            # groups not started yet are dropped, running ones stop at their next deadline check
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self._collect(components, groups, [self._outcome(future, run_deadline) for future in futures])
+
+    async def _discover_async(
+        self,
+        components: list[Component],
+        heads: dict[str, RepositoryHead] | None = None,
+        run_deadline: Deadline | None = None,
+    ) -> tuple[dict[str, Artifact | None], dict[str, Exception]]:
+        groups = [[components[i] for i in group] for group in self._group_by_repository(components)]
+        heads = heads or {}
+        limiter = HostLimiter(self.host_limits)
+        connect_timeout, read_timeout = self.registry.timeout
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            github = AsyncGitHubClient(
+                session, self.github.token, limiter, api_url=GITHUB_API_URL, transport=self.github.transport
+            )
+            registry = AsyncImageRegistryClient(
+                session,
+                limiter,
+                registry_url=self.registry.registry_url,
+                cache=self.registry.cache,
+                credentials=self.registry.auth.credentials,
+            )
+
+            run_deadline = run_deadline or self._run_deadline()
+
+            async def process(group: list[Component]) -> list[Artifact | None]:
+                deadline = self._component_deadline(group)
+                try:
+                    # rate limit waits and git commands of the group give up at the deadline too
+                    with bounded_by(deadline.earliest(run_deadline)):
+                        artifacts = await asyncio.wait_for(
+                            self.process_group_async(github, registry, group, heads.get(self._repo_name(group[0]))),
+                            deadline.remaining(),
                         )
+                except TimeoutError:
+                    raise DeadlineExceeded(deadline.reason)
+                self._record(group, artifacts)
+                return artifacts
+
+            tasks = [asyncio.create_task(process(group)) for group in groups]
+            _, unfinished = await asyncio.wait(tasks, timeout=run_deadline.remaining())
+            # cancelling a group cancels its in-flight requests and probes
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        # same ordering and error reporting as the threaded engine, so both produce identical snapshots
+        outcomes = [
+            DeadlineExceeded(run_deadline.reason) if task.cancelled() else task.exception() or task.result()
+            for task in tasks
+        ]
+        return self._collect(components, groups, outcomes)
+
+    def _run_deadline(self) -> Deadline:
+        return Deadline.after(self.run_timeout, f"discovery run exceeded its {self.run_timeout}s deadline")
+
+    def _component_deadline(self, group: list[Component]) -> Deadline:
+        return Deadline.after(
+            self.component_timeout,
+            f"{self._repo_name(group[0])} exceeded its {self.component_timeout}s component deadline",
+        )
+
+    def _outcome(self, future: Future, run_deadline: Deadline) -> list[Artifact | None] | Exception:
+        if not future.done() or future.cancelled():
+            return DeadlineExceeded(run_deadline.reason)
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+
+    # results and failures keyed by component name, in components order
+    def _collect(
+        self,
+        components: list[Component],
+        groups: list[list[Component]],
+        outcomes: list[list[Artifact | None] | BaseException],
+    ) -> tuple[dict[str, Artifact | None], dict[str, Exception]]:
+        by_name: dict[str, Artifact | None | BaseException] = {}
+        for group, outcome in zip(groups, outcomes):
+            for i, component in enumerate(group):
+                by_name[component.name] = outcome if isinstance(outcome, BaseException) else outcome[i]
+        results: dict[str, Artifact | None] = {}
+        failures: dict[str, Exception] = {}
+        for component in components:
+            outcome = by_name[component.name]
+            if isinstance(outcome, BaseException):
+                failures[component.name] = outcome
             else:
-                raise Exception(f"Versioning mechanism of component {component.repository} is not supported")
+                results[component.name] = outcome
+        return results, failures
+
+    # indexes of the components sharing a repository, in the order the repositories first appear
+    def _group_by_repository(self, components: list[Component]) -> list[list[int]]:
+        groups: dict[str, list[int]] = {}
+        for index, component in enumerate(components):
+            groups.setdefault(component.repository, []).append(index)
+        return list(groups.values())
+
+    def _repo_name(self, component: Component) -> str:
+        return component.repository.removeprefix("https://github.com/")
+
+    def process_repository(self, component: Component) -> Artifact | None:
+        return self.process_group([component])[0]
+
+    # components of one repository share the repo lookup and the commit list, and their images
+    # are matched on a common commit whenever one exists in the window; a prefetched head
+    # replaces the REST reads
+    def process_group(
+        self, components: list[Component], head: RepositoryHead | None = None, deadline: Deadline | None = None
+    ) -> list[Artifact | None]:
+        repo = self._repo_name(components[0])
+        self.logger.info(f"Scanning repository {repo}")
+        deadline = deadline or Deadline(None, "")
+        try:
+            deadline.check()
+            gh_repo = self.github.get_repo(repo) if head is None and self.mirrors is None else None
+            images = self._commit_images(components)
+            matches: dict[str, tuple[str, str | None]] = {}
+            if images:
+                self.logger.info(f"Checking commits of components {', '.join(self._commit_names(components))}")
+                if head is not None:
+                    shas = head.commit_shas
+                elif self.mirrors is not None:
+                    shas = self.mirrors.commit_shas(repo, COMMIT_WINDOW)
+                else:
+                    shas = [commit.sha for commit in gh_repo.get_commits()[:COMMIT_WINDOW]]
+                deadline.check()
+                matches = self._match_commits(images, shas, deadline)
+                self._log_alignment(repo, images, matches)
+            # every release component of the repository is pinned to the same latest release
+            tag_name: str | None = None
+            releases = self._release_names(components)
+            if releases:
+                self.logger.info(f"Checking releases of components {', '.join(releases)}")
+                deadline.check()
+                if head is None:
+                    release = (gh_repo or self.github.get_repo(repo)).get_latest_release()
+                    tag_name = release.tag_name if release else None
+                else:
+                    tag_name = self._head_release(repo, head)
+                if tag_name:
+                    self.logger.info(f"Found release {tag_name} for repository {repo}")
+            artifacts: list[Artifact | None] = []
+            for component in components:
+                if component.versioning_selection_mechanism == "release":
+                    artifacts.append(self._release_artifact(component, repo, tag_name) if tag_name else None)
+                else:
+                    artifacts.append(self._matched_artifact(component, repo, matches))
+            return artifacts
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to process {repo}: {e}") from e
+
+    async def process_group_async(
+        self,
+        github: AsyncGitHubClient,
+        registry: AsyncImageRegistryClient,
+        components: list[Component],
+        head: RepositoryHead | None = None,
+    ) -> list[Artifact | None]:
+        repo = self._repo_name(components[0])
+        self.logger.info(f"Scanning repository {repo}")
+        try:
+            images = self._commit_images(components)
+            matches: dict[str, tuple[str, str | None]] = {}
+            if images:
+                self.logger.info(f"Checking commits of components {', '.join(self._commit_names(components))}")
+                if head:
+                    shas = head.commit_shas
+                elif self.mirrors:
+                    shas = await asyncio.to_thread(self.mirrors.commit_shas, repo, COMMIT_WINDOW)
+                else:
+                    shas = await github.get_commit_shas(repo, COMMIT_WINDOW)
+                matches = await self._probe_window_async(registry, images, shas)
+                self._log_alignment(repo, images, matches)
+            tag_name: str | None = None
+            releases = self._release_names(components)
+            if releases:
+                self.logger.info(f"Checking releases of components {', '.join(releases)}")
+                tag_name = self._head_release(repo, head) if head else await github.get_latest_release_tag(repo)
+                self.logger.info(f"Found release {tag_name} for repository {repo}")
+            artifacts: list[Artifact | None] = []
+            for component in components:
+                if component.versioning_selection_mechanism == "release":
+                    artifacts.append(self._release_artifact(component, repo, tag_name))
+                else:
+                    artifacts.append(self._matched_artifact(component, repo, matches))
+            return artifacts
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Failed to process {repo}: {e}") from e
 
+    # a repository without releases fails its release components, as the REST 404 does
+    def _head_release(self, repo: str, head: RepositoryHead) -> str:
+        if head.latest_release is None:
+            raise Exception(f"No release found for repository {repo}")
+        return head.latest_release
+
+    def _commit_images(self, components: list[Component]) -> list[str]:
+        images = [c.image_pattern for c in components if c.versioning_selection_mechanism == "commit" and c.image_pattern]
+        return list(dict.fromkeys(images))
+
+    def _commit_names(self, components: list[Component]) -> list[str]:
+        return [c.name for c in components if c.versioning_selection_mechanism == "commit"]
+
+    def _release_names(self, components: list[Component]) -> list[str]:
+        return [c.name for c in components if c.versioning_selection_mechanism == "release"]
+
+    def _matched_artifact(
+        self, component: Component, repo: str, matches: dict[str, tuple[str, str | None]]
+    ) -> Artifact | None:
+        if component.versioning_selection_mechanism != "commit" or not component.image_pattern:
+            raise Exception(f"Versioning mechanism of component {component.repository} is not supported")
+        match = matches.get(component.image_pattern)
+        if match is None:
+            return None
+        sha, digest = match
+        self.logger.info(f"Found commit {sha} for repository {repo}")
+        return self._commit_artifact(component, repo, sha, digest)
+
+    def _log_alignment(self, repo: str, images: list[str], matches: dict[str, tuple[str, str | None]]) -> None:
+        shas = {sha for sha, _ in matches.values()}
+        if len(images) > 1 and (len(shas) > 1 or len(matches) < len(images)):
+            self.logger.warning(f"Images of {repo} could not be aligned on a single commit: {matches}")
+
+    def _release_artifact(self, component: Component, repo: str, tag_name: str) -> Artifact:
+        return Artifact(
+            repository=f"https://github.com/{repo}",
+            ref=tag_name,
+            versioning_selection_mechanism=component.versioning_selection_mechanism,
+            name=component.name,
+            image_url=None,
+        )
+
+    def _commit_artifact(self, component: Component, repo: str, sha: str, digest: str | None) -> Artifact:
+        return Artifact(
+            repository=f"https://github.com/{repo}",
+            ref=sha,
+            versioning_selection_mechanism=component.versioning_selection_mechanism,
+            name=component.name,
+            image_url=component.image_pattern,
+            image_digest=digest,
+        )
+
+    # maps every image to the commit (and digest) it is pinned to; images without any
+    # build in the window are left out
+    def _match_commits(
+        self, images: list[str], shas: list[str], deadline: Deadline | None = None
+    ) -> dict[str, tuple[str, str | None]]:
+        deadline = deadline or Deadline(None, "")
+        matches = self._list_window(images, shas, deadline) if self.commit_matching == "tag-list" else None
+        if matches is None:
+            matches = self._probe_window(images, shas, deadline)
+        return matches
+
+    def _list_window(
+        self, images: list[str], shas: list[str], deadline: Deadline
+    ) -> dict[str, tuple[str, str | None]] | None:
+        window = CommitWindow(images, shas)
+        for image in images:
+            deadline.check()
+            digests = self.registry.list_tag_digests(image, prefix=COMMIT_TAG_PREFIX)
+            if digests is None:
+                self.logger.warning(f"Could not list tags of {image}, falling back to probing each commit")
+                return None
+            for rank, sha in enumerate(shas):
+                tag = f"{COMMIT_TAG_PREFIX}{sha}"
+                window.record(image, rank, ManifestProbe(exists=tag in digests, digest=digests.get(tag)))
+        matches = window.matches()
+        # quay reports digests inline, the generic tag list needs one manifest probe per winner
+        return {
+            image: (sha, digest or self.registry.probe(image, f"{COMMIT_TAG_PREFIX}{sha}").digest)
+            for image, (sha, digest) in matches.items()
+        }
+
+    # Probes the commit window in batches. Within a batch every (commit, image) probe runs at
+    # once, probes of commits older than one where all images exist are cancelled, and the
+    # batch is decided as soon as every newer commit is known to miss an image, so the newest
+    # common commit still wins. Pending probes are dropped once the deadline passes.
+    def _probe_window(
+        self, images: list[str], shas: list[str], deadline: Deadline | None = None
+    ) -> dict[str, tuple[str, str | None]]:
+        deadline = deadline or Deadline(None, "")
+        window = CommitWindow(images, shas)
+        for start in range(0, len(shas), self.probe_batch_size):
+            ranks = range(start, min(start + self.probe_batch_size, len(shas)))
+            executor = ThreadPoolExecutor(max_workers=len(ranks) * len(images))
+            try:
+                pending: dict[Future, tuple[str, int]] = {
+                    executor.submit(self.registry.probe, image, f"{COMMIT_TAG_PREFIX}{shas[rank]}"): (image, rank)
+                    for rank in ranks
+                    for image in images
+                }
+                while pending:
+                    done, _ = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        image, rank = pending.pop(future)
+                        window.record(image, rank, future.result())
+                    candidate = window.candidate()
+                    if candidate is not None:
+                        for future, (_, rank) in list(pending.items()):
+                            if rank > candidate:
+                                future.cancel()
+                                del pending[future]
+                    if window.aligned() is not None:
+                        return window.matches()
+                    deadline.check()
+            finally:
+                # don't wait for probes that can no longer change the result
+                executor.shutdown(wait=False, cancel_futures=True)
+        return window.matches()
+
+    async def _probe_window_async(
+        self, registry: AsyncImageRegistryClient, images: list[str], shas: list[str]
+    ) -> dict[str, tuple[str, str | None]]:
+        window = CommitWindow(images, shas)
+        for start in range(0, len(shas), self.probe_batch_size):
+            ranks = range(start, min(start + self.probe_batch_size, len(shas)))
+            pending: dict[asyncio.Task, tuple[str, int]] = {
+                asyncio.create_task(registry.probe(image, f"{COMMIT_TAG_PREFIX}{shas[rank]}")): (image, rank)
+                for rank in ranks
+                for image in images
+            }
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        image, rank = pending.pop(task)
+                        window.record(image, rank, task.result())
+                    candidate = window.candidate()
+                    if candidate is not None:
+                        for task, (_, rank) in list(pending.items()):
+                            if rank > candidate:
+                                task.cancel()
+                                del pending[task]
+                    if window.aligned() is not None:
+                        return window.matches()
+            finally:
+                for task in pending:
+                    task.cancel()
+        return window.matches()
+
     # using hash to create a reproducible id
     def _generate_components_hash(self, components: list[Artifact]) -> str:
         sorted_components = sorted(components, key=lambda c: c.repository)
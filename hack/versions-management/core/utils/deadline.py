@@ -0,0 +1,69 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# a point in time work has to finish by, checked cooperatively by the workers doing it
+class Deadline:
+    def __init__(self, expires_at: float | None, reason: str):
+        self.expires_at: float | None = expires_at
+        self.reason: str = reason
+
+    # a deadline the given number of seconds from now, None never expires
+    @classmethod
+    def after(cls, seconds: float | None, reason: str) -> "Deadline":
+        return cls(time.monotonic() + seconds if seconds is not None else None, reason)
+
+    def earliest(self, other: "Deadline") -> "Deadline":
+        if other.expires_at is None:
+            return self
+        if self.expires_at is None or other.expires_at < self.expires_at:
+            return other
+        return self
+
+    # seconds left, None when the deadline never expires
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def check(self) -> None:
+        if self.expired():
+            raise DeadlineExceeded(self.reason)
+
+
+# a context variable rather than a thread local, so asyncio tasks and the threads they hand work
+# to with asyncio.to_thread see the deadline of the group they belong to
+_current: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+# the deadline of the work the caller does, for the waits deep in the clients to give up on
+# instead of outlasting it
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+@contextmanager
+def bounded_by(deadline: Deadline):
+    token = _current.set(deadline)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+# raises when a wait of the given seconds would outlast the caller's deadline
+def check_wait(seconds: float) -> None:
+    deadline = current_deadline()
+    if deadline is None:
+        return
+    remaining = deadline.remaining()
+    if remaining is not None and seconds > remaining:
+        raise DeadlineExceeded(deadline.reason)
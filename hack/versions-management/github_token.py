@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+import sys
+from core.clients.github_client import installation_token_provider
+from core.utils.logging import setup_logger
+
+
+# prints the shared installation token, minting a new one only when the cached one is about to expire
+def main():
+    logger = setup_logger("GitHubToken")
+    try:
+        print(installation_token_provider().token())
+        return 0
+    except Exception as e:
+        logger.error(f"Failed to obtain GitHub installation token: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
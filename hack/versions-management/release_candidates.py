@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict
+from core.repositories import ReleaseCandidateRepository, ShardedReleaseCandidateRepository
+from core.repositories.snapshot_archive import RetentionPolicy
+from core.utils.logging import setup_logger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_KEEP_LAST = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Release candidates storage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "export", help="Regenerate RELEASE_CANDIDATES_FILE from the snapshots in RELEASE_CANDIDATES_DIR"
+    )
+    commands.add_parser(
+        "import", help="Add the snapshots of RELEASE_CANDIDATES_FILE to RELEASE_CANDIDATES_DIR"
+    )
+    compact = commands.add_parser(
+        "compact",
+        help="Move snapshots other than the newest ones and the successful ones to the compressed archive",
+    )
+    compact.add_argument(
+        "--keep-last",
+        type=int,
+        default=int(os.environ.get("RELEASE_CANDIDATES_KEEP_LAST", DEFAULT_KEEP_LAST)),
+        help="Number of newest snapshots kept whatever their status",
+    )
+    commands.add_parser("pending", help="Print the id of the pending snapshot to test next, the oldest one")
+    show = commands.add_parser("show", help="Print a snapshot, looking in the archive when it was compacted")
+    show.add_argument("id", help="Snapshot id")
+    args = parser.parse_args()
+    logger = setup_logger("ReleaseCandidates")
+    try:
+        rc_file = os.environ.get("RELEASE_CANDIDATES_FILE", f"{ROOT_DIR}/release-candidates.yaml")
+        rc_dir = os.environ.get("RELEASE_CANDIDATES_DIR")
+        if args.command in ("export", "import") and not rc_dir:
+            raise Exception("RELEASE_CANDIDATES_DIR is required")
+        repository = ShardedReleaseCandidateRepository(rc_dir) if rc_dir else ReleaseCandidateRepository(rc_file)
+        if args.command == "export":
+            count = repository.export(rc_file)
+            logger.info(f"Exported {count} snapshots from {rc_dir} to {rc_file}")
+        elif args.command == "import":
+            count = repository.import_file(rc_file)
+            logger.info(f"Imported {count} snapshots from {rc_file} to {rc_dir}")
+        elif args.command == "compact":
+            archived = repository.compact(RetentionPolicy(keep_last=args.keep_last))
+            logger.info(f"Archived {len(archived)} snapshots to {repository.archive.file_path}")
+        elif args.command == "pending":
+            # newest first, like the file
+            pending = repository.find_by_status("pending")
+            if pending:
+                print(pending[-1].metadata.id)
+        else:
+            snapshot = repository.find_by_id(args.id) or repository.archive.find_by_id(args.id)
+            if snapshot is None:
+                raise Exception(f"Snapshot {args.id} not found")
+            print(json.dumps(asdict(snapshot), default=str))
+        return 0
+    except Exception as e:
+        logger.error(f"Release candidates {args.command} failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 def main():
     parser = argparse.ArgumentParser(description='Tag Reconciliation Service')
     parser.add_argument('--dry-run', action='store_true', help='Run in dry-run mode without making any changes')
+    parser.add_argument('--lightweight-tags', action='store_true', help='Create lightweight tags (a single ref) instead of annotated tags')
+    parser.add_argument('--full', action='store_true', help='Audit every version, ignoring the reconciliation journal')
     args = parser.parse_args()
     
     logger = setup_logger("TagReconciler")
@@ -17,7 +19,16 @@ def main():
     try:
         versions_file = os.environ.get("VERSIONS_FILE", f"{ROOT_DIR}/versions.yaml")
         logger.info(f"Starting tag reconciliationer with versions file: {versions_file}")
-        service = TagReconciliationService(versions_file, dry_run=args.dry_run)
+        journal_file = os.environ.get("RECONCILIATION_JOURNAL_FILE")
+        git_mirror_dir = os.environ.get("GIT_MIRROR_DIR")
+        service = TagReconciliationService(
+            versions_file,
+            dry_run=args.dry_run,
+            lightweight=args.lightweight_tags,
+            journal_file_path=journal_file,
+            full=args.full,
+            git_mirror_dir=git_mirror_dir,
+        )
         service.run()
         logger.info("Tag reconciliation run completed successfully")
         return 0
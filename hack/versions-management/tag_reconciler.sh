@@ -10,5 +10,11 @@ ARGS=()
 if [ "${DRY_RUN:-false}" = "true" ]; then
   ARGS+=(--dry-run)
 fi
+if [ "${FULL_RECONCILIATION:-false}" = "true" ]; then
+  ARGS+=(--full)
+fi
+if [ "${LIGHTWEIGHT_TAGS:-false}" = "true" ]; then
+  ARGS+=(--lightweight-tags)
+fi
 
 python "$SCRIPT_DIR/tag_reconciler.py" "${ARGS[@]}"
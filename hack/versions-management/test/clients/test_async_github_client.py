@@ -0,0 +1,105 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.clients.async_github_client import AsyncGitHubClient
+from core.clients.async_http import HostLimiter
+from core.clients.github_http_cache import HttpCache
+from core.clients.github_transport import GitHubTransport
+
+
+def github_app():
+    limited = []
+
+    async def latest_release(request):
+        if request.headers.get("Authorization") != "token fake-token":
+            return web.Response(status=401)
+        if request.match_info["name"] == "missing":
+            return web.Response(status=404)
+        if request.headers.get("If-None-Match") == '"r1"':
+            return web.Response(status=304, headers={"ETag": '"r1"'})
+        return web.json_response({"tag_name": "v1.9.5"}, headers={"ETag": '"r1"'})
+
+    async def commits(request):
+        if request.match_info["name"] == "busy" and not limited:
+            limited.append(True)
+            return web.Response(status=403, text="secondary rate limit", headers={"Retry-After": "0"})
+        count = int(request.query["per_page"])
+        return web.json_response([{"sha": f"sha{i}"} for i in range(30)][:count], headers={"ETag": '"c1"'})
+
+    app = web.Application()
+    app.router.add_get("/repos/{owner}/{name}/releases/latest", latest_release)
+    app.router.add_get("/repos/{owner}/{name}/commits", commits)
+    return app
+
+
+async def call(method, *args):
+    async with TestServer(github_app()) as server:
+        async with aiohttp.ClientSession() as session:
+            client = AsyncGitHubClient(session, "fake-token", HostLimiter(), api_url=str(server.make_url("")).rstrip("/"))
+            return await getattr(client, method)(*args)
+
+
+def test_get_latest_release_tag():
+    assert asyncio.run(call("get_latest_release_tag", "kubernetes-sigs/cluster-api")) == "v1.9.5"
+
+
+def test_get_latest_release_tag_missing():
+    with pytest.raises(Exception, match="failed with status 404"):
+        asyncio.run(call("get_latest_release_tag", "org/missing"))
+
+
+def test_get_commit_shas():
+    assert asyncio.run(call("get_commit_shas", "openshift/assisted-service", 3)) == ["sha0", "sha1", "sha2"]
+
+
+def test_conditional_requests(tmp_path):
+    async def scenario():
+        transport = GitHubTransport(HttpCache(str(tmp_path)))
+        async with TestServer(github_app()) as server:
+            async with aiohttp.ClientSession() as session:
+                client = AsyncGitHubClient(
+                    session, "fake-token", HostLimiter(), api_url=str(server.make_url("")).rstrip("/"), transport=transport
+                )
+                tags = [await client.get_latest_release_tag("kubernetes-sigs/cluster-api") for _ in range(2)]
+        return tags, transport
+
+    tags, transport = asyncio.run(scenario())
+    assert tags == ["v1.9.5", "v1.9.5"]
+    stats = transport.cache.stats()
+    assert (stats.hits, stats.not_modified, stats.misses) == (1, 1, 1)
+    assert transport.total_calls() == 2
+
+
+def test_commit_listing_shares_the_pygithub_cache_key(tmp_path):
+    async def scenario():
+        transport = GitHubTransport(HttpCache(str(tmp_path)))
+        async with TestServer(github_app()) as server:
+            async with aiohttp.ClientSession() as session:
+                client = AsyncGitHubClient(
+                    session, "fake-token", HostLimiter(), api_url=str(server.make_url("")).rstrip("/"), transport=transport
+                )
+                await client.get_commit_shas("openshift/assisted-service", 3)
+        return transport
+
+    transport = asyncio.run(scenario())
+    # the key PyGithub's paginated get_commits() requests with per_page=PAGE_SIZE
+    assert transport.cache.get("/repos/openshift/assisted-service/commits?per_page=100") is not None
+
+
+def test_secondary_rate_limit_is_retried():
+    async def scenario():
+        transport = GitHubTransport()
+        async with TestServer(github_app()) as server:
+            async with aiohttp.ClientSession() as session:
+                client = AsyncGitHubClient(
+                    session, "fake-token", HostLimiter(), api_url=str(server.make_url("")).rstrip("/"), transport=transport
+                )
+                return await client.get_commit_shas("openshift/busy", 2), transport
+
+    shas, transport = asyncio.run(scenario())
+    assert shas == ["sha0", "sha1"]
+    assert transport.total_calls() == 2
@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import replace
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.clients.async_http import HostLimiter
+from core.clients.async_image_registry_client import AsyncImageRegistryClient
+from core.clients.digest_cache import DigestCache
+from core.clients.image_registry_client import ManifestProbe
+
+
+def registry_app(requests_seen):
+    async def manifest(request):
+        requests_seen.append((request.method, request.match_info["tag"], request.headers.get("Authorization")))
+        if request.headers.get("Authorization") != "Bearer secret":
+            realm = f"http://{request.host}/auth"
+            return web.Response(
+                status=401,
+                headers={"WWW-Authenticate": f'Bearer realm="{realm}",service="registry",scope="repository:ns/repo:pull"'},
+            )
+        if request.match_info["tag"] != "latest-a":
+            return web.Response(status=404)
+        return web.Response(headers={"Docker-Content-Digest": "sha256:a", "Content-Type": "application/json"})
+
+    async def auth(request):
+        requests_seen.append(("TOKEN", request.query.get("scope"), None))
+        return web.json_response({"token": "secret", "expires_in": 300})
+
+    app = web.Application()
+    app.router.add_route("*", "/v2/ns/repo/manifests/{tag}", manifest)
+    app.router.add_get("/auth", auth)
+    return app
+
+
+async def run_probes(tmp_path, tags):
+    requests_seen = []
+    async with TestServer(registry_app(requests_seen)) as server:
+        async with aiohttp.ClientSession() as session:
+            client = AsyncImageRegistryClient(
+                session,
+                HostLimiter(default_limit=2),
+                registry_url=str(server.make_url("")).rstrip("/"),
+                cache=DigestCache(str(tmp_path)),
+            )
+            probes = [await client.probe("quay.io/ns/repo", tag) for tag in tags]
+    return probes, requests_seen
+
+
+def test_probe_negotiates_token_and_caches(tmp_path):
+    probes, requests_seen = asyncio.run(run_probes(tmp_path, ["latest-a", "latest-b", "latest-a"]))
+
+    assert probes == [
+        ManifestProbe(exists=True, status_code=200, digest="sha256:a", media_type="application/json"),
+        ManifestProbe(exists=False, status_code=404),
+        ManifestProbe(exists=True, status_code=200, digest="sha256:a", media_type="application/json"),
+    ]
+    assert requests_seen == [
+        ("HEAD", "latest-a", None),
+        ("TOKEN", "repository:ns/repo:pull", None),
+        ("HEAD", "latest-a", "Bearer secret"),
+        ("HEAD", "latest-b", "Bearer secret"),
+    ]
+
+
+def test_rejected_token_is_refreshed(tmp_path):
+    async def scenario():
+        requests_seen = []
+        async with TestServer(registry_app(requests_seen)) as server, aiohttp.ClientSession() as session:
+            client = AsyncImageRegistryClient(
+                session, HostLimiter(default_limit=2), registry_url=str(server.make_url("")).rstrip("/")
+            )
+            await client.probe("quay.io/ns/repo", "latest-a")
+            # the cached token is revoked before it expires
+            scope = client.tokens.scope("ns/repo")
+            client.tokens.put(scope, replace(client.tokens.get(scope), value="revoked"))
+            probe = await client.probe("quay.io/ns/repo", "latest-a")
+        return probe, requests_seen
+
+    probe, requests_seen = asyncio.run(scenario())
+
+    assert probe.digest == "sha256:a"
+    assert requests_seen[3:] == [
+        ("HEAD", "latest-a", "Bearer revoked"),
+        ("TOKEN", "repository:ns/repo:pull", None),
+        ("HEAD", "latest-a", "Bearer secret"),
+    ]
+
+
+def test_probe_retries_transient_statuses_with_backoff(monkeypatch, caplog):
+    statuses = [503, 429, 200]
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        await real_sleep(0)
+
+    async def manifest(request):
+        status = statuses.pop(0)
+        headers = {"Docker-Content-Digest": "sha256:a"} if status == 200 else {}
+        if status == 429:
+            headers["Retry-After"] = "2"
+        return web.Response(status=status, headers=headers)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_route("*", "/v2/ns/repo/manifests/{tag}", manifest)
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            client = AsyncImageRegistryClient(
+                session,
+                HostLimiter(default_limit=2),
+                registry_url=str(server.make_url("")).rstrip("/"),
+                backoff_jitter=0,
+            )
+            return await client.probe("quay.io/ns/repo", "latest-a")
+
+    monkeypatch.setattr("core.clients.async_image_registry_client.asyncio.sleep", sleep)
+    probe = asyncio.run(scenario())
+
+    assert probe.digest == "sha256:a"
+    # no backoff before the first retry, as in urllib3; the 429 waits for its Retry-After
+    delays = [r.message.rsplit(" ", 1)[1] for r in caplog.records if "retrying" in r.message]
+    assert delays == ["0.0s", "2.0s"]
+
+
+def test_probe_gives_up_after_the_retries():
+    requests_seen = []
+
+    async def manifest(request):
+        requests_seen.append(request.method)
+        return web.Response(status=502)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_route("*", "/v2/ns/repo/manifests/{tag}", manifest)
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            client = AsyncImageRegistryClient(
+                session,
+                HostLimiter(default_limit=2),
+                registry_url=str(server.make_url("")).rstrip("/"),
+                backoff_factor=0,
+            )
+            return await client.probe("quay.io/ns/repo", "latest-a")
+
+    assert asyncio.run(scenario()) == ManifestProbe(exists=False, status_code=502)
+    assert requests_seen == ["HEAD"] * 4
+
+
+def test_host_limiter_bounds_concurrency():
+    async def scenario():
+        limiter = HostLimiter({"quay.io": 2})
+        in_flight = 0
+        peak = 0
+
+        async def request():
+            nonlocal in_flight, peak
+            async with limiter.limit("https://quay.io/v2/ns/repo/manifests/tag"):
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(request() for _ in range(10)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
@@ -0,0 +1,50 @@
+import pytest
+from core.clients.digest_cache import CacheEntry, DigestCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DigestCache(str(tmp_path / "cache"), max_entries=3, negative_ttl=60)
+    yield cache
+    cache.close()
+
+
+def test_positive_entries_persist_across_instances(tmp_path):
+    cache = DigestCache(str(tmp_path))
+    cache.put("quay.io/ns/repo", "latest-a", CacheEntry(digest="sha256:a", media_type="application/json"))
+    cache.close()
+
+    reopened = DigestCache(str(tmp_path))
+    assert reopened.get("quay.io/ns/repo", "latest-a") == CacheEntry(digest="sha256:a", media_type="application/json")
+    assert reopened.stats().hits == 1
+    reopened.close()
+
+
+def test_miss_is_counted(cache):
+    assert cache.get("quay.io/ns/repo", "latest-a") is None
+    assert cache.stats().misses == 1
+
+
+def test_negative_entries_expire(cache, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("core.clients.digest_cache.time.time", lambda: now)
+    cache.put("quay.io/ns/repo", "latest-a", CacheEntry(digest=None))
+    assert cache.get("quay.io/ns/repo", "latest-a") == CacheEntry(digest=None)
+
+    now = 1061.0
+    assert cache.get("quay.io/ns/repo", "latest-a") is None
+    assert cache.stats().entries == 0
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("core.clients.digest_cache.time.time", lambda: float(next(clock)))
+    for tag in ("a", "b", "c"):
+        cache.put("quay.io/ns/repo", tag, CacheEntry(digest=f"sha256:{tag}"))
+    # touching "a" makes "b" the least recently used entry
+    cache.get("quay.io/ns/repo", "a")
+    cache.put("quay.io/ns/repo", "d", CacheEntry(digest="sha256:d"))
+
+    assert cache.stats().entries == 3
+    assert cache.get("quay.io/ns/repo", "b") is None
+    assert cache.get("quay.io/ns/repo", "a") is not None
@@ -0,0 +1,104 @@
+import os
+import subprocess
+
+import pytest
+from core.clients.git_mirror_client import GitMirrorClient
+from core.utils.deadline import Deadline, DeadlineExceeded, bounded_by
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    # a working repository pushed to a local bare "remote", standing in for github.com
+    work = tmp_path / "work"
+    work.mkdir()
+    git(work, "init", "--quiet", "--initial-branch=main")
+    remote = tmp_path / "remote" / "openshift" / "repo.git"
+    remote.parent.mkdir(parents=True)
+    git(tmp_path, "init", "--quiet", "--bare", "--initial-branch=main", str(remote))
+    git(work, "remote", "add", "origin", str(remote))
+
+    def commit(message, tag=None, lightweight=False):
+        git(work, "commit", "--quiet", "--allow-empty", "-m", message)
+        if tag:
+            git(work, "tag", tag) if lightweight else git(work, "tag", "-a", tag, "-m", tag)
+        git(work, "push", "--quiet", "--follow-tags", "origin", "main")
+        if tag:
+            git(work, "push", "--quiet", "origin", tag)
+        return git(work, "rev-parse", "HEAD")
+
+    commit.remote_url = str(tmp_path / "remote" / "{repo}.git")
+    return commit
+
+
+def test_commit_shas_newest_first(upstream, tmp_path):
+    shas = [upstream(f"commit {i}") for i in range(3)]
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    assert client.commit_shas("openshift/repo", 2) == [shas[2], shas[1]]
+
+
+def test_list_tags_with_prefix(upstream, tmp_path):
+    upstream("one", tag="capoa-v1.0.0")
+    upstream("two", tag="capoa-v1.1.0", lightweight=True)
+    upstream("three", tag="v2.0.0")
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    assert client.list_tags("openshift/repo", "capoa-") == {"capoa-v1.0.0", "capoa-v1.1.0"}
+    assert client.list_tags("openshift/repo") == {"capoa-v1.0.0", "capoa-v1.1.0", "v2.0.0"}
+
+
+def test_repository_without_tags(upstream, tmp_path):
+    upstream("one")
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    assert client.list_tags("openshift/repo", "capoa-") == set()
+
+
+def test_mirror_is_fetched_once_per_run_and_incrementally_across_runs(upstream, tmp_path):
+    first = upstream("one")
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    assert client.commit_shas("openshift/repo", 5) == [first]
+
+    second = upstream("two", tag="capoa-v1.0.0")
+    # same run: answered from the mirror as already synced
+    assert client.commit_shas("openshift/repo", 5) == [first]
+
+    next_run = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    assert next_run.commit_shas("openshift/repo", 5) == [second, first]
+    assert next_run.list_tags("openshift/repo", "capoa-") == {"capoa-v1.0.0"}
+
+
+def test_missing_remote(tmp_path):
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=str(tmp_path / "nowhere" / "{repo}.git"))
+    with pytest.raises(Exception, match="git clone failed for openshift/repo"):
+        client.commit_shas("openshift/repo", 5)
+
+
+def test_mirror_copies_branches_and_tags_only(upstream, tmp_path):
+    remote = str(tmp_path / "remote" / "openshift" / "repo.git")
+    first = upstream("one", tag="v1.0.0")
+    git(tmp_path, "--git-dir", remote, "update-ref", "refs/pull/1/head", first)
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    client.sync("openshift/repo")
+
+    second = upstream("two", tag="v1.1.0")
+    git(tmp_path, "--git-dir", remote, "update-ref", "refs/pull/2/head", second)
+    next_run = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    path = next_run.sync("openshift/repo")
+
+    refs = git(tmp_path, "--git-dir", path, "for-each-ref", "--format=%(refname)").split()
+    assert sorted(refs) == ["refs/heads/main", "refs/tags/v1.0.0", "refs/tags/v1.1.0"]
+
+
+def test_clone_stops_at_the_callers_deadline(upstream, tmp_path):
+    upstream("one")
+    client = GitMirrorClient(str(tmp_path / "mirrors"), remote_url=upstream.remote_url)
+    with bounded_by(Deadline(0, "group deadline")):
+        with pytest.raises(DeadlineExceeded, match="group deadline"):
+            client.sync("openshift/repo")
+    # nothing half cloned is left to be fetched into by the next run
+    assert os.listdir(tmp_path / "mirrors" / "openshift") == []
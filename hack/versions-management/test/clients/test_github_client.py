@@ -1,5 +1,20 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
 import pytest
-from core.clients.github_client import GitHubClient
+import requests
+from core.clients.github_client import GitHubClient, RepositoryHead
+from core.clients.github_transport import (
+    DeadlineRetry,
+    GitHubTransport,
+    MeteredAdapter,
+    MeteredConnection,
+    endpoint,
+    request_path,
+)
+from core.utils.deadline import Deadline, DeadlineExceeded, bounded_by
 
 class DummyIntegration:
     def __init__(self, app_id, private_key):
@@ -7,6 +22,7 @@ class DummyIntegration:
     def get_access_token(self, installation_id):
         class Token:
             token = "fake-token"
+            expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
         return Token()
 
 @pytest.fixture(autouse=True)
@@ -28,3 +44,263 @@ def test_missing_credentials(monkeypatch):
     monkeypatch.delenv("GITHUB_APP_ID", raising=False)
     with pytest.raises(EnvironmentError):
         GitHubClient()
+
+
+def test_get_repo_is_memoized_per_thread(monkeypatch):
+    client = GitHubClient()
+    calls = []
+    def get_repo(github, full_name):
+        calls.append(github)
+        return object()
+    monkeypatch.setattr("github.Github.get_repo", get_repo)
+
+    repos = [client.get_repo("org/repo") for _ in range(3)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(client.get_repo, "org/repo").result()
+
+    assert all(repo is repos[0] for repo in repos)
+    assert other is not repos[0]
+    # the worker thread looked the repository up through its own client
+    assert len(calls) == 2 and calls[0] is not calls[1]
+
+
+def test_transport_is_installed_on_requester():
+    client = GitHubClient()
+    connection = client.client.requester._Requester__connectionClass("api.github.com")
+    assert isinstance(connection, MeteredConnection)
+    adapter = connection.session.get_adapter("https://api.github.com/repos/org/repo")
+    assert isinstance(adapter, MeteredAdapter)
+    assert adapter.transport is client.transport
+
+
+def test_install_fails_loudly_without_the_connection_class(monkeypatch):
+    client = GitHubClient()
+    requester = client.client.requester
+    monkeypatch.delattr(requester, "_Requester__connectionClass")
+    with pytest.raises(RuntimeError, match="_Requester__connectionClass"):
+        client.transport.install(client.client)
+
+
+class DummyHttpResponse:
+    status_code = 200
+    headers = {}
+    text = "{}"
+
+
+def ok_response(request):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"{}"
+    response.request = request
+    return response
+
+
+def test_metered_connection_counts_calls_per_endpoint(monkeypatch):
+    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", lambda adapter, request, **kwargs: ok_response(request))
+    transport = GitHubTransport()
+    for path in ("/repos/openshift/a/git/ref/tags/v1", "/repos/openshift/b/git/ref/tags/v2", "/repos/openshift/a"):
+        connection = MeteredConnection(transport, "api.github.com")
+        connection.request("GET", path, None, {})
+        connection.getresponse()
+
+    assert transport.api_calls() == {
+        "GET /repos/{owner}/{repo}/git/ref/{ref}": 2,
+        "GET /repos/{owner}/{repo}": 1,
+    }
+    assert transport.total_calls() == 3
+
+
+@pytest.mark.parametrize("verb,url,expected", [
+    ("GET", "/repos/o/r/commits?per_page=20", "GET /repos/{owner}/{repo}/commits"),
+    ("POST", "/repos/o/r/git/tags", "POST /repos/{owner}/{repo}/git/tags"),
+    ("GET", "/repos/o/r/git/matching-refs/tags/capoa-", "GET /repos/{owner}/{repo}/git/matching-refs/{ref}"),
+    ("GET", "/rate_limit", "GET /rate_limit"),
+])
+def test_endpoint(verb, url, expected):
+    assert endpoint(verb, url) == expected
+
+
+def test_request_path_keeps_the_query():
+    assert request_path("https://api.github.com:443/repos/o/r/commits?per_page=100") == "/repos/o/r/commits?per_page=100"
+    assert request_path("https://api.github.com:443/repos/o/r") == "/repos/o/r"
+
+
+def test_list_tags(monkeypatch):
+    client = GitHubClient()
+    listed = []
+    class Ref:
+        def __init__(self, ref):
+            self.ref = ref
+    class Repo:
+        def get_git_matching_refs(self, ref):
+            listed.append(ref)
+            return [Ref("refs/tags/capoa-v1.0.0"), Ref("refs/tags/capoa-v1.1.0")]
+    monkeypatch.setattr(client.client, "get_repo", lambda full_name: Repo())
+    assert client.list_tags("openshift/repo", "capoa-") == {"capoa-v1.0.0", "capoa-v1.1.0"}
+    assert listed == ["tags/capoa-"]
+
+
+class FakeGitHub:
+    def __init__(self):
+        self.seen = []
+
+    def send(self, request, **kwargs):
+        headers = request.headers
+        self.seen.append(headers.get("If-None-Match"))
+        response = requests.Response()
+        response.headers["ETag"] = '"v1"'
+        response.headers["X-RateLimit-Remaining"] = str(5000 - len(self.seen))
+        response.headers["X-RateLimit-Limit"] = "5000"
+        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 3600)
+        response.encoding = "utf-8"
+        if headers.get("If-None-Match") == '"v1"':
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response.headers["Content-Type"] = "application/json"
+            response._content = b'{"full_name": "org/repo", "url": "https://api.github.com/repos/org/repo"}'
+        return response
+
+
+def test_conditional_requests_replay_cached_body(monkeypatch, tmp_path):
+    monkeypatch.setenv("GITHUB_HTTP_CACHE_DIR", str(tmp_path))
+    server = FakeGitHub()
+    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", lambda adapter, request, **kwargs: server.send(request))
+
+    # a fresh client per run, like consecutive cron jobs sharing the cache directory
+    names = [GitHubClient().get_repo("org/repo").full_name for _ in range(3)]
+
+    assert names == ["org/repo"] * 3
+    assert server.seen == [None, '"v1"', '"v1"']
+    stats = GitHubClient().cache_stats()
+    assert (stats.hits, stats.not_modified, stats.misses, stats.entries) == (0, 0, 0, 1)
+
+
+def test_cache_stats_per_run(monkeypatch, tmp_path):
+    monkeypatch.setenv("GITHUB_HTTP_CACHE_DIR", str(tmp_path))
+    server = FakeGitHub()
+    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", lambda adapter, request, **kwargs: server.send(request))
+    client = GitHubClient()
+    client.client.get_repo("org/repo")
+    client.client.get_repo("org/repo")
+    stats = client.cache_stats()
+    assert (stats.hits, stats.not_modified, stats.misses) == (1, 1, 1)
+
+
+def test_no_cache_without_directory(monkeypatch):
+    monkeypatch.delenv("GITHUB_HTTP_CACHE_DIR", raising=False)
+    assert GitHubClient().cache_stats() is None
+
+
+def test_get_repository_heads(monkeypatch):
+    client = GitHubClient()
+    queries = []
+
+    def graphql_query(query, variables):
+        queries.append((query, variables))
+        return {}, {"data": {
+            "r0": {
+                "latestRelease": {"tagName": "v1.9.5"},
+                "defaultBranchRef": {"target": {"history": {"nodes": [{"oid": "a"}, {"oid": "b"}]}}},
+            },
+            "r1": {"latestRelease": None, "defaultBranchRef": None},
+        }}
+
+    monkeypatch.setattr(client.client.requester, "graphql_query", graphql_query)
+    heads = client.get_repository_heads(["kubernetes-sigs/cluster-api", "openshift/empty"], 2)
+
+    assert heads == {
+        "kubernetes-sigs/cluster-api": RepositoryHead(latest_release="v1.9.5", commit_shas=["a", "b"]),
+        "openshift/empty": RepositoryHead(latest_release=None, commit_shas=[]),
+    }
+    assert len(queries) == 1
+    query, variables = queries[0]
+    assert variables == {"count": 2, "owner0": "kubernetes-sigs", "name0": "cluster-api", "owner1": "openshift", "name1": "empty"}
+    assert "r1: repository(owner: $owner1, name: $name1)" in query
+
+
+def test_get_repository_heads_missing_repository(monkeypatch):
+    client = GitHubClient()
+    monkeypatch.setattr(client.client.requester, "graphql_query", lambda query, variables: ({}, {"data": {"r0": None}}))
+    with pytest.raises(Exception, match="Repository org/gone not found"):
+        client.get_repository_heads(["org/gone"], 20)
+
+
+def test_requests_use_the_installation_token(monkeypatch):
+    monkeypatch.delenv("GITHUB_TOKEN_CACHE_FILE", raising=False)
+    client = GitHubClient()
+    headers = {}
+    client.client.requester.auth.authentication(headers)
+    assert headers == {"Authorization": "token fake-token"}
+    assert client.token == "fake-token"
+    assert client.tokens.mints == 1
+
+
+def test_rate_limit_usage_is_tracked(monkeypatch, tmp_path):
+    monkeypatch.delenv("GITHUB_HTTP_CACHE_DIR", raising=False)
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_FLOOR", "50")
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_MAX_WAIT", "120")
+    server = FakeGitHub()
+    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", lambda adapter, request, **kwargs: server.send(request))
+    client = GitHubClient()
+    assert client.transport.rate_limits.floor == 50
+    assert client.transport.rate_limits.max_wait == 120
+    client.client.get_repo("org/repo")
+    client.client.get_repo("org/repo")
+    assert client.rate_limit_usage()["core"]["remaining"] == 4998
+
+
+def test_each_thread_has_its_own_client():
+    client = GitHubClient()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        barrier = threading.Barrier(2)
+        def worker_client(_):
+            barrier.wait()
+            return client.client
+        clients = list(executor.map(worker_client, range(2)))
+
+    assert clients[0] is not clients[1]
+    assert clients[0].requester is not clients[1].requester
+    assert client.client is client.client
+    connection = clients[1].requester._Requester__connectionClass("api.github.com")
+    assert connection.session.get_adapter("https://api.github.com/").transport is client.transport
+
+
+def test_adapter_throttles_before_sending(monkeypatch):
+    events = []
+    def send(adapter, request, **kwargs):
+        events.append(("sent", request_path(request.url)))
+        return ok_response(request)
+    monkeypatch.setattr("requests.adapters.HTTPAdapter.send", send)
+    transport = GitHubTransport()
+    transport.rate_limits.throttle = lambda resource: events.append(("throttled", resource))
+    connection = MeteredConnection(transport, "api.github.com")
+
+    connection.request("GET", "/repos/openshift/a", None, {})
+    connection.getresponse()
+    connection.request("POST", "/graphql", "{}", {})
+    connection.getresponse()
+
+    assert events == [
+        ("throttled", "core"),
+        ("sent", "/repos/openshift/a"),
+        ("throttled", "graphql"),
+        ("sent", "/graphql"),
+    ]
+
+
+def test_retry_gives_up_on_waits_past_the_deadline(monkeypatch):
+    slept = []
+    monkeypatch.setattr("urllib3.util.retry.time.sleep", slept.append)
+    response = DummyHttpResponse()
+    response.headers = {"Retry-After": "30"}
+    retry = DeadlineRetry()
+
+    with bounded_by(Deadline.after(60, "group deadline")):
+        retry.sleep(response)
+    with bounded_by(Deadline.after(10, "group deadline")):
+        with pytest.raises(DeadlineExceeded, match="group deadline"):
+            retry.sleep(response)
+
+    assert slept == [30]
@@ -0,0 +1,46 @@
+import pytest
+from core.clients.github_http_cache import CachedResponse, HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_responses_persist_across_instances(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    assert cache.store("/repos/o/r", {"ETag": '"abc"', "Content-Type": "application/json"}, '{"id": 1}')
+    cache.close()
+
+    reopened = HttpCache(str(tmp_path))
+    cached = reopened.get("/repos/o/r")
+    assert cached == CachedResponse(
+        body='{"id": 1}', headers={"ETag": '"abc"', "Content-Type": "application/json"}, etag='"abc"'
+    )
+    assert cached.conditional_headers() == {"If-None-Match": '"abc"'}
+    reopened.close()
+
+
+def test_responses_without_validators_are_not_stored(cache):
+    assert not cache.store("/repos/o/r", {"Content-Type": "application/json"}, "{}")
+    assert cache.get("/repos/o/r") is None
+    assert cache.stats().misses == 1
+
+
+def test_last_modified_validator(cache):
+    cache.store("/repos/o/r", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}, "{}")
+    assert cache.get("/repos/o/r").conditional_headers() == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("core.clients.github_http_cache.time.time", lambda: next(clock))
+    cache.store("/a", {"ETag": "a"}, "{}")
+    cache.store("/b", {"ETag": "b"}, "{}")
+    cache.get("/a")
+    cache.store("/c", {"ETag": "c"}, "{}")
+    assert cache.get("/b") is None
+    assert cache.get("/a") is not None
+    assert cache.stats().entries == 2
@@ -0,0 +1,107 @@
+import pytest
+from core.clients.github_rate_limit import RateLimitExceeded, RateLimitTracker, resource_for, retry_delay
+from core.utils.deadline import Deadline, DeadlineExceeded, bounded_by
+
+
+def headers(remaining, reset=2000, limit=5000, resource="core"):
+    return {
+        "X-RateLimit-Resource": resource,
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+    }
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr("core.clients.github_rate_limit.time.time", lambda: now["t"])
+    return now
+
+
+def test_usage_tracks_spent_budget_per_resource():
+    tracker = RateLimitTracker()
+    tracker.update(headers(4999), 200)
+    tracker.update(headers(4997), 200)
+    # an older response processed late does not raise the budget back
+    tracker.update(headers(4998), 200)
+    tracker.update(headers(4997), 304)
+    tracker.update(headers(4990, resource="graphql"), 200)
+    # a new window starts from its own counts
+    tracker.update(headers(4999, reset=5600), 200)
+
+    usage = tracker.usage()
+    assert usage["core"] == {"resource": "core", "limit": 5000, "remaining": 4999, "reset": 5600.0, "spent": 4}
+    assert usage["graphql"]["spent"] == 1
+
+
+def test_responses_without_rate_limit_headers_are_ignored():
+    tracker = RateLimitTracker()
+    tracker.update({"Content-Type": "application/json"}, 200)
+    assert tracker.usage() == {}
+
+
+def test_no_wait_with_plenty_of_budget(clock):
+    tracker = RateLimitTracker(floor=100)
+    assert tracker.reserve("core") == 0
+    tracker.update(headers(4000), 200)
+    assert tracker.reserve("core") == 0
+
+
+def test_dispatch_is_paced_near_the_floor(clock):
+    tracker = RateLimitTracker(floor=100)
+    tracker.update(headers(150), 200)
+    # 50 requests of headroom spread over the 1000s left in the window
+    assert tracker.reserve("core") == 0
+    assert tracker.reserve("core") == pytest.approx(20)
+    # each slot spreads the headroom over what is left of the window
+    assert tracker.reserve("core") == pytest.approx(20 + 980 / 50)
+    assert tracker.throttled == pytest.approx(20 + 20 + 980 / 50)
+
+
+def test_dispatch_waits_for_reset_at_the_floor(clock):
+    tracker = RateLimitTracker(floor=100, max_wait=3600)
+    tracker.update(headers(100), 200)
+    assert tracker.reserve("core") == 1000
+    assert tracker.reserve("graphql") == 0
+    clock["t"] = 2001
+    assert tracker.reserve("core") == 0
+
+
+def test_waits_past_the_cap_fail_without_reserving(clock):
+    tracker = RateLimitTracker(floor=100, max_wait=300)
+    tracker.update(headers(100), 200)
+    with pytest.raises(RateLimitExceeded, match="1000s wait"):
+        tracker.reserve("core")
+    assert tracker.throttled == 0
+    # once the reset is within the cap the request waits for it
+    clock["t"] = 1800
+    assert tracker.reserve("core") == 200
+
+
+def test_waits_past_the_callers_deadline_fail_without_reserving(clock):
+    tracker = RateLimitTracker(floor=100)
+    tracker.update(headers(150), 200)
+    assert tracker.reserve("core") == 0
+    with bounded_by(Deadline.after(5, "group deadline")):
+        with pytest.raises(DeadlineExceeded, match="group deadline"):
+            tracker.throttle("core")
+    # the refused slot is still free for the next caller
+    assert tracker.reserve("core") == pytest.approx(20)
+
+
+def test_resource_for():
+    assert resource_for("https://api.github.com/graphql") == "graphql"
+    assert resource_for("/repos/o/r/commits") == "core"
+
+
+@pytest.mark.parametrize("status,response_headers,body,attempt,expected", [
+    (200, {}, "", 0, None),
+    (403, {"Retry-After": "30"}, "", 0, 30),
+    (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1100"}, "", 0, 101),
+    (403, {}, "You have exceeded a secondary rate limit", 1, 120),
+    (429, {}, "", 0, 60),
+    (403, {}, "Resource not accessible by integration", 0, None),
+])
+def test_retry_delay(clock, status, response_headers, body, attempt, expected):
+    assert retry_delay(status, response_headers, body, attempt) == expected
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from core.clients.github_token_cache import InstallationTokenAuth, InstallationTokenProvider
+
+
+class FakeIntegration:
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.minted = 0
+
+    def get_access_token(self, installation_id):
+        self.minted += 1
+        outer = self
+
+        class Authorization:
+            token = f"token-{outer.minted}"
+            expires_at = datetime.fromtimestamp(1000 + outer.ttl, timezone.utc)
+        return Authorization()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1000.0}
+    monkeypatch.setattr("core.clients.github_token_cache.time.time", lambda: now["t"])
+    return now
+
+
+def test_token_is_reused_until_refresh_margin(clock):
+    integration = FakeIntegration()
+    provider = InstallationTokenProvider(integration, 456, refresh_margin=300)
+    assert provider.token() == "token-1"
+    clock["t"] = 1000 + 3600 - 301
+    assert provider.token() == "token-1"
+    # refreshed proactively, before the token actually expires
+    clock["t"] = 1000 + 3600 - 299
+    assert provider.token() == "token-2"
+    assert provider.mints == 2
+
+
+def test_cache_file_is_shared_between_providers(tmp_path, clock):
+    cache_file = str(tmp_path / "cache" / "token.json")
+    integration = FakeIntegration()
+    first = InstallationTokenProvider(integration, 456, cache_file)
+    second = InstallationTokenProvider(integration, 456, cache_file)
+    assert first.token() == "token-1"
+    assert second.token() == "token-1"
+    assert integration.minted == 1
+    assert os.stat(cache_file).st_mode & 0o777 == 0o600
+
+
+def test_cache_file_of_another_installation_is_ignored(tmp_path, clock):
+    cache_file = tmp_path / "token.json"
+    cache_file.write_text(json.dumps({"installation_id": 1, "token": "other", "expires_at": 99999}))
+    assert InstallationTokenProvider(FakeIntegration(), 456, str(cache_file)).token() == "token-1"
+
+
+def test_unreadable_cache_file_is_replaced(tmp_path, clock):
+    cache_file = tmp_path / "token.json"
+    cache_file.write_text("garbage")
+    assert InstallationTokenProvider(FakeIntegration(), 456, str(cache_file)).token() == "token-1"
+    assert json.loads(cache_file.read_text())["token"] == "token-1"
+
+
+def test_concurrent_callers_mint_once(tmp_path):
+    integration = FakeIntegration(ttl=10**10)
+    provider = InstallationTokenProvider(integration, 456, str(tmp_path / "token.json"))
+    threads = [threading.Thread(target=provider.token) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert integration.minted == 1
+
+
+def test_mint_failure():
+    class BrokenIntegration:
+        def get_access_token(self, installation_id):
+            raise RuntimeError("bad key")
+    with pytest.raises(Exception, match="Failed to obtain GitHub installation token: bad key"):
+        InstallationTokenProvider(BrokenIntegration(), 456).token()
+
+
+def test_auth_header(clock):
+    auth = InstallationTokenAuth(InstallationTokenProvider(FakeIntegration(), 456))
+    headers = {}
+    auth.authentication(headers)
+    assert headers == {"Authorization": "token token-1"}
@@ -1,20 +1,245 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
-import requests
-from core.clients.image_registry_client import ImageRegistryClient
+from urllib3 import HTTPResponse
+from core.clients.digest_cache import DigestCache
+from core.clients.image_registry_client import MANIFEST_ACCEPT, ImageRegistryClient, ManifestProbe, backoff_delay, registry_retry
 
 class DummyResponse:
-    def __init__(self, status_code):
+    def __init__(self, status_code, headers=None):
         self.status_code = status_code
+        self.headers = headers or {}
 
 @pytest.fixture
-def client(): 
+def client():
     return ImageRegistryClient()
 
 @pytest.mark.parametrize("status,exists", [(200, True), (404, False)])
 def test_exists(monkeypatch, client, status, exists):
-    monkeypatch.setattr(requests, "head", lambda url, headers, timeout: DummyResponse(status))
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: DummyResponse(status))
     assert client.exists("quay.io/ns/repo", "tag") is exists
 
 def test_exists_error(monkeypatch, client):
-    monkeypatch.setattr(requests, "head", lambda url, headers, timeout: (_ for _ in ()).throw(Exception("fail")))
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: (_ for _ in ()).throw(Exception("fail")))
     assert client.exists("quay.io/ns/repo", "tag") is False
+
+def test_resolve_digest(monkeypatch, client):
+    calls = []
+    def fake_get(url, headers, timeout):
+        calls.append((url, timeout))
+        return DummyResponse(200, {"Docker-Content-Digest": "sha256:abc"})
+    monkeypatch.setattr(client.session, "get", fake_get)
+    assert client.resolve_digest("quay.io/ns/repo", "tag") == "sha256:abc"
+    assert calls == [("https://quay.io/v2/ns/repo/manifests/tag", client.timeout)]
+
+def test_probe_single_head(monkeypatch, client):
+    headers = {"Docker-Content-Digest": "sha256:abc", "Content-Type": MANIFEST_ACCEPT}
+    monkeypatch.setattr(client.session, "head", lambda url, **kwargs: DummyResponse(200, headers))
+    monkeypatch.setattr(client.session, "get", lambda url, headers, timeout: pytest.fail("unexpected GET"))
+    probe = client.probe("quay.io/ns/repo", "tag")
+    assert probe == ManifestProbe(exists=True, status_code=200, digest="sha256:abc", media_type=MANIFEST_ACCEPT)
+
+def test_probe_falls_back_to_get_without_digest(monkeypatch, client):
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: DummyResponse(200))
+    monkeypatch.setattr(client.session, "get", lambda url, headers, timeout: DummyResponse(200, {"Docker-Content-Digest": "sha256:def"}))
+    probe = client.probe("quay.io/ns/repo", "tag")
+    assert probe.exists
+    assert probe.digest == "sha256:def"
+
+@pytest.mark.parametrize("status", [401, 404])
+def test_probe_missing(monkeypatch, client, status):
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: DummyResponse(status))
+    assert client.probe("quay.io/ns/repo", "tag") == ManifestProbe(exists=False, status_code=status)
+
+def test_probe_error(monkeypatch, client):
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: (_ for _ in ()).throw(Exception("fail")))
+    assert client.probe("quay.io/ns/repo", "tag") == ManifestProbe(exists=False)
+
+class TokenPage:
+    status_code = 200
+
+    def __init__(self, token):
+        self.token = token
+
+    def json(self):
+        return {"token": self.token, "expires_in": 300}
+
+class TagsPage:
+    def __init__(self, tags, next_url=None, status_code=200):
+        self.status_code = status_code
+        self.tags = tags
+        self.links = {"next": {"url": next_url}} if next_url else {}
+
+    def json(self):
+        return {"name": "ns/repo", "tags": self.tags}
+
+def test_list_tags_follows_pagination(monkeypatch, client):
+    pages = {
+        "https://quay.io/v2/ns/repo/tags/list": TagsPage(["latest-a", "v1.0"], "/v2/ns/repo/tags/list?n=2&last=v1.0"),
+        "https://quay.io/v2/ns/repo/tags/list?n=2&last=v1.0": TagsPage(["latest-b", "latest"]),
+    }
+    requested = []
+    def fake_get(url, params, headers, timeout):
+        requested.append((url, params))
+        return pages[url]
+    monkeypatch.setattr(client.session, "get", fake_get)
+    assert client.list_tags("quay.io/ns/repo", prefix="latest-", page_size=2) == {"latest-a", "latest-b"}
+    assert requested == [
+        ("https://quay.io/v2/ns/repo/tags/list", {"n": 2}),
+        ("https://quay.io/v2/ns/repo/tags/list?n=2&last=v1.0", None),
+    ]
+
+def test_list_tags_failure(monkeypatch, client):
+    monkeypatch.setattr(client.session, "get", lambda url, **kwargs: TagsPage([], status_code=401))
+    assert client.list_tags("quay.io/ns/repo") is None
+
+class QuayTagsPage:
+    def __init__(self, tags, has_additional=False, status_code=200):
+        self.status_code = status_code
+        self.body = {"tags": tags, "has_additional": has_additional}
+
+    def json(self):
+        return self.body
+
+def test_list_tag_digests_uses_quay_api(monkeypatch, client):
+    pages = {
+        1: QuayTagsPage([{"name": "latest-a", "manifest_digest": "sha256:a"}], has_additional=True),
+        2: QuayTagsPage([{"name": "latest-b", "manifest_digest": "sha256:b"}, {"name": "latestXb", "manifest_digest": "sha256:x"}]),
+    }
+    requested = []
+    def fake_get(url, params, headers, timeout):
+        requested.append((url, params))
+        return pages[params["page"]]
+    monkeypatch.setattr(client.session, "get", fake_get)
+    monkeypatch.setattr(client.session, "head", lambda *args, **kwargs: pytest.fail("unexpected manifest request"))
+
+    assert client.list_tag_digests("quay.io/ns/repo", prefix="latest-") == {"latest-a": "sha256:a", "latest-b": "sha256:b"}
+    assert [url for url, _ in requested] == ["https://quay.io/api/v1/repository/ns/repo/tag/"] * 2
+    assert requested[0][1]["filter_tag_name"] == "like:latest-%"
+    assert requested[0][1]["onlyActiveTags"] == "true"
+
+def test_list_tag_digests_sends_quay_api_token(monkeypatch):
+    client = ImageRegistryClient(quay_api_token="oauth-token")
+    sent = []
+    def fake_get(url, params, headers, timeout):
+        sent.append(headers.get("Authorization"))
+        return QuayTagsPage([{"name": "latest-a", "manifest_digest": "sha256:a"}])
+    monkeypatch.setattr(client.session, "get", fake_get)
+    # the registry's bearer tokens are not valid on the REST API
+    monkeypatch.setattr(client.auth, "authorization", lambda repository: pytest.fail("registry token requested"))
+
+    assert client.list_tag_digests("quay.io/ns/repo", prefix="latest-") == {"latest-a": "sha256:a"}
+    assert sent == ["Bearer oauth-token"]
+
+def test_list_tag_digests_falls_back_when_quay_api_denies(monkeypatch, client, caplog):
+    def fake_get(url, params, headers, timeout):
+        if "/api/v1/" in url:
+            return QuayTagsPage([], status_code=401)
+        return TagsPage(["latest-a"])
+    monkeypatch.setattr(client.session, "get", fake_get)
+    assert client.list_tag_digests("quay.io/ns/repo", prefix="latest-") == {"latest-a": None}
+    assert "QUAY_API_TOKEN" in caplog.text
+    assert "falling back to the registry tag list" in caplog.text
+
+def test_list_tag_digests_falls_back_to_registry_tag_list(monkeypatch, client):
+    def fake_get(url, params, headers, timeout):
+        if "/api/v1/" in url:
+            return QuayTagsPage([], status_code=404)
+        return TagsPage(["latest-a"])
+    monkeypatch.setattr(client.session, "get", fake_get)
+    assert client.list_tag_digests("quay.io/ns/repo", prefix="latest-") == {"latest-a": None}
+
+def test_list_tag_digests_non_quay_image(monkeypatch, client):
+    requested = []
+    def fake_get(url, params, headers, timeout):
+        requested.append(url)
+        return TagsPage(["latest-a"])
+    monkeypatch.setattr(client.session, "get", fake_get)
+    assert client.list_tag_digests("ns/repo", prefix="latest-") == {"latest-a": None}
+    assert requested == ["https://quay.io/v2/ns/repo/tags/list"]
+
+def test_probe_uses_digest_cache(monkeypatch, tmp_path):
+    client = ImageRegistryClient(cache=DigestCache(str(tmp_path)))
+    heads = []
+    def fake_head(url, headers, timeout):
+        heads.append(url)
+        if url.endswith("latest-a"):
+            return DummyResponse(200, {"Docker-Content-Digest": "sha256:a"})
+        return DummyResponse(404)
+    monkeypatch.setattr(client.session, "head", fake_head)
+
+    for _ in range(2):
+        assert client.probe("quay.io/ns/repo", "latest-a").digest == "sha256:a"
+        assert client.probe("quay.io/ns/repo", "latest-b") == ManifestProbe(exists=False, status_code=404)
+    assert len(heads) == 2
+    assert client.cache.stats().hits == 2
+
+def test_probe_does_not_cache_errors(monkeypatch, tmp_path):
+    client = ImageRegistryClient(cache=DigestCache(str(tmp_path)))
+    monkeypatch.setattr(client.session, "head", lambda url, headers, timeout: DummyResponse(503))
+    client.probe("quay.io/ns/repo", "latest-a")
+    assert client.cache.stats().entries == 0
+
+def test_probe_answers_bearer_challenge(monkeypatch, client):
+    challenge = 'Bearer realm="https://quay.io/v2/auth",service="quay.io",scope="repository:ns/repo:pull"'
+    sent = []
+    def fake_head(url, headers, timeout):
+        sent.append(headers.get("Authorization"))
+        if headers.get("Authorization") != "Bearer secret":
+            return DummyResponse(401, {"WWW-Authenticate": challenge})
+        return DummyResponse(200, {"Docker-Content-Digest": "sha256:abc"})
+    monkeypatch.setattr(client.session, "head", fake_head)
+    monkeypatch.setattr(client.session, "get", lambda url, **kwargs: TokenPage("secret"))
+
+    assert client.probe("quay.io/ns/repo", "a").digest == "sha256:abc"
+    assert client.probe("quay.io/ns/repo", "b").digest == "sha256:abc"
+    # only the very first request pays for the challenge
+    assert sent == [None, "Bearer secret", "Bearer secret"]
+    assert client.auth.fetches == 1
+
+def test_timeouts_are_configurable():
+    client = ImageRegistryClient(connect_timeout=1, read_timeout=2)
+    assert client.timeout == (1, 2)
+
+def test_retry_policy_only_retries_idempotent_methods(client):
+    retry = client.adapter.max_retries
+    assert retry.allowed_methods == frozenset({"HEAD", "GET"})
+    assert 503 in retry.status_forcelist
+    assert retry.backoff_jitter > 0
+
+def test_backoff_delay_follows_the_urllib3_schedule():
+    retry = registry_retry(backoff_jitter=0)
+    for retries_done in range(3):
+        retry = retry.increment("GET", "/", response=HTTPResponse(status=503))
+        assert backoff_delay(retries_done, backoff_jitter=0) == retry.get_backoff_time()
+
+
+class ManifestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_pool_stats_reports_connection_reuse():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ManifestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ImageRegistryClient(registry_url=f"http://127.0.0.1:{server.server_port}", pool_size=2)
+        for i in range(5):
+            assert client.exists("quay.io/ns/repo", f"tag-{i}")
+        stats = client.pool_stats()
+        assert stats.requests == 5
+        assert stats.connections_opened == 1
+        assert stats.connections_reused == 4
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,94 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from core.clients.registry_auth import RegistryTokenProvider
+
+CHALLENGE = 'Bearer realm="https://quay.io/v2/auth",service="quay.io",scope="repository:ns/repo:pull"'
+
+
+class TokenResponse:
+    def __init__(self, token, expires_in=300, status_code=200):
+        self.status_code = status_code
+        self.body = {"token": token, "expires_in": expires_in}
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def session():
+    session = MagicMock()
+    session.get.return_value = TokenResponse("t1")
+    return session
+
+
+@pytest.fixture
+def provider(session):
+    return RegistryTokenProvider(session, (1, 1), credentials=("user", "pass"))
+
+
+def test_no_authorization_before_challenge(provider, session):
+    assert provider.authorization("ns/repo") == {}
+    session.get.assert_not_called()
+
+
+def test_challenge_fetches_token_for_scope(provider, session):
+    assert provider.handle_challenge("ns/repo", CHALLENGE, {})
+    assert provider.authorization("ns/repo") == {"Authorization": "Bearer t1"}
+    session.get.assert_called_once_with(
+        url="https://quay.io/v2/auth",
+        params={"service": "quay.io", "scope": "repository:ns/repo:pull"},
+        auth=("user", "pass"),
+        timeout=(1, 1),
+    )
+
+
+def test_non_bearer_challenge_is_ignored(provider, session):
+    assert not provider.handle_challenge("ns/repo", 'Basic realm="registry"', {})
+    session.get.assert_not_called()
+
+
+def test_expired_token_is_refreshed(provider, session, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("core.clients.registry_auth.time.time", lambda: now)
+    session.get.return_value = TokenResponse("t1", expires_in=60)
+    provider.handle_challenge("ns/repo", CHALLENGE, {})
+
+    now = 1055.0
+    session.get.return_value = TokenResponse("t2", expires_in=60)
+    assert provider.authorization("ns/repo") == {"Authorization": "Bearer t2"}
+    assert provider.fetches == 2
+
+
+def test_rejected_token_is_replaced(provider, session):
+    provider.handle_challenge("ns/repo", CHALLENGE, {})
+    session.get.return_value = TokenResponse("t2")
+    assert provider.handle_challenge("ns/repo", CHALLENGE, {"Authorization": "Bearer t1"})
+    assert provider.authorization("ns/repo") == {"Authorization": "Bearer t2"}
+
+
+def test_concurrent_challenges_fetch_a_single_token(provider, session):
+    def slow_fetch(**kwargs):
+        time.sleep(0.05)
+        return TokenResponse("t1")
+    session.get.side_effect = slow_fetch
+
+    workers = 16
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def probe():
+        barrier.wait()
+        provider.handle_challenge("ns/repo", CHALLENGE, {})
+        results.append(provider.authorization("ns/repo"))
+
+    threads = [threading.Thread(target=probe) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.fetches == 1
+    assert results == [{"Authorization": "Bearer t1"}] * workers
@@ -0,0 +1,39 @@
+from core.models import Artifact
+from core.repositories.discovery_journal_repository import DiscoveryJournalRepository
+
+ARTIFACT = Artifact(
+    repository="https://github.com/openshift/assisted-service",
+    ref="abc123",
+    name="openshift/assisted-service",
+    versioning_selection_mechanism="commit",
+)
+
+
+def test_journal_round_trip(tmp_path):
+    path = tmp_path / "cache" / "journal.jsonl"
+    repo = DiscoveryJournalRepository(str(path))
+    assert repo.find_all("sig") == {}
+    repo.start("sig")
+    repo.record("assisted-service", ARTIFACT)
+    repo.record("cluster-api", None)
+
+    assert DiscoveryJournalRepository(str(path)).find_all("sig") == {"assisted-service": ARTIFACT, "cluster-api": None}
+    repo.clear()
+    assert not path.exists()
+
+
+def test_journal_ignores_other_signature(tmp_path):
+    repo = DiscoveryJournalRepository(str(tmp_path / "journal.jsonl"))
+    repo.start("sig")
+    repo.record("assisted-service", ARTIFACT)
+    assert repo.find_all("other") == {}
+
+
+def test_journal_ignores_truncated_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    repo = DiscoveryJournalRepository(str(path))
+    repo.start("sig")
+    repo.record("assisted-service", ARTIFACT)
+    with open(path, "a") as f:
+        f.write('{"component": "cluster-a')
+    assert repo.find_all("sig") == {"assisted-service": ARTIFACT}
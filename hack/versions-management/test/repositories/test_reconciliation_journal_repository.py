@@ -0,0 +1,39 @@
+import pytest
+
+from core.models import Artifact, Version
+from core.repositories.reconciliation_journal_repository import ReconciliationJournalRepository, version_hash
+
+
+def make_version(ref="abc123"):
+    return Version(
+        name="v1.0.0",
+        tested_with_ref="ref",
+        artifacts=[
+            Artifact(
+                repository="https://github.com/openshift/repo",
+                ref=ref,
+                name="openshift/repo",
+                versioning_selection_mechanism="commit",
+            )
+        ],
+    )
+
+
+def test_journal_round_trip(tmp_path):
+    path = tmp_path / "cache" / "journal.json"
+    repo = ReconciliationJournalRepository(str(path))
+    assert repo.find_all() == {}
+    repo.save({"v1.0.0": "hash"})
+    assert ReconciliationJournalRepository(str(path)).find_all() == {"v1.0.0": "hash"}
+
+
+def test_journal_invalid_file(tmp_path):
+    path = tmp_path / "journal.json"
+    path.write_text("not json")
+    with pytest.raises(ValueError, match="Invalid reconciliation journal"):
+        ReconciliationJournalRepository(str(path)).find_all()
+
+
+def test_version_hash_tracks_content():
+    assert version_hash(make_version()) == version_hash(make_version())
+    assert version_hash(make_version()) != version_hash(make_version(ref="def456"))
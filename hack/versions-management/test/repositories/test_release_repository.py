@@ -2,8 +2,11 @@ import pytest
 import os
 import shutil
 from datetime import datetime
+from unittest.mock import patch
 from core.models import Snapshot, SnapshotMetadata, Artifact
+from core.models.wrappers import SnapshotsFile
 from core.repositories import ReleaseCandidateRepository
+from core.repositories.snapshot_archive import RetentionPolicy
 
 ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
 
@@ -93,6 +96,17 @@ def test_release_repository_update_existing(snapshots_file):
     assert modified is not None
     assert modified.metadata.status == "successful"
 
+def test_release_repository_save_identical_does_not_rewrite(snapshots_file):
+    repo = ReleaseCandidateRepository(str(snapshots_file))
+    content = snapshots_file.read_text()
+    os.utime(snapshots_file, (0, 0))
+
+    assert repo.save(repo.find_by_id("rc-20250310-001"))
+
+    assert snapshots_file.stat().st_mtime == 0
+    assert snapshots_file.read_text() == content
+
+
 def test_invalid_snapshot_file_schema(tmp_path):
     bad_file = tmp_path / "bad.yaml"
     
@@ -101,3 +115,76 @@ def test_invalid_snapshot_file_schema(tmp_path):
     repo = ReleaseCandidateRepository(str(bad_file))
     with pytest.raises(ValueError, match="Invalid release-candidates.yaml"):
         repo.find_all()
+
+
+def make_snapshot(id, status="pending", generated_at=datetime(2025, 3, 11)):
+    return Snapshot(
+        metadata=SnapshotMetadata(id=id, generated_at=generated_at, status=status),
+        artifacts=[Artifact(repository="https://github.com/new/repo", ref=id, name="new/repo", versioning_selection_mechanism="release")],
+    )
+
+
+def test_lookups_share_one_parse_of_the_file(snapshots_file):
+    repo = ReleaseCandidateRepository(str(snapshots_file))
+    for i in range(20):
+        repo.save(make_snapshot(f"rc-{i}", status="successful" if i % 2 else "failed", generated_at=datetime(2025, 4, 1 + i)))
+
+    fresh = ReleaseCandidateRepository(str(snapshots_file))
+    with patch("core.repositories.release_candidates_repository.SnapshotsFile", wraps=SnapshotsFile) as validate:
+        assert fresh.find_by_id("rc-7").artifacts[0].ref == "rc-7"
+        assert fresh.find_latest("successful").metadata.id == "rc-19"
+        assert [s.metadata.id for s in fresh.find_by_status("pending")] == ["rc-20250310-001"]
+        assert fresh.find_by_id("non-existent") is None
+    assert validate.call_count == 1
+
+
+def test_save_prepends_new_and_replaces_existing_snapshots(snapshots_file):
+    repo = ReleaseCandidateRepository(str(snapshots_file))
+
+    assert repo.save(make_snapshot("rc-new"))
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-new", "rc-20250310-001"]
+
+    assert repo.save(make_snapshot("rc-new", status="successful"))
+    assert [(s.metadata.id, s.metadata.status) for s in ReleaseCandidateRepository(str(snapshots_file)).find_all()] == [
+        ("rc-new", "successful"),
+        ("rc-20250310-001", "pending"),
+    ]
+
+
+def test_external_edit_is_reloaded(snapshots_file):
+    repo = ReleaseCandidateRepository(str(snapshots_file))
+    assert repo.find_by_id("rc-20250310-001").metadata.status == "pending"
+
+    # e.g. the test runner's yq edits
+    snapshots_file.write_text(snapshots_file.read_text().replace("status: pending", "status: successful\n      tested_with_ref: abc"))
+
+    snapshot = repo.find_by_id("rc-20250310-001")
+    assert (snapshot.metadata.status, snapshot.metadata.tested_with_ref) == ("successful", "abc")
+    assert repo.find_latest("successful").metadata.id == "rc-20250310-001"
+
+
+def test_compact_archives_old_unsuccessful_snapshots(snapshots_file):
+    repo = ReleaseCandidateRepository(str(snapshots_file))
+    for i in range(6):
+        status = ("failed", "successful", "pending")[i % 3]
+        repo.save(make_snapshot(f"rc-{i}", status=status, generated_at=datetime(2025, 4, 1 + i)))
+
+    archived = repo.compact(RetentionPolicy(keep_last=2))
+
+    assert archived == ["rc-3", "rc-2", "rc-0", "rc-20250310-001"]
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-5", "rc-4", "rc-1"]
+    assert [s.metadata.id for s in ReleaseCandidateRepository(str(snapshots_file)).find_by_status("successful")] == ["rc-4", "rc-1"]
+    assert repo.find_by_id("rc-0") is None
+    assert repo.archive.find_by_id("rc-0") == make_snapshot("rc-0", status="failed", generated_at=datetime(2025, 4, 1))
+    assert repo.compact(RetentionPolicy(keep_last=2)) == []
+
+
+def test_retention_policy_applied_on_save(snapshots_file, tmp_path):
+    repo = ReleaseCandidateRepository(
+        str(snapshots_file), archive_path=str(tmp_path / "archive.jsonl.gz"), retention=RetentionPolicy(keep_last=3)
+    )
+    for i in range(10):
+        repo.save(make_snapshot(f"rc-{i}", generated_at=datetime(2025, 4, 1 + i)))
+
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-9", "rc-8", "rc-7"]
+    assert len(repo.archive.find_all()) == 8
@@ -0,0 +1,112 @@
+import os
+import shutil
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from core.models import Artifact, Snapshot, SnapshotMetadata
+from core.repositories import ReleaseCandidateRepository, ShardedReleaseCandidateRepository
+from core.repositories.snapshot_archive import RetentionPolicy
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
+
+
+def make_snapshot(id, generated_at, status="pending"):
+    return Snapshot(
+        metadata=SnapshotMetadata(id=id, generated_at=generated_at, status=status),
+        artifacts=[Artifact(repository="https://github.com/new/repo", ref=id, name="new/repo", versioning_selection_mechanism="release")],
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return ShardedReleaseCandidateRepository(str(tmp_path / "release-candidates"))
+
+
+def test_sharded_repository_empty(repo):
+    assert repo.find_all() == []
+    assert repo.find_by_id("rc-1") is None
+    assert repo.find_latest("successful") is None
+
+
+def test_sharded_repository_round_trip(repo):
+    older = make_snapshot("rc-1", datetime(2025, 3, 1))
+    newer = make_snapshot("rc-2", datetime(2025, 3, 2))
+    assert repo.save(newer)
+    assert repo.save(older)
+
+    assert repo.find_by_id("rc-1") == older
+    # newest generated first, whatever the save order
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-2", "rc-1"]
+
+    assert repo.update(replace(older, metadata=replace(older.metadata, status="successful")))
+    assert repo.find_latest("successful").metadata.id == "rc-1"
+    assert [s.metadata.id for s in repo.find_by_status("pending")] == ["rc-2"]
+
+
+def test_sharded_save_touches_only_its_snapshot(repo):
+    repo.save(make_snapshot("rc-1", datetime(2025, 3, 1)))
+    other = repo.snapshot_path("rc-1")
+    os.utime(other, (0, 0))
+    with open(repo.manifest_path) as f:
+        manifest = f.read()
+
+    repo.save(make_snapshot("rc-2", datetime(2025, 3, 2)))
+    assert os.stat(other).st_mtime == 0
+
+    # an identical save writes nothing, not even a manifest line
+    repo.save(make_snapshot("rc-2", datetime(2025, 3, 2)))
+    with open(repo.manifest_path) as f:
+        assert f.read().count("\n") == manifest.count("\n") + 1
+
+
+def test_sharded_manifest_ignores_truncated_line(repo):
+    repo.save(make_snapshot("rc-1", datetime(2025, 3, 1)))
+    with open(repo.manifest_path, "a") as f:
+        f.write('{"id": "rc-2", "gen')
+    assert [e.id for e in repo.manifest()] == ["rc-1"]
+
+
+def test_sharded_rejects_unsafe_id(repo):
+    with pytest.raises(ValueError, match="Invalid snapshot id"):
+        repo.find_by_id("../release-candidates")
+
+
+def test_failed_save_leaves_no_temporary_file(repo, monkeypatch):
+    assert repo.save(make_snapshot("rc-1", datetime(2025, 3, 1)))
+
+    def dump(data, stream):
+        stream.write("metadata:\n")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(repo.yaml, "dump", dump)
+    with pytest.raises(Exception, match="Error writing snapshot rc-2: No space left on device"):
+        repo.save(make_snapshot("rc-2", datetime(2025, 3, 2)))
+
+    assert os.listdir(os.path.join(repo.directory, "snapshots")) == ["rc-1.yaml"]
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-1"]
+
+
+def test_sharded_import_and_export(repo, tmp_path):
+    legacy = tmp_path / "release-candidates.yaml"
+    shutil.copy(os.path.join(ASSETS_DIR, "release-candidates.yaml"), legacy)
+    assert repo.import_file(str(legacy)) == 1
+    repo.save(make_snapshot("rc-new", datetime(2025, 4, 1)))
+
+    exported = tmp_path / "exported.yaml"
+    assert repo.export(str(exported)) == 2
+    assert ReleaseCandidateRepository(str(exported)).find_all() == repo.find_all()
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-new", "rc-20250310-001"]
+
+
+def test_sharded_compact(repo):
+    for i in range(5):
+        repo.save(make_snapshot(f"rc-{i}", datetime(2025, 3, 1 + i), status="successful" if i == 0 else "failed"))
+
+    assert sorted(repo.compact(RetentionPolicy(keep_last=2))) == ["rc-1", "rc-2"]
+
+    assert [s.metadata.id for s in repo.find_all()] == ["rc-4", "rc-3", "rc-0"]
+    assert not os.path.exists(repo.snapshot_path("rc-1"))
+    assert repo.archive.find_by_id("rc-1").metadata.status == "failed"
+    assert sorted(os.listdir(repo.directory)) == ["archive.jsonl.gz", "manifest.jsonl", "snapshots"]
@@ -1,10 +1,14 @@
 import os
 import shutil
+import threading
+import time
 from unittest.mock import MagicMock, patch, call
 
 import pytest
 from core.models import Artifact, Version
-from core.services.tag_reconciliation_service import TagReconciliationService
+from core.repositories import ReconciliationJournalRepository
+from core.repositories.reconciliation_journal_repository import version_hash
+from core.services.tag_reconciliation_service import RepositoryResult, TagReconciliationService, summary_table
 
 CAPOA_REPO = "openshift-assisted/cluster-api-provider-openshift-assisted"
 ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
@@ -267,13 +271,38 @@ def test_tag_exists_implementation(service, mock_github):
     service.tag_exists = TagReconciliationService.tag_exists.__get__(
         service, TagReconciliationService
     )
-    mock_repo = MagicMock()
-    mock_github.get_repo.return_value = mock_repo
-    mock_repo.get_git_ref.return_value = MagicMock()
+    mock_github.list_tags.return_value = {"capoa-v1.0.0"}
     assert service.tag_exists("openshift/repo1", "capoa-v1.0.0") is True
-    mock_repo.get_git_ref.assert_called_with("tags/capoa-v1.0.0")
-    mock_repo.get_git_ref.side_effect = Exception("Not found")
-    assert service.tag_exists("openshift/repo1", "capoa-v1.0.0") is False
+    assert service.tag_exists("openshift/repo1", "capoa-v1.1.0") is False
+    # the inventory is listed once per repository
+    mock_github.list_tags.assert_called_once_with("openshift/repo1", "capoa-")
+    mock_github.list_tags.return_value = {"v1.0.0"}
+    assert service.tag_exists(CAPOA_REPO, "v1.0.0") is True
+    mock_github.list_tags.assert_called_with(CAPOA_REPO, "")
+
+
+def test_tag_listing_failure(service, mock_github):
+    mock_github.list_tags.side_effect = Exception("Bad credentials")
+    with pytest.raises(Exception, match="Failed to list tags on openshift/repo: Bad credentials"):
+        service.run()
+
+
+def test_inventory_drives_creations(service, mock_github, mock_version_repo, versions):
+    mock_version_repo.find_all.return_value = versions
+    inventories = {
+        "openshift/repo1": {"capoa-v1.0.0", "capoa-v1.1.0"},
+        "openshift/repo2": {"capoa-v1.0.0"},
+        CAPOA_REPO: {"v1.0.0", "v0.9.0"},
+    }
+    mock_github.list_tags.side_effect = lambda repo, prefix: set(inventories[repo])
+    service.create_tag = MagicMock()
+    service.run()
+    # repositories are reconciled concurrently, so only the set of creations is deterministic
+    assert {c.args for c in service.create_tag.call_args_list} == {
+        ("openshift/repo2", "mno345", "capoa-v1.1.0"),
+        (CAPOA_REPO, "ref", "v1.1.0"),
+    }
+    assert mock_github.list_tags.call_count == 3
 
 
 def test_run_no_versions(service, mock_version_repo):
@@ -302,9 +331,12 @@ def test_tag_already_exists_detailed(service, mock_github, mock_version_repo, ve
             return MagicMock()
 
     mock_github.get_repo.side_effect = get_repo_side_effect
-    repo1.get_git_ref.return_value = MagicMock()
-    repo2.get_git_ref.side_effect = Exception("Tag not found")
-    capoa_repo.get_git_ref.return_value = MagicMock()
+    inventories = {
+        "openshift/repo1": {"capoa-v1.0.0"},
+        "openshift/repo2": set(),
+        CAPOA_REPO: {"v1.0.0"},
+    }
+    mock_github.list_tags.side_effect = lambda repo, prefix: inventories[repo]
     original_create_tag = service.create_tag
     create_tag_calls = []
 
@@ -318,9 +350,11 @@ def test_tag_already_exists_detailed(service, mock_github, mock_version_repo, ve
     assert len(create_tag_calls) == 1
     assert create_tag_calls[0][0] == "openshift/repo2"
     assert create_tag_calls[0][2] == "capoa-v1.0.0"
-    repo1.get_git_ref.assert_called_with("tags/capoa-v1.0.0")
-    repo2.get_git_ref.assert_called_with("tags/capoa-v1.0.0")
-    capoa_repo.get_git_ref.assert_called_with("tags/v1.0.0")
+    mock_github.list_tags.assert_has_calls([
+        call("openshift/repo1", "capoa-"),
+        call("openshift/repo2", "capoa-"),
+        call(CAPOA_REPO, ""),
+    ])
     log_messages = [args[0] for args, _ in service.logger.info.call_args_list]
     repo2_message_found = any(
         "Created tag capoa-v1.0.0 on openshift/repo2" in msg for msg in log_messages
@@ -333,17 +367,12 @@ def test_tag_creation_failure_detailed(
 ):
     mock_version_repo.find_all.return_value = versions[:1]
     mock_repo = MagicMock()
-    mock_repo.get_git_ref.side_effect = Exception("Tag not found")
-    mock_github.get_repo.return_value = mock_repo
-
-    def create_git_tag_side_effect(tag, message, object, type):
-        if tag == "capoa-v1.0.0" and "repo2" in str(
-            mock_github.get_repo.call_args[0][0]
-        ):
-            raise Exception("GitHub API error: Reference already exists")
-        return MagicMock(sha="fake_sha")
-
-    mock_repo.create_git_tag.side_effect = create_git_tag_side_effect
+    failing_repo = MagicMock()
+    mock_github.list_tags.return_value = set()
+    # repositories are reconciled concurrently, so each gets its own handle
+    mock_github.get_repo.side_effect = lambda name: failing_repo if name == "openshift/repo2" else mock_repo
+    mock_repo.create_git_tag.return_value = MagicMock(sha="fake_sha")
+    failing_repo.create_git_tag.side_effect = Exception("GitHub API error: Reference already exists")
     with pytest.raises(Exception) as excinfo:
         service.run()
     error_message = str(excinfo.value)
@@ -378,3 +407,172 @@ def test_dry_run_mode(service, mock_version_repo, versions):
     # CAPOA_REPO dry run log
     expected_msg_full = f"Dry run mode. tag v1.0.0 on ref in repo {CAPOA_REPO} has not been created"
     assert any(expected_msg_full in msg for msg in dry_run_messages)
+
+
+def test_failure_does_not_abort_other_repositories(service, mock_github, mock_version_repo, versions):
+    mock_version_repo.find_all.return_value = versions
+    mock_github.list_tags.return_value = set()
+
+    def create_tag_side_effect(repo, ref, tag):
+        if (repo, tag) == ("openshift/repo1", "capoa-v1.0.0"):
+            raise Exception(f"Failed to create tag {tag} on {repo}")
+
+    service.create_tag = MagicMock(side_effect=create_tag_side_effect)
+    with pytest.raises(Exception, match="Failed to create tag capoa-v1.0.0 on openshift/repo1"):
+        service.run()
+    # every other tag, including the next one in the failing repository, was still attempted
+    assert service.create_tag.call_count == 6
+    service.create_tag.assert_any_call("openshift/repo1", "jkl012", "capoa-v1.1.0")
+
+
+def test_writes_are_serial_per_repository_and_parallel_across(service, mock_github, mock_version_repo, versions):
+    mock_version_repo.find_all.return_value = versions
+    mock_github.list_tags.return_value = set()
+    lock = threading.Lock()
+    in_flight = {}
+    peaks = {"repo": 0, "total": 0}
+
+    def create_tag_side_effect(repo, ref, tag):
+        with lock:
+            in_flight[repo] = in_flight.get(repo, 0) + 1
+            peaks["repo"] = max(peaks["repo"], in_flight[repo])
+            peaks["total"] = max(peaks["total"], sum(in_flight.values()))
+        time.sleep(0.05)
+        with lock:
+            in_flight[repo] -= 1
+
+    service.create_tag = MagicMock(side_effect=create_tag_side_effect)
+    service.run()
+    assert peaks["repo"] == 1
+    assert peaks["total"] > 1
+
+
+def test_summary_table(service, mock_github, mock_version_repo, versions):
+    mock_version_repo.find_all.return_value = versions[:1]
+    mock_github.list_tags.side_effect = lambda repo, prefix: {"capoa-v1.0.0"} if repo == "openshift/repo1" else set()
+    service.create_tag = MagicMock()
+    service.run()
+    log_messages = [args[0] for args, _ in service.logger.info.call_args_list]
+    header = log_messages.index(next(msg for msg in log_messages if msg.startswith("Repository")))
+    rows = [msg.split() for msg in log_messages[header + 1:header + 4]]
+    assert [row[:4] for row in rows] == [
+        ["openshift/repo1", "0", "1", "0"],
+        ["openshift/repo2", "1", "0", "0"],
+        [CAPOA_REPO, "1", "0", "0"],
+    ]
+
+
+def test_dry_run_summary_counts_tags_it_would_create(service, mock_github, mock_version_repo, versions):
+    service.dry_run = True
+    mock_version_repo.find_all.return_value = versions[:1]
+    mock_github.list_tags.side_effect = lambda repo, prefix: {"capoa-v1.0.0"} if repo == "openshift/repo1" else set()
+    service.create_tag = MagicMock()
+    service.run()
+    service.create_tag.assert_not_called()
+    log_messages = [args[0] for args, _ in service.logger.info.call_args_list]
+    header = next(msg for msg in log_messages if msg.startswith("Repository"))
+    assert "Would create" in header
+    rows = [msg.split() for msg in log_messages[log_messages.index(header) + 1:log_messages.index(header) + 4]]
+    assert [row[:4] for row in rows] == [
+        ["openshift/repo1", "0", "1", "0"],
+        ["openshift/repo2", "1", "0", "0"],
+        [CAPOA_REPO, "1", "0", "0"],
+    ]
+
+
+def test_summary_table_alignment():
+    lines = summary_table([
+        RepositoryResult("openshift/a", created=["capoa-v1"], elapsed=1.234),
+        RepositoryResult("openshift/longer-name", failed={"capoa-v1": "boom"}),
+    ])
+    assert lines == [
+        "Repository             Created  Skipped  Failed  Time",
+        "openshift/a                  1        0       0  1.23s",
+        "openshift/longer-name        0        0       1  0.00s",
+    ]
+    assert summary_table([RepositoryResult("openshift/a", would_create=["capoa-v1"])], dry_run=True) == [
+        "Repository   Would create  Skipped  Failed  Time",
+        "openshift/a             1        0       0  0.00s",
+    ]
+
+
+def test_create_lightweight_tag(service, mock_github):
+    service.lightweight = True
+    mock_repo = MagicMock()
+    mock_github.get_repo.return_value = mock_repo
+    service.create_tag("openshift/repo1", "commit_sha_123", "capoa-v1.0.0")
+    mock_repo.create_git_tag.assert_not_called()
+    mock_repo.create_git_ref.assert_called_once_with("refs/tags/capoa-v1.0.0", "commit_sha_123")
+
+
+def test_journal_skips_reconciled_versions(service, mock_github, mock_version_repo, versions, tmp_path):
+    service.journal = ReconciliationJournalRepository(str(tmp_path / "journal.json"))
+    mock_version_repo.find_all.return_value = versions[:1]
+    mock_github.list_tags.return_value = set()
+    service.create_tag = MagicMock()
+    service.run()
+    assert service.create_tag.call_count == 3
+    assert set(service.journal.find_all()) == {"v1.0.0"}
+
+    # a new version is the only one checked on the next run
+    service.inventory = {}
+    mock_github.list_tags.reset_mock()
+    service.create_tag.reset_mock()
+    mock_version_repo.find_all.return_value = versions
+    service.run()
+    assert sorted(c.args[2] for c in service.create_tag.call_args_list) == ["capoa-v1.1.0", "capoa-v1.1.0", "v1.1.0"]
+    assert set(service.journal.find_all()) == {"v1.0.0", "v1.1.0"}
+
+    # nothing new: no API calls at all
+    mock_github.list_tags.reset_mock()
+    service.run()
+    mock_github.list_tags.assert_not_called()
+
+
+def test_journal_full_audit(service, mock_github, mock_version_repo, versions, tmp_path):
+    service.journal = ReconciliationJournalRepository(str(tmp_path / "journal.json"))
+    service.journal.save({"v1.0.0": version_hash(versions[0])})
+    mock_version_repo.find_all.return_value = versions[:1]
+    mock_github.list_tags.return_value = set()
+    service.create_tag = MagicMock()
+    service.run()
+    service.create_tag.assert_not_called()
+
+    service.full = True
+    service.run()
+    assert service.create_tag.call_count == 3
+
+
+def test_journal_records_only_fully_reconciled_versions(service, mock_github, mock_version_repo, versions, tmp_path):
+    service.journal = ReconciliationJournalRepository(str(tmp_path / "journal.json"))
+    mock_version_repo.find_all.return_value = versions[:2]
+    mock_github.list_tags.return_value = set()
+
+    def create_tag_side_effect(repo, ref, tag):
+        if (repo, tag) == ("openshift/repo2", "capoa-v1.1.0"):
+            raise Exception(f"Failed to create tag {tag} on {repo}")
+
+    service.create_tag = MagicMock(side_effect=create_tag_side_effect)
+    with pytest.raises(Exception, match="Failed to create tag capoa-v1.1.0"):
+        service.run()
+    assert set(service.journal.find_all()) == {"v1.0.0"}
+
+
+def test_dry_run_does_not_journal(service, mock_github, mock_version_repo, versions, tmp_path):
+    service.journal = ReconciliationJournalRepository(str(tmp_path / "journal.json"))
+    service.dry_run = True
+    mock_version_repo.find_all.return_value = versions[:1]
+    mock_github.list_tags.return_value = set()
+    service.run()
+    assert service.journal.find_all() == {}
+
+
+def test_inventory_from_git_mirrors(service, mock_github, mock_version_repo, versions):
+    mock_version_repo.find_all.return_value = versions[:1]
+    service.mirrors = MagicMock()
+    service.mirrors.list_tags.side_effect = lambda repo, prefix: {"capoa-v1.0.0"} if repo == "openshift/repo1" else set()
+    service.create_tag = MagicMock()
+    service.run()
+    mock_github.list_tags.assert_not_called()
+    service.mirrors.list_tags.assert_any_call(CAPOA_REPO, "")
+    assert {c.args[0] for c in service.create_tag.call_args_list} == {"openshift/repo2", CAPOA_REPO}
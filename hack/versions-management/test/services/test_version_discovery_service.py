@@ -1,12 +1,21 @@
+import asyncio
 import datetime
+import json
 import os
 import shutil
 import tempfile
+import time
 import uuid
+from dataclasses import asdict, replace
 import pytest
 from unittest.mock import patch, MagicMock
 
+from core.clients.github_client import RepositoryHead
+from core.clients.image_registry_client import ManifestProbe
+from core.models import Component
 from core.services.version_discovery_service import (
+    ENGINES,
+    CommitWindow,
     VersionDiscoveryService,
 )
 
@@ -64,6 +73,8 @@ def mock_rc_repo():
     with patch(
         "core.services.version_discovery_service.ReleaseCandidateRepository"
     ) as p:
+        p.return_value.find_by_id.return_value = None
+        p.return_value.archive.find_by_id.return_value = None
         yield p.return_value
 
 
@@ -112,19 +123,8 @@ def test_discovery_success(mock_github, mock_registry, mock_rc_repo, temp_snapsh
     
     mock_github.get_repo.side_effect = get_repo_side_effect
     
-    # configure registry.exists to return True for specific image tags
-    def registry_exists_side_effect(image, tag):
-        valid_combinations = [
-            ("quay.io/edge-infrastructure/assisted-service", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"),
-            ("quay.io/edge-infrastructure/assisted-service-el8", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"),
-            ("quay.io/edge-infrastructure/assisted-image-service", "latest-2249c85d05600191b24e93dd92e733d49a1180ec"),
-            ("quay.io/edge-infrastructure/assisted-installer-agent", "latest-cfe93a9779dea6ad2a628280b40071d23f3cb429"),
-            ("quay.io/edge-infrastructure/assisted-installer-controller", "latest-c389a38405383961d26191799161c86127451635"),
-            ("quay.io/edge-infrastructure/assisted-installer", "latest-c389a38405383961d26191799161c86127451635")
-        ]
-        return (image, tag) in valid_combinations
-    
-    def resolve_digest_side_effect(image, tag):
+    # configure registry.probe to report specific image tags with their digests
+    def registry_probe_side_effect(image, tag):
         valid_combinations = {
             ("quay.io/edge-infrastructure/assisted-service", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"): "digest1",
             ("quay.io/edge-infrastructure/assisted-service-el8", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"): "digest2",
@@ -133,10 +133,12 @@ def test_discovery_success(mock_github, mock_registry, mock_rc_repo, temp_snapsh
             ("quay.io/edge-infrastructure/assisted-installer-controller", "latest-c389a38405383961d26191799161c86127451635"): "digest5",
             ("quay.io/edge-infrastructure/assisted-installer", "latest-c389a38405383961d26191799161c86127451635"): "digest6",
         }
-        return valid_combinations[(image, tag)]
+        digest = valid_combinations.get((image, tag))
+        if digest is None:
+            return ManifestProbe(exists=False, status_code=404)
+        return ManifestProbe(exists=True, status_code=200, digest=digest)
 
-    mock_registry.exists.side_effect = registry_exists_side_effect
-    mock_registry.resolve_digest.side_effect = resolve_digest_side_effect
+    mock_registry.probe.side_effect = registry_probe_side_effect
     
     svc.run()
     
@@ -236,3 +238,545 @@ def test_discovery_repository_save_failure(mock_github, mock_rc_repo, temp_snaps
     with pytest.raises(Exception, match="Failed to save snapshot"):
         service.run()
     assert mock_rc_repo.save.called
+
+
+def test_discovery_skips_existing_snapshot(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    snapshot = run_engine("threads", *args)
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file)
+    mock_rc_repo.find_by_id.side_effect = lambda id: snapshot if id == snapshot.metadata.id else None
+    mock_rc_repo.save.reset_mock()
+    mock_registry.probe.side_effect = probe_fixture
+
+    svc.run()
+
+    assert svc.unchanged
+    mock_rc_repo.save.assert_not_called()
+
+
+def test_dry_run_prints_an_unchanged_snapshot(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file, capsys):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    snapshot = run_engine("threads", *args)
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, dry_run=True)
+    mock_rc_repo.find_by_id.side_effect = lambda id: snapshot if id == snapshot.metadata.id else None
+    capsys.readouterr()
+
+    svc.run()
+
+    assert svc.unchanged
+    assert json.loads(capsys.readouterr().out)["metadata"]["id"] == snapshot.metadata.id
+
+
+def test_discovery_skips_archived_snapshot(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    snapshot = run_engine("threads", *args)
+    failed = replace(snapshot, metadata=replace(snapshot.metadata, status="failed"))
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file)
+    mock_rc_repo.archive.find_by_id.side_effect = lambda id: failed if id == snapshot.metadata.id else None
+    mock_rc_repo.save.reset_mock()
+
+    svc.run()
+
+    assert svc.unchanged
+    mock_rc_repo.save.assert_not_called()
+
+
+def test_discovery_tag_list_mode_picks_newest_commit(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, commit_matching="tag-list")
+    repo = MagicMock()
+    repo.get_commits.return_value = [MagicMock(sha="newest"), MagicMock(sha="middle"), MagicMock(sha="oldest")]
+    mock_github.get_repo.return_value = repo
+    mock_registry.list_tag_digests.return_value = {"latest-middle": None, "latest-oldest": None}
+    mock_registry.probe.return_value = ManifestProbe(exists=True, status_code=200, digest="sha256:middle")
+    component = Component(
+        repository="https://github.com/openshift/assisted-service",
+        name="openshift/assisted-service",
+        versioning_selection_mechanism="commit",
+        image_pattern="quay.io/edge-infrastructure/assisted-service",
+    )
+
+    artifact = svc.process_repository(component)
+
+    assert artifact.ref == "middle"
+    assert artifact.image_digest == "sha256:middle"
+    mock_registry.list_tag_digests.assert_called_once_with("quay.io/edge-infrastructure/assisted-service", prefix="latest-")
+    mock_registry.probe.assert_called_once_with("quay.io/edge-infrastructure/assisted-service", "latest-middle")
+
+
+def test_discovery_tag_list_mode_uses_inline_digests(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, commit_matching="tag-list")
+    mock_registry.list_tag_digests.return_value = {"latest-b": "sha256:b", "latest-c": "sha256:c"}
+
+    assert svc._match_commits(["quay.io/ns/repo"], ["a", "b", "c"]) == {"quay.io/ns/repo": ("b", "sha256:b")}
+    mock_registry.probe.assert_not_called()
+
+
+def test_discovery_tag_list_mode_falls_back_to_probing(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, commit_matching="tag-list")
+    mock_registry.list_tag_digests.return_value = None
+    mock_registry.probe.side_effect = lambda image, tag: ManifestProbe(exists=tag == "latest-b", digest="sha256:b")
+
+    assert svc._match_commits(["quay.io/ns/repo"], ["a", "b"]) == {"quay.io/ns/repo": ("b", "sha256:b")}
+    assert mock_registry.probe.call_count == 2
+
+
+def test_discovery_rejects_unknown_commit_matching(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="Unsupported commit matching mode"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, commit_matching="bogus")
+
+
+RELEASES = {
+    "kubernetes-sigs/cluster-api": "v1.9.5",
+    "metal3-io/cluster-api-provider-metal3": "v1.9.3",
+}
+COMMITS = {
+    "openshift/assisted-service": ["unbuilt", "76d29d2a7f0899dcede9700fc88fcbad37b6ccca"],
+    "openshift/assisted-image-service": ["2249c85d05600191b24e93dd92e733d49a1180ec"],
+    "openshift/assisted-installer-agent": ["cfe93a9779dea6ad2a628280b40071d23f3cb429"],
+    "openshift/assisted-installer": ["c389a38405383961d26191799161c86127451635"],
+}
+DIGESTS = {
+    ("quay.io/edge-infrastructure/assisted-service", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"): "digest1",
+    ("quay.io/edge-infrastructure/assisted-service-el8", "latest-76d29d2a7f0899dcede9700fc88fcbad37b6ccca"): "digest2",
+    ("quay.io/edge-infrastructure/assisted-image-service", "latest-2249c85d05600191b24e93dd92e733d49a1180ec"): "digest3",
+    ("quay.io/edge-infrastructure/assisted-installer-agent", "latest-cfe93a9779dea6ad2a628280b40071d23f3cb429"): "digest4",
+    ("quay.io/edge-infrastructure/assisted-installer-controller", "latest-c389a38405383961d26191799161c86127451635"): "digest5",
+    ("quay.io/edge-infrastructure/assisted-installer", "latest-c389a38405383961d26191799161c86127451635"): "digest6",
+}
+
+
+def probe_fixture(image, tag):
+    digest = DIGESTS.get((image, tag))
+    if digest is None:
+        return ManifestProbe(exists=False, status_code=404)
+    return ManifestProbe(exists=True, status_code=200, digest=digest)
+
+
+class FakeAsyncGitHubClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def get_latest_release_tag(self, repo):
+        return RELEASES[repo]
+
+    async def get_commit_shas(self, repo, count):
+        return COMMITS[repo][:count]
+
+
+class FakeAsyncImageRegistryClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def probe(self, image, tag):
+        return probe_fixture(image, tag)
+
+
+def run_engine(engine, mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file, github_backend="rest", failing=(), probe=probe_fixture, slow=None, **options):
+    mock_rc_repo.save.reset_mock()
+    git_mirror_dir = tempfile.mkdtemp() if github_backend == "git" else None
+    svc = VersionDiscoveryService(
+        temp_snapshot_file, temp_components_file, engine=engine, github_backend=github_backend, git_mirror_dir=git_mirror_dir, **options
+    )
+    if svc.mirrors:
+        svc.mirrors = MagicMock()
+        svc.mirrors.commit_shas.side_effect = lambda repo, count: COMMITS.get(repo, [])[:count]
+
+    def get_repo_side_effect(name):
+        if name in failing:
+            raise Exception("GitHub API error")
+        repo = MagicMock()
+        release = MagicMock(tag_name=RELEASES.get(name))
+        repo.get_latest_release.side_effect = lambda: time.sleep((slow or {}).get(name, 0)) or release
+        repo.get_commits.return_value = [MagicMock(sha=sha) for sha in COMMITS.get(name, [])]
+        return repo
+
+    mock_github.get_repo.side_effect = get_repo_side_effect
+    mock_github.get_repository_heads.side_effect = lambda repos, count: {
+        repo: RepositoryHead(latest_release=RELEASES.get(repo), commit_shas=COMMITS.get(repo, [])[:count])
+        for repo in repos
+    }
+    mock_registry.probe.side_effect = probe
+    mock_registry.timeout = (1, 1)
+    with (
+        patch("core.services.version_discovery_service.AsyncGitHubClient", FakeAsyncGitHubClient),
+        patch("core.services.version_discovery_service.AsyncImageRegistryClient", FakeAsyncImageRegistryClient),
+    ):
+        svc.run()
+    return mock_rc_repo.save.call_args[0][0]
+
+
+def test_asyncio_engine_snapshot_matches_threaded(mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    threaded = run_engine("threads", *args)
+    concurrent = run_engine("asyncio", *args)
+
+    assert len(concurrent.artifacts) == 8
+    assert json.dumps(asdict(concurrent), default=str) == json.dumps(asdict(threaded), default=str)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_graphql_backend_snapshot_matches_rest(engine, mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    rest = run_engine(engine, *args)
+    mock_github.get_repo.reset_mock()
+    graphql = run_engine(engine, *args, github_backend="graphql")
+
+    assert json.dumps(asdict(graphql), default=str) == json.dumps(asdict(rest), default=str)
+    # one query for every repository, no per-repository REST reads
+    mock_github.get_repository_heads.assert_called_once()
+    mock_github.get_repo.assert_not_called()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_git_backend_snapshot_matches_rest(engine, mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    rest = run_engine(engine, *args)
+    repos = {}
+    mock_github.get_repo.side_effect = lambda name: repos.setdefault(name, MagicMock(**{
+        "get_latest_release.return_value": MagicMock(tag_name=RELEASES.get(name)),
+    }))
+    git = run_engine(engine, *args, github_backend="git")
+
+    assert json.dumps(asdict(git), default=str) == json.dumps(asdict(rest), default=str)
+    # commit lists come from the mirrors, only release lookups reach the API
+    for repo in repos.values():
+        repo.get_commits.assert_not_called()
+
+
+def test_git_backend_requires_mirror_dir(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="requires a mirror directory"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, github_backend="git")
+
+
+def test_graphql_backend_query_failure(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, github_backend="graphql")
+    mock_github.get_repository_heads.side_effect = Exception("Bad credentials")
+    with pytest.raises(Exception, match="Failed to query repositories: Bad credentials"):
+        svc.run()
+    assert not mock_rc_repo.save.called
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_graphql_backend_fails_release_components_without_release(engine, mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    with patch.dict(RELEASES, {"kubernetes-sigs/cluster-api": None}):
+        with pytest.raises(
+            Exception,
+            match="Failed to resolve component: Failed to process kubernetes-sigs/cluster-api: No release found",
+        ):
+            run_engine(engine, *args, github_backend="graphql")
+    assert not mock_rc_repo.save.called
+
+
+def test_rejects_unknown_github_backend(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="Unsupported GitHub backend"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, github_backend="soap")
+
+
+def test_asyncio_engine_reports_failing_component(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    class FailingGitHubClient(FakeAsyncGitHubClient):
+        async def get_latest_release_tag(self, repo):
+            raise Exception("GitHub API error")
+
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, engine="asyncio")
+    mock_registry.timeout = (1, 1)
+    with (
+        patch("core.services.version_discovery_service.AsyncGitHubClient", FailingGitHubClient),
+        patch("core.services.version_discovery_service.AsyncImageRegistryClient", FakeAsyncImageRegistryClient),
+    ):
+        with pytest.raises(Exception, match="Failed to resolve component: Failed to process kubernetes-sigs/cluster-api"):
+            svc.run()
+    assert not mock_rc_repo.save.called
+
+
+def test_asyncio_engine_rejects_tag_list_matching(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="only supports probe"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, commit_matching="tag-list", engine="asyncio")
+
+
+def timed_probe(delays, hits):
+    def probe(image, tag):
+        sha = tag.removeprefix("latest-")
+        time.sleep(delays.get(sha, 0))
+        return ManifestProbe(exists=sha in hits, digest=f"sha256:{sha}" if sha in hits else None)
+    return probe
+
+
+def test_probe_window_newest_hit_wins_over_faster_older_hit(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, probe_batch_size=3)
+    mock_registry.probe.side_effect = timed_probe({"a": 0.1}, {"a", "b"})
+
+    assert svc._match_commits(["quay.io/ns/repo"], ["a", "b", "c"]) == {"quay.io/ns/repo": ("a", "sha256:a")}
+
+
+def test_probe_window_runs_batch_concurrently(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, probe_batch_size=4)
+    mock_registry.probe.side_effect = timed_probe({"a": 0.2, "b": 0.2, "c": 0.2}, {"c"})
+
+    start = time.monotonic()
+    assert svc._match_commits(["quay.io/ns/repo"], ["a", "b", "c", "d"]) == {"quay.io/ns/repo": ("c", "sha256:c")}
+    # the three slow misses overlap instead of adding up
+    assert time.monotonic() - start < 0.5
+
+
+def test_probe_window_moves_to_next_batch(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, probe_batch_size=2)
+    mock_registry.probe.side_effect = timed_probe({}, {"d", "e"})
+
+    assert svc._match_commits(["quay.io/ns/repo"], ["a", "b", "c", "d", "e"]) == {"quay.io/ns/repo": ("d", "sha256:d")}
+    probed = {c.args[1] for c in mock_registry.probe.call_args_list}
+    assert "latest-e" not in probed
+
+
+def test_probe_window_async_cancels_older_probes(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, probe_batch_size=3)
+    cancelled = []
+
+    class SlowRegistry:
+        async def probe(self, image, tag):
+            try:
+                await asyncio.sleep({"latest-a": 0.05, "latest-b": 0, "latest-c": 10}[tag])
+            except asyncio.CancelledError:
+                cancelled.append(tag)
+                raise
+            return ManifestProbe(exists=tag != "latest-a", digest=tag)
+
+    matches = asyncio.run(svc._probe_window_async(SlowRegistry(), ["quay.io/ns/repo"], ["a", "b", "c"]))
+
+    assert matches == {"quay.io/ns/repo": ("b", "latest-b")}
+    assert cancelled == ["latest-c"]
+
+
+INSTALLER = Component(
+    repository="https://github.com/openshift/assisted-installer",
+    name="openshift/assisted-installer",
+    versioning_selection_mechanism="commit",
+    image_pattern="quay.io/edge-infrastructure/assisted-installer",
+)
+CONTROLLER = Component(
+    repository="https://github.com/openshift/assisted-installer",
+    name="openshift/assisted-installer-controller",
+    versioning_selection_mechanism="commit",
+    image_pattern="quay.io/edge-infrastructure/assisted-installer-controller",
+)
+
+
+def group_registry(builds):
+    def probe(image, tag):
+        sha = tag.removeprefix("latest-")
+        exists = sha in builds.get(image.rsplit("/", 1)[1], ())
+        return ManifestProbe(exists=exists, digest=f"{image}@{sha}" if exists else None)
+    return probe
+
+
+def test_group_shares_repository_lookups(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file)
+    repo = MagicMock()
+    repo.get_commits.return_value = [MagicMock(sha="c1"), MagicMock(sha="c2")]
+    mock_github.get_repo.return_value = repo
+    mock_registry.probe.side_effect = group_registry({
+        "assisted-installer": {"c1", "c2"},
+        "assisted-installer-controller": {"c2"},
+    })
+
+    installer, controller = svc.process_group([INSTALLER, CONTROLLER])
+
+    # the controller is not built for c1 yet, so both images are pinned to c2
+    assert (installer.ref, controller.ref) == ("c2", "c2")
+    assert installer.image_digest == "quay.io/edge-infrastructure/assisted-installer@c2"
+    mock_github.get_repo.assert_called_once_with("openshift/assisted-installer")
+    repo.get_commits.assert_called_once()
+
+
+def test_group_falls_back_to_newest_build_per_image(mock_github, mock_registry, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file)
+    repo = MagicMock()
+    repo.get_commits.return_value = [MagicMock(sha="c1"), MagicMock(sha="c2")]
+    mock_github.get_repo.return_value = repo
+    mock_registry.probe.side_effect = group_registry({
+        "assisted-installer": {"c1"},
+        "assisted-installer-controller": {"c2"},
+    })
+
+    installer, controller = svc.process_group([INSTALLER, CONTROLLER])
+
+    assert (installer.ref, controller.ref) == ("c1", "c2")
+
+
+def test_group_fetches_the_latest_release_once(mock_github, temp_snapshot_file, temp_components_file):
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file)
+    repo = create_mock_repo("cluster-api", "v1.9.5")
+    mock_github.get_repo.return_value = repo
+    components = [
+        Component(
+            repository="https://github.com/kubernetes-sigs/cluster-api",
+            name=name,
+            versioning_selection_mechanism="release",
+        )
+        for name in ("kubernetes-sigs/cluster-api", "kubernetes-sigs/cluster-api-operator")
+    ]
+
+    artifacts = svc.process_group(components)
+
+    assert [(a.name, a.ref) for a in artifacts] == [
+        ("kubernetes-sigs/cluster-api", "v1.9.5"),
+        ("kubernetes-sigs/cluster-api-operator", "v1.9.5"),
+    ]
+    repo.get_latest_release.assert_called_once()
+
+
+def test_discovery_fetches_each_repository_once(mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    run_engine("threads", mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+
+    fetched = [c.args[0] for c in mock_github.get_repo.call_args_list]
+    assert sorted(fetched) == sorted(set(fetched))
+    assert len(fetched) == 6
+
+
+def test_resume_retries_only_unfinished_components(mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    expected = run_engine("threads", *args)
+    journal = os.path.join(os.path.dirname(temp_snapshot_file), "discovery-journal.jsonl")
+
+    with pytest.raises(Exception, match="Failed to resolve component: Failed to process openshift/assisted-installer"):
+        run_engine("threads", *args, failing={"openshift/assisted-installer"}, journal_file_path=journal)
+    assert os.path.isfile(journal)
+
+    mock_github.get_repo.reset_mock()
+    resumed = run_engine("threads", *args, journal_file_path=journal, resume=True)
+
+    assert json.dumps(asdict(resumed), default=str) == json.dumps(asdict(expected), default=str)
+    assert [c.args[0] for c in mock_github.get_repo.call_args_list] == ["openshift/assisted-installer"]
+    assert not os.path.exists(journal)
+
+
+def test_resume_requires_journal(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="requires a discovery journal"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, resume=True)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_failing_component_falls_back_to_last_snapshot(engine, mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    previous = run_engine(engine, *args)
+    previous = replace(previous, metadata=replace(previous.metadata, status="successful"))
+    mock_rc_repo.find_latest.return_value = previous
+
+    async def failing_release(self, repo):
+        raise Exception("GitHub API error")
+
+    with patch.object(FakeAsyncGitHubClient, "get_latest_release_tag", failing_release):
+        snapshot = run_engine(engine, *args, failing=set(RELEASES), fallback_to_last_snapshot=True)
+
+    assert json.dumps([asdict(a) for a in snapshot.artifacts]) == json.dumps([asdict(a) for a in previous.artifacts])
+
+
+def slow_probe(slow_image, delay):
+    def probe(image, tag):
+        if image == slow_image:
+            time.sleep(delay)
+        return probe_fixture(image, tag)
+    return probe
+
+
+def test_component_deadline_fails_slow_repository(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    journal = os.path.join(os.path.dirname(temp_snapshot_file), "discovery-journal.jsonl")
+
+    start = time.monotonic()
+    with pytest.raises(
+        Exception, match="Failed to resolve component: openshift/assisted-installer exceeded its 0.3s component deadline"
+    ):
+        run_engine(
+            "threads",
+            *args,
+            probe=slow_probe("quay.io/edge-infrastructure/assisted-installer", 1),
+            component_timeout=0.3,
+            journal_file_path=journal,
+        )
+    assert time.monotonic() - start < 1
+
+    # every other repository finished and can be resumed from
+    with open(journal) as f:
+        recorded = {json.loads(line).get("component") for line in f.read().splitlines()[1:]}
+    assert "openshift/assisted-service" in recorded
+    assert "openshift/assisted-installer" not in recorded
+
+
+def test_groups_finishing_past_the_run_deadline_leave_the_journal_alone(mock_github, mock_registry, mock_rc_repo, mock_datetime, temp_snapshot_file, temp_components_file):
+    args = (mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file)
+    previous = run_engine("threads", *args)
+    mock_rc_repo.find_latest.return_value = replace(previous, metadata=replace(previous.metadata, status="successful"))
+    journal = os.path.join(os.path.dirname(temp_snapshot_file), "discovery-journal.jsonl")
+
+    run_engine(
+        "threads",
+        *args,
+        slow={"kubernetes-sigs/cluster-api": 0.6},
+        run_timeout=0.3,
+        fallback_to_last_snapshot=True,
+        journal_file_path=journal,
+    )
+    assert not os.path.exists(journal)
+
+    # the abandoned group completes after the run saved its snapshot and cleared the journal
+    time.sleep(0.6)
+    assert not os.path.exists(journal)
+
+
+def test_run_deadline_cancels_pending_probes(mock_github, mock_registry, mock_rc_repo, temp_snapshot_file, temp_components_file):
+    cancelled = []
+
+    class SlowRegistry(FakeAsyncImageRegistryClient):
+        async def probe(self, image, tag):
+            if image == "quay.io/edge-infrastructure/assisted-installer":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(image)
+                    raise
+            return probe_fixture(image, tag)
+
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, engine="asyncio", run_timeout=0.3)
+    mock_registry.timeout = (1, 1)
+    start = time.monotonic()
+    with (
+        patch("core.services.version_discovery_service.AsyncGitHubClient", FakeAsyncGitHubClient),
+        patch("core.services.version_discovery_service.AsyncImageRegistryClient", SlowRegistry),
+    ):
+        with pytest.raises(Exception, match="Failed to resolve component: discovery run exceeded its 0.3s deadline"):
+            svc.run()
+
+    assert time.monotonic() - start < 1
+    assert cancelled
+    assert not mock_rc_repo.save.called
+
+
+def test_rejects_non_positive_timeouts(temp_snapshot_file, temp_components_file):
+    with pytest.raises(ValueError, match="must be positive"):
+        VersionDiscoveryService(temp_snapshot_file, temp_components_file, run_timeout=0)
+
+
+def test_discovery_saves_to_snapshot_directory(mock_github, mock_registry, mock_datetime, temp_snapshot_file, temp_components_file):
+    rc_dir = os.path.join(os.path.dirname(temp_snapshot_file), "release-candidates")
+    svc = VersionDiscoveryService(temp_snapshot_file, temp_components_file, rc_dir=rc_dir)
+    mock_github.get_repo.return_value = create_mock_repo("cluster-api", "v1.9.5")
+
+    svc.run()
+
+    assert [s.metadata.status for s in svc.rc_repository.find_all()] == ["pending"]
+    assert not os.path.exists(temp_snapshot_file)
+
+
+def test_commit_window_alignment():
+    window = CommitWindow(["img1", "img2"], ["c1", "c2", "c3"])
+    window.record("img1", 2, ManifestProbe(exists=True, digest="d1"))
+    window.record("img2", 2, ManifestProbe(exists=True, digest="d2"))
+    assert window.candidate() == 2
+    # c1 and c2 are still unknown, a newer common commit may exist
+    assert window.aligned() is None
+
+    window.record("img1", 0, ManifestProbe(exists=False))
+    window.record("img2", 1, ManifestProbe(exists=False))
+    assert window.aligned() == 2
+    assert window.matches() == {"img1": ("c3", "d1"), "img2": ("c3", "d2")}
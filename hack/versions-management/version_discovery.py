@@ -2,23 +2,101 @@
 import argparse
 import os
 import sys
-from core.services.version_discovery_service import VersionDiscoveryService
+from core.services.version_discovery_service import (
+    COMMIT_MATCHING_MODES,
+    ENGINES,
+    GITHUB_BACKENDS,
+    PROBE_BATCH_SIZE,
+    VersionDiscoveryService,
+)
 from core.utils.logging import setup_logger
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+# the discovered snapshot is already in the release candidates file, callers can skip publishing
+NO_CHANGES_EXIT_CODE = 3
 
 
 def main():
     parser = argparse.ArgumentParser(description="Version Discovery Service")
     parser.add_argument('--dry-run', action='store_true', help='Run in dry-run mode without making any changes')
+    parser.add_argument(
+        '--commit-matching',
+        choices=COMMIT_MATCHING_MODES,
+        default="probe",
+        help='How commits are matched to images: probe each commit tag, or list the repository tags once (quay.io images use the Quay tag API)',
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default="threads",
+        help='Discovery engine: a thread pool over blocking clients, or asyncio with per-host concurrency limits',
+    )
+    parser.add_argument(
+        '--probe-batch-size',
+        type=int,
+        default=PROBE_BATCH_SIZE,
+        help='Number of commits of the window probed concurrently, 1 probes them one by one',
+    )
+    parser.add_argument(
+        '--github-backend',
+        choices=GITHUB_BACKENDS,
+        default="rest",
+        help='How releases and commits are read: REST calls per repository, one GraphQL query for all of them, '
+             'or commits from local bare mirrors kept in GIT_MIRROR_DIR',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume an interrupted run from DISCOVERY_JOURNAL_FILE, only retrying components that did not complete',
+    )
+    parser.add_argument(
+        '--fallback-to-last-snapshot',
+        action='store_true',
+        help='Use the artifact of the latest successful snapshot for components that cannot be resolved',
+    )
+    parser.add_argument(
+        '--component-timeout',
+        type=float,
+        help='Seconds a repository may take before its pending lookups are cancelled and its components fail',
+    )
+    parser.add_argument(
+        '--run-timeout',
+        type=float,
+        help='Seconds the whole discovery may take, components still pending then are reported as unfinished',
+    )
     args = parser.parse_args()
     logger = setup_logger("VersionDiscovery")
     try:
         rc_file = os.environ.get("RELEASE_CANDIDATES_FILE", f"{ROOT_DIR}/release-candidates.yaml")
         components_file = os.environ.get("COMPONENTS_FILE", f"{ROOT_DIR}/components.yaml")
+        rc_dir = os.environ.get("RELEASE_CANDIDATES_DIR")
+        keep_last = os.environ.get("RELEASE_CANDIDATES_KEEP_LAST")
+        digest_cache_dir = os.environ.get("DIGEST_CACHE_DIR")
+        git_mirror_dir = os.environ.get("GIT_MIRROR_DIR")
+        journal_file = os.environ.get("DISCOVERY_JOURNAL_FILE")
         logger.info(f"Starting version discovery with RC file: {rc_file} and components file {components_file}")
-        service = VersionDiscoveryService(rc_file, components_file, args.dry_run)
+        service = VersionDiscoveryService(
+            rc_file,
+            components_file,
+            args.dry_run,
+            commit_matching=args.commit_matching,
+            digest_cache_dir=digest_cache_dir,
+            engine=args.engine,
+            probe_batch_size=args.probe_batch_size,
+            github_backend=args.github_backend,
+            git_mirror_dir=git_mirror_dir,
+            journal_file_path=journal_file,
+            resume=args.resume,
+            fallback_to_last_snapshot=args.fallback_to_last_snapshot,
+            component_timeout=args.component_timeout,
+            run_timeout=args.run_timeout,
+            rc_dir=rc_dir,
+            keep_last=int(keep_last) if keep_last else None,
+        )
         service.run()
+        if service.unchanged:
+            logger.info("Version discovery completed without changes")
+            return NO_CHANGES_EXIT_CODE
         logger.info("Version discovery completed successfully")
         return 0
     except Exception as e:
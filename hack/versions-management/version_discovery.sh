@@ -10,12 +10,47 @@ ARGS=()
 if [ "${DRY_RUN:-false}" = "true" ]; then
   ARGS+=(--dry-run)
 fi
-python "$SCRIPT_DIR/version_discovery.py" "${ARGS[@]}"
+if [ -n "${COMMIT_MATCHING:-}" ]; then
+  ARGS+=(--commit-matching "$COMMIT_MATCHING")
+fi
+if [ -n "${DISCOVERY_ENGINE:-}" ]; then
+  ARGS+=(--engine "$DISCOVERY_ENGINE")
+fi
+if [ -n "${GITHUB_BACKEND:-}" ]; then
+  ARGS+=(--github-backend "$GITHUB_BACKEND")
+fi
+if [ "${RESUME:-false}" = "true" ]; then
+  ARGS+=(--resume)
+fi
+if [ "${FALLBACK_TO_LAST_SNAPSHOT:-false}" = "true" ]; then
+  ARGS+=(--fallback-to-last-snapshot)
+fi
+if [ -n "${COMPONENT_TIMEOUT:-}" ]; then
+  ARGS+=(--component-timeout "$COMPONENT_TIMEOUT")
+fi
+if [ -n "${DISCOVERY_TIMEOUT:-}" ]; then
+  ARGS+=(--run-timeout "$DISCOVERY_TIMEOUT")
+fi
+STATUS=0
+python "$SCRIPT_DIR/version_discovery.py" "${ARGS[@]}" || STATUS=$?
+
+# 3: the discovered snapshot is already recorded, there is nothing to commit
+if [ "$STATUS" -eq 3 ]; then
+    echo "No new release candidate, skipping commit and PR"
+    exit 0
+fi
+if [ "$STATUS" -ne 0 ]; then
+    exit "$STATUS"
+fi
 
 if [ "${DRY_RUN:-false}" != true ]; then
     BRANCH="version-discovery-$(date '+%Y-%m-%d-%H-%M')"
     git checkout -b $BRANCH
-    git add release-candidates.yaml
+    git add release-candidates.yaml ${RELEASE_CANDIDATES_DIR:+"$RELEASE_CANDIDATES_DIR"}
+    # written when RELEASE_CANDIDATES_KEEP_LAST compacts the history
+    if [ -f release-candidates.archive.jsonl.gz ]; then
+        git add release-candidates.archive.jsonl.gz
+    fi
     git commit -m "Update release candidates"
     git push -u "${CI_REMOTE_NAME:-versions_management}" $BRANCH
     gh pr create --title "Update release candidates" --body "Automated PR to update release candidates" --base master --label "auto-merge"